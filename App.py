@@ -1,9 +1,11 @@
 import streamlit as st
+from utils.io import available_geos
+from utils.prep import data_scope, resolve_geo
 
 st.set_page_config(page_title="HICP Dashboard — France", page_icon="💶", layout="wide")
 
 st.title("💶 HICP Dashboard — Simple Price Story (France) - By Nathan Germany")
-st.caption("Scope: 🇫🇷 France · Monthly · Not seasonally adjusted (HICP/IPCH) · One national series")
+st.caption(f"Scope: 🇫🇷 France · Monthly · Not seasonally adjusted (HICP/IPCH) · {data_scope()}")
 
 st.image("data/maxresdefault.jpg", caption="Stonks", use_container_width=True)
 
@@ -13,6 +15,7 @@ st.markdown("""
 - Which **everyday categories** pushed prices **up** or **down** in France?
 - Are some categories **volatile** or more **stable**?
 - Did **seasonality** change **after 2020**?
+- Which categories **move together**?
 
 ### How to navigate
 Use the **sidebar → Pages** to open:
@@ -23,11 +26,18 @@ Use the **sidebar → Pages** to open:
 - **4_Volatility** — which categories move the most
 - **5_Seasonality** — before 2020 vs after 2020
 - **6_Conclusions** — stitched summary of the key findings
+- **7_Diagnostics** — (maintainers) timings and cache hit rates
+- **8_Co_movement** — which categories move together, and which lead others
 
 *Tip:* If the sidebar is hidden, click the **››** icon in the top-left.
 """)
 
-st.info("Note: This dataset contains a **single national series for France** (no `geo` column). All results refer to France.")
+geos = available_geos()
+if len(geos) > 1:
+    st.info(f"Note: This file covers **{len(geos)} countries** (`geo` column). All results refer to **{resolve_geo()}**; "
+            "the Categories page compares it with the euro area.")
+else:
+    st.info("Note: This dataset contains a **single national series for France** (no `geo` column). All results refer to France.")
 
 st.markdown(
     "Data source: Eurostat via data.gouv.fr · **Scope: France (HICP/IPCH)** · Files: `data/DS_IPCH_M_data.csv`, `data/DS_IPCH_M_metadata.csv`"
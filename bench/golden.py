@@ -0,0 +1,439 @@
+"""Golden outputs of the prep layer, and a check that every engine still reproduces them.
+
+    python bench/golden.py record                  # current code = truth: writes bench/golden/<case>/
+    python bench/golden.py check                   # every engine vs the goldens (exit 1 on a mismatch)
+    python bench/golden.py check --random 50       # + 50 random gappy panels, engines vs each other
+    python bench/golden.py check --engines store incremental --rtol 1e-12
+
+Cases are deterministic synthetic panels (bench/synthetic.py) with the edge cases
+that fast paths get wrong: gaps (``pct_change(12)`` is 12 months, not 12 rows),
+late starts and discontinued series (the last-12-months window), flat stretches
+(a sign of 0 for ``sign_changes``) and histories shorter than a window.
+
+Engines compute the same outputs another way; each is timed:
+
+    panel        prep functions on a SeriesPanel (the engine the goldens are recorded with)
+    frame        the same functions on long DataFrames
+    pandas       the original groupby implementations (row-based shifts: gap-free cases only)
+    snapshot     build_snapshot
+    incremental  a snapshot of all but the last months, then refresh_snapshot with revised + new rows
+    store        save_snapshot + attach (memory-mapped result store)
+
+Known-answer checks run with every ``check``: series built so that the right answer is
+obvious (a flat MoM has no break, a level shift has one, at the month it happens; a
+trend times a fixed calendar pattern gives that pattern back as seasonal factors; the
+quality report after an appended update equals a profile of the updated CSV).
+
+Record again only when a change of numbers is intended, and say so in the commit.
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.synthetic import generate  # noqa: E402
+from utils import cache  # noqa: E402
+from utils.panel import CODE_COL  # noqa: E402
+
+GOLDEN_DIR = os.path.join(ROOT, "bench", "golden")
+META = os.path.join(ROOT, "data", "DS_IPCH_M_metadata.csv")
+# Outputs are % / pp. The trailing-window kernels use running sums, so a variance that
+# should be 0 comes out near 1e-7 depending on where the sums start: ATOL covers that.
+RTOL, ATOL = 1e-9, 1e-6
+UPDATE_MONTHS = 3  # months the incremental engine folds in (plus revisions of the 2 before)
+FACTOR_REGIMES = (("early", 2012, 2019), ("late", 2020, 2025))  # seasonal factors of the decomposition
+
+# Sort keys of every output (rows are compared in this order)
+KEYS = {
+    "headline": ["date"],
+    "top_categories": [CODE_COL, "date"],
+    "compute_rates": [CODE_COL, "date"],
+    "last12_gap_vs_headline": [CODE_COL],
+    "volatility_persistence": [CODE_COL],
+    "rolling_volatility_24": [CODE_COL, "date"],
+    "rolling_volatility_36": [CODE_COL, "date"],
+    "seasonality_profiles": [CODE_COL, "month"],
+    "seasonal_factors": [CODE_COL, "regime", "month"],
+    "tree_stats": [CODE_COL],
+    "conclusions": ["section", "rank", "label"],
+}
+
+# ---- cases
+def _frame(raw: pd.DataFrame) -> pd.DataFrame:
+    # Synthetic rows as the app reads them: 2-decimal values (as in the CSV), app columns, filters
+    from utils.io import tidy
+    from utils.prep import _prepare
+    raw = raw.assign(OBS_VALUE=raw["OBS_VALUE"].round(2))
+    return _prepare(tidy(raw)).reset_index(drop=True)
+
+def _edges() -> pd.DataFrame:
+    df = _frame(generate(codes=40, months=150, extra=1, seed=7))
+    dates = np.sort(df["date"].unique())
+    code = df[CODE_COL].astype(str)
+    drop = ((code == "CP05") & (df["date"] < dates[60]))        # starts late
+    drop |= ((code == "CP07") & (df["date"] > dates[-25]))      # discontinued
+    drop |= ((code == "CP011") & (df["date"] != dates[40]))     # a single observation
+    drop |= (code == "CP03") & df["date"].isin(dates[::17])     # scattered gaps
+    flat = (code == "CP09") & df["date"].between(dates[30], dates[70])
+    df.loc[flat, "value"] = 100.0                               # YoY exactly 0 for a while
+    return df[~drop].reset_index(drop=True)
+
+CASES = {
+    "dense": lambda: _frame(generate(codes=13, months=120, extra=2, seed=1)),
+    "gappy": lambda: _frame(generate(codes=40, months=160, gaps=0.05, seed=2)),
+    "edges": _edges,
+    "short": lambda: _frame(generate(codes=13, months=20, seed=3)),
+}
+
+def _gapless(df: pd.DataFrame) -> bool:
+    # Every code observed every month from its first to the last month of the file
+    span = df.groupby(CODE_COL, observed=True)["date"].agg(["min", "count"])
+    months = (df["date"].max().to_period("M") - span["min"].dt.to_period("M")).map(lambda d: d.n) + 1
+    return bool((months == span["count"]).all())
+
+def _input_hash(df: pd.DataFrame) -> str:
+    return f"{pd.util.hash_pandas_object(df[['date', CODE_COL, 'value']].astype({CODE_COL: str}), index=False).sum():x}"
+
+# ---- engines: prepared long rows -> {output name: DataFrame}
+def _labels():
+    from utils.labels import load_labels
+    return load_labels(META)
+
+def _from_snapshot(snap) -> dict:
+    from utils.summary import conclusions, to_rows
+    out = {
+        "headline": snap.head, "top_categories": snap.cats, "last12_gap_vs_headline": snap.gap,
+        "volatility_persistence": snap.scores, "seasonality_profiles": snap.seasonality,
+        "tree_stats": snap.tree_stats, "seasonal_factors": snap.seasonal.factor_frame(FACTOR_REGIMES),
+        **{f"rolling_volatility_{w}": df for w, df in snap.rolling_vol.items()},
+    }
+    found = conclusions(snap, _labels())
+    if found is not None:
+        out["conclusions"] = to_rows(found).drop(columns="version", errors="ignore")  # snapshot name, not a number
+    return out
+
+def _prep_outputs(data, divisions, head) -> dict:
+    from utils import prep
+    return {
+        "headline": prep.headline(data),
+        "top_categories": prep.top_categories(data),
+        "last12_gap_vs_headline": prep.last12_gap_vs_headline(divisions, head),
+        "volatility_persistence": prep.volatility_persistence(divisions),
+        "rolling_volatility_24": prep.rolling_volatility(divisions, 24),
+        "rolling_volatility_36": prep.rolling_volatility(divisions, 36),
+        "seasonality_profiles": prep.seasonality_profiles(divisions),
+    }
+
+def engine_panel(df: pd.DataFrame) -> dict:
+    from utils.hierarchy import CoicopTree, hierarchy_stats
+    from utils.panel import SeriesPanel
+    from utils.prep import compute_rates
+    from utils.seasonality import SeasonalityEngine
+    from utils.snapshot import build_snapshot
+    panel = SeriesPanel.from_frame(df)
+    out = _prep_outputs(panel, panel.match(r"^CP\d{2}$"), panel.select(["CP00"]))
+    out["compute_rates"] = compute_rates(df)
+    out["seasonal_factors"] = SeasonalityEngine(panel).factor_frame(FACTOR_REGIMES)
+    out["tree_stats"] = hierarchy_stats(panel, CoicopTree(panel.codes))
+    snapshot = _from_snapshot(build_snapshot(panel))
+    if "conclusions" in snapshot:
+        out["conclusions"] = snapshot["conclusions"]
+    return out
+
+def engine_frame(df: pd.DataFrame) -> dict:
+    divisions = df[df[CODE_COL].astype(str).str.match(r"^CP\d{2}$")]
+    return _prep_outputs(df, divisions, df[df[CODE_COL] == "CP00"])
+
+def engine_pandas(df: pd.DataFrame) -> dict:
+    # The groupby versions the vectorized prep replaced; pct_change is by rows here
+    def rates(d):
+        d = d.copy()
+        d["mom"] = d.groupby(CODE_COL, observed=True)["value"].pct_change() * 100
+        d["yoy"] = d.groupby(CODE_COL, observed=True)["value"].pct_change(12) * 100
+        return d
+
+    def sign_changes(s: pd.Series) -> int:
+        s = np.sign(s.dropna())
+        return int((s.shift() != s).sum() - 1 if len(s) > 1 else 0)
+
+    df = df.sort_values([CODE_COL, "date"], kind="stable")
+    head = rates(df[df[CODE_COL] == "CP00"])
+    cats = rates(df[df[CODE_COL].astype(str).str.match(r"^CP\d{2}$")])
+    last = cats["date"].max()
+    start = last - pd.DateOffset(months=11)
+    g_cat = cats[cats["date"] >= start].groupby(CODE_COL, observed=True)["yoy"].mean()
+    gap = (g_cat - head[head["date"] >= start]["yoy"].mean()).rename("diff").reset_index()
+    vol = cats.groupby(CODE_COL, observed=True).agg(
+        vol=("yoy", lambda x: x.std(skipna=True)), n=("yoy", "count"), sc=("yoy", sign_changes)).reset_index()
+    vol["persistence"] = 1 - vol["sc"] / vol["n"].clip(lower=1)
+    t = cats.assign(year=cats["date"].dt.year, month=cats["date"].dt.month)
+    profiles = [t[t["year"].between(lo, hi)].groupby([CODE_COL, "month"], observed=True)["mom"].mean()
+                .rename(f"mom_{name}") for name, lo, hi in (("pre", 2016, 2019), ("post", 2020, 2025))]
+    seasonal = pd.concat(profiles, axis=1).reset_index()
+    return {"headline": head, "top_categories": cats, "compute_rates": rates(df), "last12_gap_vs_headline": gap,
+            "volatility_persistence": vol, "seasonality_profiles": seasonal}
+
+def engine_snapshot(df: pd.DataFrame) -> dict:
+    from utils.panel import SeriesPanel
+    from utils.snapshot import build_snapshot
+    return _from_snapshot(build_snapshot(SeriesPanel.from_frame(df), "golden"))
+
+def engine_incremental(df: pd.DataFrame) -> dict:
+    from utils.panel import SeriesPanel
+    from utils.snapshot import build_snapshot, refresh_snapshot
+    dates = np.sort(df["date"].unique())
+    if len(dates) <= UPDATE_MONTHS + 2:
+        return engine_snapshot(df)
+    cutoff, revised_from = dates[-UPDATE_MONTHS], dates[-UPDATE_MONTHS - 2]
+    old = df[df["date"] < cutoff].copy()
+    old.loc[old["date"] >= revised_from, "value"] *= 1.01  # first publication of the months revised later
+    snap = build_snapshot(SeriesPanel.from_frame(old), "v1")
+    return _from_snapshot(refresh_snapshot(snap, df[df["date"] >= revised_from], "v2"))
+
+def engine_store(df: pd.DataFrame) -> dict:
+    from utils.panel import SeriesPanel
+    from utils.snapshot import build_snapshot
+    from utils.store import attach, save_snapshot
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):  # the store goes to ./data/.cache
+        path = os.path.join(tmp, "golden.csv")
+        save_snapshot(build_snapshot(SeriesPanel.from_frame(df), "golden"), path)
+        out = _from_snapshot(attach(path, "golden"))
+        return {k: v.copy() for k, v in out.items()}  # detach from the memory map before it is removed
+
+ENGINES = {
+    "panel": engine_panel, "frame": engine_frame, "pandas": engine_pandas,
+    "snapshot": engine_snapshot, "incremental": engine_incremental, "store": engine_store,
+}
+GAPLESS_ONLY = {"pandas"}
+
+# ---- comparison
+def _normalize(df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    df = df.copy()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or df[c].dtype == object:
+            df[c] = df[c].astype(str)
+    return df.sort_values([k for k in keys if k in df.columns], kind="stable").reset_index(drop=True)
+
+def compare(name: str, expected: pd.DataFrame, actual: pd.DataFrame, rtol: float = RTOL, atol: float = ATOL) -> list[str]:
+    """Differences between two versions of output ``name`` (empty list = same within tolerance)."""
+    keys = KEYS[name]
+    expected, actual = _normalize(expected, keys), _normalize(actual, keys)
+    missing = [c for c in expected.columns if c not in actual.columns]
+    if missing:
+        return [f"{name}: missing columns {missing}"]
+    if len(expected) != len(actual):
+        return [f"{name}: {len(actual)} rows, expected {len(expected)}"]
+    problems = []
+    for c in expected.columns:
+        e, a = expected[c], actual[c]
+        if pd.api.types.is_numeric_dtype(e) and pd.api.types.is_numeric_dtype(a) and not pd.api.types.is_bool_dtype(e):
+            e, a = e.to_numpy(np.float64), a.to_numpy(np.float64)
+            bad = ~np.isclose(a, e, rtol=rtol, atol=atol, equal_nan=True)
+        elif pd.api.types.is_datetime64_any_dtype(e):
+            bad = (pd.to_datetime(a) != e).to_numpy()
+        else:
+            bad = (e.astype(str) != a.astype(str)).to_numpy()
+        if bad.any():
+            i = int(np.flatnonzero(bad)[0])
+            where = ", ".join(f"{k}={expected[k].iloc[i]}" for k in keys if k in expected.columns)
+            problems.append(f"{name}.{c}: {int(bad.sum())} of {len(bad)} rows differ (first at {where}: "
+                            f"{a[i] if isinstance(a, np.ndarray) else a.iloc[i]!r} vs {e[i] if isinstance(e, np.ndarray) else e.iloc[i]!r})")
+    return problems
+
+def run(engine: str, df: pd.DataFrame, repeat: int = 1) -> tuple[dict, float]:
+    # Outputs of ``engine`` and its best wall time over ``repeat`` runs
+    best, out = np.inf, None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = ENGINES[engine](df)
+        best = min(best, time.perf_counter() - t)
+    return out, best
+
+# ---- known answers
+def _known_breaks() -> list[str]:
+    from utils.detect import breaks
+    months = 240
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 0.2, months)
+    step = np.r_[np.zeros(120), np.full(months - 120, 0.5)]
+    series = {  # name -> (MoM, expected first months of a new regime)
+        "flat": (np.zeros(months), []),
+        "constant MoM": (np.full(months, 0.2), []),
+        "1e-9 pp step": (np.r_[np.zeros(120), np.full(months - 120, 1e-9)], []),
+        "noise": (noise, []),
+        "noiseless level shift": (step, [120]),
+        "level shift in noise": (step + noise, [120]),
+    }
+    mom = np.column_stack([v for v, _ in series.values()])
+    col, row, *_ = breaks(mom)
+    problems = []
+    for j, (name, (_, expected)) in enumerate(series.items()):
+        found = row[col == j].tolist()
+        if len(found) != len(expected) or any(abs(f - e) > 2 for f, e in zip(found, expected)):
+            problems.append(f"known answers/breaks: {name}: breaks at months {found}, expected {expected}")
+    return problems
+
+def _known_seasonal() -> list[str]:
+    from utils.panel import SeriesPanel
+    from utils.seasonality import SeasonalityEngine
+    months = 240
+    rng = np.random.default_rng(0)
+    factor = 1 + np.array([-1.0, -1.5, 0.5, 0.5, 0.0, 0.5, -2.0, -1.0, 1.0, 1.0, 1.0, 1.0]) / 100
+    factor /= factor.mean()
+    trend = 100 * np.exp(np.cumsum(rng.normal(0.002, 0.001, (months, 3)), axis=0))
+    panel = SeriesPanel(trend * factor[np.arange(months) % 12][:, None],
+                        pd.period_range("2001-01", periods=months, freq="M"), pd.Index(["A", "B", "C"]))
+    found = SeasonalityEngine(panel).factors((("all", 2001, 2020), ("late", 2015, 2020)))
+    error = float(np.abs(found - factor[None, :, None]).max())
+    return [] if error < 2e-3 else [f"known answers/seasonal factors: off by {error:.2g} from the true factor"]
+
+def _known_quality() -> list[str]:
+    # Quality report after append_update == a full profile of the CSV with the update applied
+    from bench.synthetic import write
+    from utils.io import append_update, data_version, load_data_cached
+    from utils.quality import profile_csv, quality_report
+    raw = generate(codes=13, months=60, seed=4)
+    last, before = sorted(raw["TIME_PERIOD"].unique())[-2:][::-1]
+    update = raw[raw["TIME_PERIOD"].isin([before, last])].copy()
+    update.loc[update["TIME_PERIOD"] == before, "OBS_VALUE"] *= 1.02  # revised month
+    merged = pd.concat([raw[raw["TIME_PERIOD"] != last].assign(
+        OBS_VALUE=lambda d: np.where(d["TIME_PERIOD"] == before, d["OBS_VALUE"] * 1.02, d["OBS_VALUE"])),
+        raw[raw["TIME_PERIOD"] == last]], ignore_index=True)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):  # the cache goes to ./data/.cache
+        write(raw[raw["TIME_PERIOD"] != last], "base.csv")
+        write(update, "update.csv")
+        write(merged, "merged.csv")
+        load_data_cached("base.csv")
+        append_update("update.csv", "base.csv")
+        got, want = quality_report("base.csv"), profile_csv("merged.csv")
+        version = data_version("base.csv")
+    problems = [] if got.version == version else ["known answers/quality: report not built for the updated version"]
+    for field in ("rows", "duplicate_rows", "duplicate_keys", "bad_dates", "start", "end", "unique_months"):
+        if getattr(got, field) != getattr(want, field):
+            problems.append(f"known answers/quality: {field} {getattr(got, field)} after the update, "
+                            f"{getattr(want, field)} profiling the updated CSV")
+    keys = list(got.series.columns[:got.series.columns.get_loc("first")])
+    for name, e, a, by in (("series", want.series, got.series, keys), ("jumps", want.jumps, got.jumps, keys + ["date"]),
+                           ("columns", want.columns, got.columns, ["column"])):
+        e, a = (d.drop(columns="revised", errors="ignore").astype({k: str for k in by}).sort_values(by, ignore_index=True)
+                for d in (e, a))
+        if not e.equals(a):
+            problems.append(f"known answers/quality: {name} differ from a profile of the updated CSV")
+    if int(got.series["revised"].sum()) != 13:
+        problems.append(f"known answers/quality: {int(got.series['revised'].sum())} revised rows, expected 13")
+    return problems
+
+KNOWN_ANSWERS = [_known_breaks, _known_seasonal, _known_quality]
+
+# ---- record / check
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+def record(cases: list[str]) -> None:
+    for case in cases:
+        df = CASES[case]()
+        outputs, seconds = run("panel", df)
+        folder = os.path.join(GOLDEN_DIR, case)
+        os.makedirs(folder, exist_ok=True)
+        for name, out in outputs.items():
+            _normalize(out, KEYS[name]).to_parquet(os.path.join(folder, f"{name}.parquet"), index=False, compression="zstd")
+        with open(os.path.join(folder, "manifest.json"), "w") as f:
+            json.dump({"input": _input_hash(df), "rows": len(df), "outputs": sorted(outputs),
+                       "commit": _commit(), "pandas": pd.__version__, "numpy": np.__version__}, f, indent=1)
+        print(f"{case}: {len(outputs)} outputs recorded ({len(df):,} rows, {seconds:.2f}s)")
+
+def load_golden(case: str) -> tuple[dict, dict]:
+    folder = os.path.join(GOLDEN_DIR, case)
+    with open(os.path.join(folder, "manifest.json")) as f:
+        manifest = json.load(f)
+    return manifest, {name: pd.read_parquet(os.path.join(folder, f"{name}.parquet")) for name in manifest["outputs"]}
+
+def check_case(label: str, df: pd.DataFrame, golden: dict, engines: list[str], repeat: int,
+               rtol: float, atol: float) -> tuple[list[dict], list[str]]:
+    rows, problems = [], []
+    gapless = _gapless(df)
+    for engine in engines:
+        if engine in GAPLESS_ONLY and not gapless:
+            rows.append({"case": label, "engine": engine, "outputs": 0, "seconds": None, "status": "skipped (gaps)"})
+            continue
+        outputs, seconds = run(engine, df, repeat)
+        found = [f"{label}/{engine}: {p}" for name, out in outputs.items() if name in golden
+                 for p in compare(name, golden[name], out, rtol, atol)]
+        found += [f"{label}/{engine}: {name} not produced (expected from the snapshot engines)"
+                  for name in golden if name not in outputs and engine in ("snapshot", "incremental", "store")
+                  and name not in ("compute_rates",)]
+        problems += found
+        rows.append({"case": label, "engine": engine, "outputs": len(set(outputs) & set(golden)),
+                     "seconds": seconds, "status": "FAIL" if found else "ok"})
+    return rows, problems
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Record / check golden outputs of the prep layer.")
+    parser.add_argument("action", choices=["record", "check"])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--random", type=int, default=0, help="extra random panels, checked against the panel engine")
+    parser.add_argument("--seed", type=int, default=0, help="first seed of the random panels")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per engine (best is kept)")
+    parser.add_argument("--rtol", type=float, default=RTOL)
+    parser.add_argument("--atol", type=float, default=ATOL)
+    parser.add_argument("--out", help="write the timing / status table as JSON")
+    args = parser.parse_args(argv)
+    cache.set_backend("memory")
+
+    if args.action == "record":
+        record(args.cases)
+        return 0
+
+    rows, problems = [], [p for check in KNOWN_ANSWERS for p in check()]
+    for case in args.cases:
+        df = CASES[case]()
+        manifest, golden = load_golden(case)
+        if manifest["input"] != _input_hash(df):
+            problems.append(f"{case}: the case's input changed since it was recorded at {manifest['commit']} "
+                            f"(bench/synthetic.py or the case definition): record again")
+            continue
+        r, p = check_case(case, df, golden, args.engines, args.repeat, args.rtol, args.atol)
+        rows += r
+        problems += p
+    rng = np.random.default_rng(args.seed)
+    for i in range(args.random):
+        # Random shapes and gap rates: the engines must agree with the panel engine
+        params = {"codes": int(rng.integers(13, 80)), "months": int(rng.integers(14, 300)),
+                  "gaps": float(rng.choice([0.0, 0.0, 0.02, 0.1, 0.3])), "seed": args.seed + i}
+        df = _frame(generate(**params))
+        golden, _ = run("panel", df)
+        r, p = check_case(f"random{i}({params['codes']}x{params['months']}, gaps {params['gaps']})",
+                          df, golden, [e for e in args.engines if e != "panel"], 1, args.rtol, args.atol)
+        rows += r
+        problems += p
+
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        base = table[table["engine"] == "pandas"].set_index("case")["seconds"]
+        table["vs_pandas"] = table["case"].map(base) / table["seconds"]
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"commit": _commit(), "rows": rows, "problems": problems}, f, indent=1, default=str)
+    for p in problems:
+        print(p, file=sys.stderr)
+    print(f"{len(problems)} mismatch(es)" if problems else "all engines match the goldens", file=sys.stderr)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
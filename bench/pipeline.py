@@ -0,0 +1,171 @@
+"""Scaling benchmark for the data pipeline on synthetic HICP panels.
+
+For every (codes, months, extra) combination a synthetic CSV is generated and each
+pipeline stage is timed: wall time, peak traced memory and input rows per second.
+
+    python bench/pipeline.py --codes 13 400 5000 --months 100 360 1000 --out results.json
+    python bench/pipeline.py --codes 400 --months 360 --compare results.json   # exit 1 on regression
+    python bench/pipeline.py --codes 13 400 --geos 29                          # + multi-country stages
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.synthetic import generate, weights, write  # noqa: E402
+from utils import cache  # noqa: E402
+
+def _stage(results: list, name: str, rows: int, func, *args):
+    # Timed run first, then a second run under tracemalloc (which slows code down) for peak memory
+    gc.collect()
+    t = time.perf_counter()
+    out = func(*args)
+    seconds = time.perf_counter() - t
+    del out
+    gc.collect()
+    tracemalloc.start()
+    out = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.append({"stage": name, "seconds": seconds, "peak_mb": peak / 2**20,
+                    "rows": rows, "rows_per_sec": rows / seconds if seconds else None})
+    return out
+
+def run_case(codes: int, months: int, extra: int, workdir: str) -> dict:
+    from utils import io, prep
+    from utils.comovement import comovement
+    from utils.contributions import tree_contributions
+    from utils.detect import detect_panel
+    from utils.forecast import forecast_panel
+    from utils.hierarchy import CoicopTree, hierarchy_stats
+    from utils.panel import SeriesPanel
+    from utils.snapshot import build_snapshot
+    from utils.store import attach, save_snapshot
+
+    path = os.path.join(workdir, f"DS_IPCH_M_{codes}x{months}x{extra}.csv")
+    write(generate(codes, months, extra), path)
+    stages = []
+    raw = _stage(stages, "parse_csv", 0, io.parse_data, path)
+    n_raw = len(raw)
+    stages[-1].update(rows=n_raw, rows_per_sec=n_raw / stages[-1]["seconds"])
+    io.load_data_cached(path)  # writes the Parquet cache
+    _stage(stages, "load_cached", n_raw, io.load_data_cached, path)
+    _stage(stages, "scan_csv_filtered", n_raw, io.scan_csv, path, prep.SERIES_FILTER, None, prep.SERIES_COLUMNS)
+    _stage(stages, "load_filtered", n_raw, io.load_filtered, path, prep.SERIES_FILTER, None, prep.SERIES_COLUMNS)
+    df = _stage(stages, "prepare_data", n_raw, prep._prepare, raw)
+    n = len(df)
+    panel = _stage(stages, "build_panel", n, SeriesPanel.from_frame, df)
+    cats = _stage(stages, "top_categories", n, prep.top_categories, panel)
+    head = _stage(stages, "headline", n, prep.headline, panel)
+    _stage(stages, "last12_gap_vs_headline", len(cats), prep.last12_gap_vs_headline, cats, head)
+    _stage(stages, "volatility_persistence", n, prep.volatility_persistence, panel)
+    _stage(stages, "seasonality_profiles", n, prep.seasonality_profiles, panel)
+    _stage(stages, "hierarchy_stats", n, lambda p: hierarchy_stats(p, CoicopTree(p.codes)), panel)
+    w = weights(codes, range(panel.dates[0].year, panel.dates[-1].year + 1))
+    _stage(stages, "tree_contributions", n, tree_contributions, panel, w)
+    _stage(stages, "forecast", n, forecast_panel, panel)
+    _stage(stages, "comovement", n, comovement, panel)
+    _stage(stages, "detect", n, detect_panel, panel)
+    snap = _stage(stages, "build_snapshot", n, build_snapshot, SeriesPanel.from_frame(df), "bench")
+    _stage(stages, "save_store", n, save_snapshot, snap, path)
+    _stage(stages, "attach_store", n, attach, path, "bench")
+    os.remove(path)
+    return {"codes": codes, "months": months, "extra": extra, "raw_rows": n_raw, "rows": n, "stages": stages}
+
+def run_geo_case(codes: int, months: int, geos: int, workdir: str) -> dict:
+    # Multi-country file: one Parquet partition per country, the cube, the gaps and detections over it
+    from utils import io
+    from utils.detect import detect_geo
+    from utils.geo import load_geo_panel
+
+    path = os.path.join(workdir, f"DS_IPCH_M_{codes}x{months}x{geos}geo.csv")
+    write(generate(codes, months, geos=geos), path)
+    stages = []
+    n_raw = len(_stage(stages, "geo_parse_csv", 0, io.parse_data, path))
+    stages[-1].update(rows=n_raw, rows_per_sec=n_raw / stages[-1]["seconds"])
+    io.load_data_cached(path)  # writes the partitioned cache
+    one = io.available_geos(path)[-1]
+    _stage(stages, "geo_load_one", n_raw, load_geo_panel, path, [one])
+    cube = _stage(stages, "geo_load_panel", n_raw, load_geo_panel, path)
+    n = int((~np.isnan(cube.values)).sum())
+    _stage(stages, "geo_gap_vs", n, cube.gap_vs)
+    _stage(stages, "geo_detect", n, detect_geo, cube)
+    os.remove(path)
+    return {"codes": codes, "months": months, "extra": 0, "geos": geos, "raw_rows": n_raw, "rows": n, "stages": stages}
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    def key(case):
+        return case["codes"], case["months"], case["extra"], case.get("geos", 0)
+    before = {(key(c), s["stage"]): s for c in baseline["cases"] for s in c["stages"]}
+    found = []
+    for case in current["cases"]:
+        for s in case["stages"]:
+            old = before.get((key(case), s["stage"]))
+            if old and s["seconds"] > old["seconds"] * (1 + tolerance) and s["seconds"] - old["seconds"] > 0.005:
+                found.append(f"{key(case)} {s['stage']}: {old['seconds']:.4f}s -> {s['seconds']:.4f}s")
+    return found
+
+def _print(case: dict, title: str) -> None:
+    print(f"## {title}: {case['raw_rows']:,} raw rows, {case['rows']:,} kept")
+    for s in case["stages"]:
+        rate = f"{s['rows_per_sec']:>14,.0f} rows/s" if s["rows_per_sec"] else ""
+        print(f"  {s['stage']:<24} {s['seconds'] * 1000:9.1f} ms  {s['peak_mb']:8.1f} MB  {rate}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--codes", type=int, nargs="+", default=[13, 400])
+    parser.add_argument("--months", type=int, nargs="+", default=[360])
+    parser.add_argument("--extra", type=int, nargs="+", default=[1], help="extra (filtered-out) series per code")
+    parser.add_argument("--geos", type=int, default=0, help="also time a multi-country file with this many countries")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    cache.set_backend("none")
+    result = {"commit": _commit(), "python": sys.version.split()[0], "cases": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # keeps the Parquet cache (data/.cache) out of the repo
+        for codes in args.codes:
+            for months in args.months:
+                for extra in args.extra:
+                    case = run_case(codes, months, extra, workdir)
+                    result["cases"].append(case)
+                    _print(case, f"{codes} codes × {months} months (+{extra} extra series)")
+                if args.geos:
+                    case = run_geo_case(codes, months, args.geos, workdir)
+                    result["cases"].append(case)
+                    _print(case, f"{args.geos} countries × {codes} codes × {months} months")
+        os.chdir(ROOT)
+    if out:
+        with open(out, "w") as f:
+            json.dump(result, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        for line in found:
+            print("REGRESSION", line)
+        return 1 if found else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
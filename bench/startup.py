@@ -0,0 +1,103 @@
+"""Cold-start benchmark: import time of the analytics layer and time-to-first-render per page.
+
+Every measurement runs in a fresh interpreter so nothing is already imported or cached
+in memory (the on-disk Parquet cache is kept, as on a restarted replica).
+
+    python bench/startup.py --out bench/startup.json
+    python bench/startup.py --compare bench/startup.json --tolerance 0.25   # exit 1 on regression
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["utils.io", "utils.prep", "utils.snapshot", "utils.summary", "utils.report"]
+HEAVY = ("streamlit", "plotly")
+
+IMPORT_SNIPPET = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t
+heavy = sorted({{m.split(".")[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": dt, "heavy": heavy}}))
+"""
+
+PAGE_SNIPPET = """
+import json, sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({page!r}, default_timeout=600)
+t0 = time.perf_counter()
+at.run()
+first = time.perf_counter() - t0
+t1 = time.perf_counter()
+at.run()
+rerun = time.perf_counter() - t1
+print(json.dumps({{"first_render": first, "rerun": rerun, "with_imports": time.perf_counter() - t - rerun,
+                  "errors": [str(e.value) for e in at.exception],
+                  "plotly_loaded": "plotly.express" in sys.modules}}))
+"""
+
+def _run(code: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    res = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1] if res.stderr else "benchmark child failed")
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+def measure(repeat: int = 3, pages: list[str] | None = None) -> dict:
+    out = {"imports": {}, "pages": {}}
+    for module in MODULES:
+        runs = [_run(IMPORT_SNIPPET.format(module=module, heavy=HEAVY)) for _ in range(repeat)]
+        out["imports"][module] = {"seconds": min(r["seconds"] for r in runs), "heavy": runs[0]["heavy"]}
+    for page in pages or sorted(glob.glob(os.path.join(ROOT, "pages", "*.py"))):
+        runs = [_run(PAGE_SNIPPET.format(page=page)) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r["first_render"])
+        out["pages"][os.path.basename(page)] = best
+    return out
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for group, key in (("imports", "seconds"), ("pages", "first_render"), ("pages", "rerun")):
+        for name, now in current[group].items():
+            before = baseline.get(group, {}).get(name)
+            if before and now[key] > before[key] * (1 + tolerance):
+                found.append(f"{group}/{name} {key}: {before[key]:.3f}s -> {now[key]:.3f}s")
+    for name, now in current["imports"].items():
+        if now["heavy"]:
+            found.append(f"imports/{name} pulls in {', '.join(now['heavy'])}")
+    return found
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh runs per measurement (best is kept)")
+    parser.add_argument("--page", action="append", help="only these page files (repeatable)")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    result = measure(args.repeat, args.page)
+    for name, r in result["imports"].items():
+        print(f"import {name:<16} {r['seconds'] * 1000:8.1f} ms  {'(loads ' + ', '.join(r['heavy']) + ')' if r['heavy'] else ''}")
+    for name, r in result["pages"].items():
+        status = "ERROR " + r["errors"][0] if r["errors"] else ""
+        print(f"page   {name:<24} first {r['first_render']:.3f}s  rerun {r['rerun']:.3f}s  "
+              f"plotly {'yes' if r['plotly_loaded'] else 'no'}  {status}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        for line in found:
+            print("REGRESSION", line)
+        return 1 if found else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
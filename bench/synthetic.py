@@ -0,0 +1,91 @@
+"""Synthetic DS_IPCH_M-shaped data for benchmarks.
+
+    python bench/synthetic.py --codes 400 --months 360 --extra 2 --out /tmp/hicp_400x360.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["FREQ", "IDX_TYPE", "SEASONAL_ADJUST", "EXPENDITURE_1999", "CONF_STATUS",
+           "DECIMALS", "OBS_STATUS", "UNIT_MULT", "TIME_PERIOD", "OBS_VALUE"]
+# (IDX_TYPE, SEASONAL_ADJUST) combos beyond HICP/N: rows the app filters out
+GEOS = ["EA", "AT", "BE", "BG", "CY", "CZ", "DE", "DK", "EE", "EL", "ES", "FI", "FR", "HR", "HU",
+        "IE", "IT", "LT", "LU", "LV", "MT", "NL", "PL", "PT", "RO", "SE", "SI", "SK", "EU27_2020"]
+EXTRA_SERIES = [("YOY", "N"), ("HICP", "S"), ("INX_A_AVG", "N"), ("MOR", "N"), ("HICP", "SCA")]
+
+def coicop_codes(n: int) -> list[str]:
+    """``n`` COICOP-like codes in tree order: CP00, CP01..CP12, then groups, classes, sub-classes."""
+    codes, level = ["CP00"], [f"CP{d:02d}" for d in range(1, 13)]
+    while len(codes) < n and level:
+        codes.extend(level)
+        level = [f"{c}{k}" for c in level for k in range(1, 10)]
+    return codes[:n]
+
+def generate(codes: int = 13, months: int = 360, extra: int = 0, gaps: float = 0.0,
+             end: str = "2025-08", seed: int = 0, geos: int = 0) -> pd.DataFrame:
+    """Long DS_IPCH_M-style frame; ``geos`` > 0 adds a GEO column with that many countries."""
+    if geos:
+        countries = GEOS[:geos]
+        frames = [generate(codes, months, extra, gaps, end, seed + i).assign(GEO=g)
+                  for i, g in enumerate(countries)]
+        return pd.concat(frames, ignore_index=True)[COLUMNS[:1] + ["GEO"] + COLUMNS[1:]]
+    rng = np.random.default_rng(seed)
+    code_list = coicop_codes(codes)
+    periods = pd.period_range(end=end, periods=months, freq="M").astype(str)
+    n_codes = len(code_list)
+    # Index levels: trend + noise + a mild seasonal pattern, starting at 100
+    steps = rng.normal(0.0015, 0.004, (months, n_codes))
+    steps += 0.002 * np.sin(2 * np.pi * np.arange(months) / 12)[:, None] * rng.random(n_codes)
+    levels = 100 * np.exp(np.cumsum(steps, axis=0))
+
+    frames = []
+    for idx_type, sa in [("HICP", "N")] + EXTRA_SERIES[:extra]:
+        values = levels if idx_type == "HICP" else levels * rng.uniform(0.5, 1.5, n_codes)
+        frame = pd.DataFrame({
+            "FREQ": "M",
+            "IDX_TYPE": idx_type,
+            "SEASONAL_ADJUST": sa,
+            "EXPENDITURE_1999": np.tile(code_list, months),
+            "CONF_STATUS": "F",
+            "DECIMALS": 2,
+            "OBS_STATUS": "A",
+            "UNIT_MULT": 0,
+            "TIME_PERIOD": np.repeat(periods, n_codes),
+            "OBS_VALUE": values.ravel(),
+        })
+        if gaps:
+            frame = frame[rng.random(len(frame)) >= gaps]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[COLUMNS]
+
+def weights(codes: int = 13, years=range(1996, 2026), seed: int = 0) -> pd.DataFrame:
+    # Item weights (year, expenditure_1999, weight per mille) for the codes of ``generate``
+    rng = np.random.default_rng(seed)
+    code_list = coicop_codes(codes)
+    rows = [(y, c, 1000.0 if c == "CP00" else float(w))
+            for y in years for c, w in zip(code_list, rng.uniform(1, 100, len(code_list)))]
+    return pd.DataFrame(rows, columns=["year", "expenditure_1999", "weight"])
+
+def write(df: pd.DataFrame, path: str) -> None:
+    # Same layout as the Eurostat file: ';' separator, decimal comma
+    df.to_csv(path, sep=";", index=False, decimal=",", float_format="%.2f")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Write a synthetic DS_IPCH_M-style CSV.")
+    parser.add_argument("--codes", type=int, default=13, help="number of expenditure codes (13 = CP00..CP12)")
+    parser.add_argument("--months", type=int, default=360)
+    parser.add_argument("--extra", type=int, default=0, help=f"extra index/adjustment series per code (0-{len(EXTRA_SERIES)})")
+    parser.add_argument("--gaps", type=float, default=0.0, help="share of observations dropped at random")
+    parser.add_argument("--geos", type=int, default=0, help=f"countries (0 = no GEO column, max {len(GEOS)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+    df = generate(args.codes, args.months, args.extra, args.gaps, seed=args.seed, geos=args.geos)
+    write(df, args.out)
+    print(f"{len(df):,} rows -> {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,73 @@
 import streamlit as st
 import pandas as pd
-from utils.io import load_data
+from utils.quality import quality_report
+from utils.vintage import VintageStore
 
 st.title("Data Quality — Missing • Duplicates • Types")
 
-df = load_data()
+report = quality_report()  # profiled once per data version, then read from data/.cache
 
 st.subheader("Columns & dtypes")
-st.dataframe(pd.DataFrame({"column": df.columns, "dtype": df.dtypes.astype(str)}), use_container_width=True)
+st.dataframe(report.columns[["column", "dtype"]], use_container_width=True)
 
 st.subheader("Missing values")
-miss = (
-    df.isna().sum().to_frame("missing")
-      .assign(missing_pct=(df.isna().mean()*100).round(2))
-      .reset_index().rename(columns={"index":"column"})
-)
+miss = report.columns[["column", "missing", "missing_pct"]]
 st.dataframe(miss, use_container_width=True)
 
 st.subheader("Duplicates")
-st.write(f"Total duplicate rows: **{int(df.duplicated().sum())}**")
-
-if "date" in df.columns:
-    st.subheader("Date coverage")
-    cov = pd.DataFrame({
-        "start": [df["date"].min()],
-        "end": [df["date"].max()],
-        "unique_months": [df["date"].dt.to_period("M").nunique()]
-    })
-    st.dataframe(cov, use_container_width=True)
+st.write(f"Total duplicate rows: **{report.duplicate_rows}**")
+
+st.subheader("Date coverage")
+cov = pd.DataFrame({
+    "start": [report.start],
+    "end": [report.end],
+    "unique_months": [report.unique_months]
+})
+st.dataframe(cov, use_container_width=True)
+
+# ---- Per-series checks (one series = frequency × index type × adjustment × code)
+st.subheader("Per-series checks")
+series = report.series
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Series", f"{len(series):,}")
+c2.metric("With gaps", int((series["gaps"] > 0).sum()))
+c3.metric("Duplicate (code, month)", report.duplicate_keys)
+c4.metric("Suspicious jumps", int(series["jumps"].sum()))
+st.markdown("""
+- **Gaps**: months missing between a series' first and last observation.  
+- **Duplicate (code, month)**: the same series and month appears more than once.  
+- **Suspicious jumps**: month-over-month changes far outside the series' usual range (robust z-score above 8).  
+- **Revised**: rows of appended monthly updates that replaced an existing observation.
+""")
+issues = series[(series[["gaps", "duplicate_keys", "jumps", "non_positive", "missing", "revised"]] > 0).any(axis=1)]
+if issues.empty:
+    st.success("No gaps, duplicate keys, jumps, non-positive or missing values in any series.")
+else:
+    st.dataframe(issues.sort_values(["jumps", "gaps"], ascending=False), use_container_width=True, hide_index=True)
+if not report.jumps.empty:
+    st.markdown("**Largest suspicious jumps**")
+    st.dataframe(report.jumps.round(2), use_container_width=True, hide_index=True)
+if report.bad_dates:
+    st.warning(f"{report.bad_dates} rows have a TIME_PERIOD that could not be read as a date.")
+
+# ---- Revisions across releases (only once several releases were recorded)
+store = VintageStore.for_data("data/DS_IPCH_M_data.csv")
+releases = store.releases()
+if len(releases) > 1:
+    st.subheader("Revisions across releases")
+    st.markdown(f"""
+**{len(releases)} releases** of the file are recorded (`python -m utils.vintage`), from **{releases["release"].iloc[0]}**
+to **{releases["release"].iloc[-1]}**. A **revision** is an observation whose value changed from one release to the next;
+its size is the change of the index in %.
+""")
+    st.dataframe(releases.drop(columns="source"), use_container_width=True, hide_index=True)
+    stats = store.revision_stats(by="division")
+    st.dataframe(stats.round(4), use_container_width=True, hide_index=True)
+    revised = stats[stats["revisions"] > 0]
+    if revised.empty:
+        st.success("No observation was revised between the recorded releases.")
+    else:
+        top = revised.iloc[0]
+        st.info(f"**{int(stats['revisions'].sum())}** observations were revised. The largest revisions on average "
+                f"were in **{top['expenditure_1999']}** (mean {top['mean_abs_pct']:.3f}% of the index, "
+                f"max {top['max_abs_pct']:.3f}%).")
@@ -3,11 +3,13 @@
 
 import streamlit as st
 import pandas as pd
-from utils.io import load_data, load_metadata, add_labels, basic_quality
+from utils.io import available_geos, load_data, data_version, basic_quality
+from utils.labels import load_labels
+from utils.prep import data_scope, resolve_geo
 
 st.title("Intro — Why this study? (France)")
 
-st.caption("Scope: 🇫🇷 France · Monthly · Not seasonally adjusted (HICP/IPCH) · One national series (no `geo` column)")
+st.caption(f"Scope: 🇫🇷 France · Monthly · Not seasonally adjusted (HICP/IPCH) · {data_scope()}")
 
 # ---- Narrative: the problem we want to answer
 st.markdown("""
@@ -27,8 +29,8 @@ instead of only watching one big number.
 """)
 
 # ---- Data at a glance (friendly facts, France)
-df_raw = load_data()
-meta = load_metadata()
+df_raw = load_data(version=data_version(), geo=resolve_geo())  # one country of a multi-country file
+labels = load_labels()
 info = basic_quality(df_raw)
 
 start = info["start"].date() if info["start"] is not None else None
@@ -52,10 +54,15 @@ c4, c5 = st.columns(2)
 c4.metric("All categories (codes)", f"{n_all_cats}")
 c5.metric("Top divisions present (CP01..CP12)", f"{n_divisions}")
 
-st.info("Note: This file contains a **single national series for France** (no geographical breakdown).")
+geos = available_geos()
+if len(geos) > 1:
+    st.info(f"Note: This file covers **{len(geos)} countries** ({', '.join(geos)}). The pages show **{resolve_geo()}**; "
+            "the Categories page compares it with the euro area.")
+else:
+    st.info("Note: This file contains a **single national series for France** (no geographical breakdown).")
 
 with st.expander("Small preview of the data (labels added)"):
-    st.dataframe(add_labels(df_raw.head(10), meta), use_container_width=True)
+    st.dataframe(labels.add(df_raw.head(10)), use_container_width=True)
 
 # ---- How we will answer the question (roadmap of the app, France)
 st.markdown("""
@@ -1,14 +1,18 @@
 # pages/2_Overview.py  — narrative added (above/below charts) + sidebar controls
 
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-from utils.prep import prepare_data, headline
+from utils.prep import prepare_detections, prepare_forecast, prepare_snapshot
+from utils.charts import annotate, line_figure
 
 st.title("Overview — Headline (CP00)")
 
-df = prepare_data()
-head = headline(df).dropna(subset=["yoy"])
+def in_range(df, start, end):
+    return df[df["date"].between(start, end)]
+
+snap = prepare_snapshot()
+query = snap.head_query  # sorted CP00 rows with prefix sums / sparse table: O(1) range stats
+head = query.frame
 
 if head.empty:
     st.warning("No CP00 (headline) series found.")
@@ -25,31 +29,36 @@ else:
         )
 
     start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
-    h = head[(head["date"] >= start_ts) & (head["date"] <= end_ts)].copy()
+    lo, hi = query.span(start_ts, end_ts)
+    h = head.iloc[lo:hi]
+    stats = query.summary(start_ts, end_ts)
 
     if h.empty:
         st.info("No data in this range.")
     else:
         # ---- Narrative (above the chart)
-        latest_yoy = h["yoy"].iloc[-1]
-        peak_yoy = h["yoy"].max()
-        peak_date = h.loc[h["yoy"].idxmax(), "date"].date()
-        avg12 = h["yoy"].tail(12).mean()
+        latest_yoy = stats["latest"]
+        peak_yoy = stats["peak"]
+        peak_date = stats["peak_date"].date()
+        avg12 = stats["tail_mean"]
         st.markdown(f"""
 **What this chart shows — in simple words**
 
 This line shows the **headline price change** (CP00), measured as **year-over-year (%)**.
 You selected **{start_ts.date()} → {end_ts.date()}**.
 We can already see the **peak** in this period (**{peak_yoy:.2f}%** in **{peak_date}**) and the **latest level** (**{latest_yoy:.2f}%**).
+Red ▼ mark the **peaks** and green ▲ the **troughs** of the inflation cycle; a dashed line marks a **change of pace** (the average monthly change shifted).
 """)
 
         # ---- Main chart (YoY)
-        fig = px.line(
-            h, x="date", y="yoy",
+        events = prepare_detections().select(["CP00"])
+        turning = in_range(events.turning, start_ts, end_ts)
+        fig = line_figure(
+            head, "date", "yoy", start=start_ts, end=end_ts,
             title="Headline inflation — Year-over-year (%)",
             labels={"yoy":"YoY (%)", "date":"Date"}
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(annotate(fig, turning, in_range(events.breaks, start_ts, end_ts)), use_container_width=True)
         st.caption("Help: Hover points to read exact values. The higher the line, the faster prices are increasing versus last year.")
 
         # ---- Conclusion (below chart)
@@ -58,14 +67,53 @@ We can already see the **peak** in this period (**{peak_yoy:.2f}%** in **{peak_d
 Over this period, headline inflation **peaked at {peak_yoy:.2f}%**, the latest reading is **{latest_yoy:.2f}%**,  
 and the **12-month average** is **{avg12:.2f}%**. This gives a clear sense of where prices stood and how they moved.
 """)
+        if not turning.empty:
+            last = turning.iloc[-1]
+            st.info(f"**Conclusion (cycle)**  • The period has **{(turning['kind'] == 'peak').sum()}** peaks and "
+                    f"**{(turning['kind'] == 'trough').sum()}** troughs. The last turning point is a **{last['kind']}** "
+                    f"at **{last['yoy']:.2f}%** in **{last['date']:%Y-%m}**.")
 
         # ---- Secondary chart (MoM)
         st.markdown("### Monthly change (MoM, %)")
         st.markdown("""
 This line shows the **month-over-month (%)** change.  
 Small positive values mean prices increased a bit versus the previous month; negative values mean they fell.
+Orange circles mark **unusual months**: far from the usual change for that time of year and that period.
 """)
-        st.line_chart(h.set_index("date")["mom"])
+        odd = in_range(events.outliers, start_ts, end_ts)
+        fig_mom = line_figure(head, "date", "mom", start=start_ts, end=end_ts,
+                              title="Headline inflation — Month-over-month (%)", labels={"mom": "MoM (%)", "date": "Date"})
+        st.plotly_chart(annotate(fig_mom, outliers=odd, y="mom"), use_container_width=True)
         st.caption("Help: MoM is more 'noisy' than YoY; look for clusters of positives/negatives.")
-        pos_last12 = (h["mom"].tail(12) > 0).sum()
-        st.info(f"**Conclusion (MoM)**  • In the last 12 months of the selected range, **{pos_last12}** months were positive (price increases), the others were flat/negative.")
+        pos_last12 = query.positives("mom", max(lo, hi - 12), hi)
+        unusual = f" **{len(odd)}** unusual month(s) in the range." if len(odd) else ""
+        st.info(f"**Conclusion (MoM)**  • In the last 12 months of the selected range, **{pos_last12}** months were positive (price increases), the others were flat/negative.{unusual}")
+
+    # ---- Forecast (next 12 months, independent of the selected period)
+    fc = prepare_forecast().series("CP00")
+    if not fc.empty:
+        st.markdown("### Next 12 months — forecast (YoY, %)")
+        st.markdown("""
+The dashed line continues the headline with a **simple statistical forecast**: the model
+(seasonal naive, exponential smoothing or a small autoregression — whichever predicted the last
+12 months best) extends the recent monthly changes and the usual calendar pattern.
+The dotted lines give an **80% range**: the further ahead, the wider it gets.
+""")
+        recent = head[head["date"] > head["date"].max() - pd.DateOffset(months=36)]
+        chart = pd.concat([
+            recent[["date", "yoy"]].assign(series="Observed"),
+            fc[["date", "yoy"]].assign(series="Forecast"),
+            fc[["date", "yoy_lo"]].rename(columns={"yoy_lo": "yoy"}).assign(series="80% range (low)"),
+            fc[["date", "yoy_hi"]].rename(columns={"yoy_hi": "yoy"}).assign(series="80% range (high)"),
+        ], ignore_index=True)
+        fig = line_figure(chart, "date", "yoy", color="series",
+                          title="Headline inflation — last 3 years and forecast (YoY, %)",
+                          labels={"yoy": "YoY (%)", "date": "Date", "series": ""})
+        fig.update_traces(line_dash="dash", selector={"name": "Forecast"})
+        fig.update_traces(line_dash="dot", selector=lambda t: t.name.startswith("80%"))
+        st.plotly_chart(fig, use_container_width=True)
+        end_fc = fc.iloc[-1]
+        spread = (f" (80% range {end_fc['yoy_lo']:.2f}% to {end_fc['yoy_hi']:.2f}%)"
+                  if pd.notna(end_fc["yoy_lo"]) and pd.notna(end_fc["yoy_hi"]) else "")
+        st.info(f"**Conclusion (forecast)**  • Headline inflation is expected around **{fc['yoy'].iloc[0]:.2f}%** next month "
+                f"and **{end_fc['yoy']:.2f}%** in **{end_fc['date']:%Y-%m}**{spread}.")
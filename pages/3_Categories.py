@@ -1,59 +1,39 @@
 # pages/3_Categories.py  — labels only + narrative + small multiples + sidebar
 
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-from utils.io import load_metadata, add_labels
-from utils.prep import prepare_data, top_categories, headline, last12_gap_vs_headline
+from utils.io import available_geos, load_weights
+from utils.labels import load_labels
+from utils.prep import prepare_detections, prepare_geo_panel, prepare_snapshot, resolve_geo
+from utils.hierarchy import drill_down
+from utils.contributions import contributions
+from utils.charts import line_figure
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")  # imported on first chart only
 
 st.title("Categories — Compare with the headline")
 
-# Fallback labels for CP00..CP12 (used if metadata misses some)
-FALLBACK = {
-    "CP00":"All items",
-    "CP01":"Food and non-alcoholic beverages",
-    "CP02":"Alcoholic beverages, tobacco and narcotics",
-    "CP03":"Clothing and footwear",
-    "CP04":"Housing, water, electricity, gas and other fuels",
-    "CP05":"Furnishings, household equipment and routine household maintenance",
-    "CP06":"Health",
-    "CP07":"Transport",
-    "CP08":"Communication",
-    "CP09":"Recreation and culture",
-    "CP10":"Education",
-    "CP11":"Restaurants and hotels",
-    "CP12":"Miscellaneous goods and services",
-}
-
-df = prepare_data()
-cats = top_categories(df)
-head = headline(df)
-
-# Build mapping: metadata + fallbacks
-meta = load_metadata()  # columns: expenditure_1999, expenditure_label
-fallback_df = pd.DataFrame(list(FALLBACK.items()),
-                           columns=["expenditure_1999","expenditure_label"])
-mapping = pd.concat([meta, fallback_df], ignore_index=True)\
-            .drop_duplicates(subset=["expenditure_1999"], keep="first")
+snap = prepare_snapshot()
+cats = snap.cats
+head = snap.head
+
+# Compiled code <-> label dictionary: metadata + fallbacks
+labels = load_labels()
 
 # Attach human labels to categories
-cats = add_labels(cats, mapping)  # adds 'expenditure_label'
-if "expenditure_label" not in cats.columns:
-    st.error("No category labels available. Check metadata file.")
-    st.stop()
+cats = labels.add(cats)  # adds 'expenditure_label'
 
 # Sidebar selector with labels only
 label_options = sorted(cats["expenditure_label"].dropna().unique().tolist())
-code_to_label = dict(mapping[["expenditure_1999","expenditure_label"]].dropna().values)
-default_labels = [code_to_label[c] for c in ["CP01","CP04","CP07"]
-                  if c in code_to_label and code_to_label[c] in label_options]
+default_labels = [labels.label(c) for c in ["CP01","CP04","CP07"]
+                  if labels.label(c) in label_options]
 
 with st.sidebar:
     picked_labels = st.multiselect("Pick categories", options=label_options, default=default_labels)
 
 if picked_labels:
-    picked_codes = mapping.loc[mapping["expenditure_label"].isin(picked_labels),
-                               "expenditure_1999"].unique().tolist()
+    picked_codes = labels.codes_for(picked_labels)
     g = cats[cats["expenditure_1999"].isin(picked_codes)].copy().dropna(subset=["yoy"])
 
     # ---- Narrative (above combined chart)
@@ -66,7 +46,7 @@ The **headline** (all items) is plotted to compare if a category is **above** (p
 
     # Combined chart (selected categories + headline)
     g["series"] = g["expenditure_label"]
-    head_label = code_to_label.get("CP00", "All items")
+    head_label = labels.label("CP00", default="All items")
     h = head[["date","yoy"]].dropna().copy()
     h["series"] = head_label
 
@@ -74,8 +54,8 @@ The **headline** (all items) is plotted to compare if a category is **above** (p
         [g[["date","yoy","series"]], h],
         ignore_index=True
     )
-    fig = px.line(
-        plot_df, x="date", y="yoy", color="series",
+    fig = line_figure(
+        plot_df, "date", "yoy", color="series",
         title="Selected categories vs headline — Year-over-year (%)",
         labels={"yoy":"YoY (%)","date":"Date","series":"Series"}
     )
@@ -83,9 +63,9 @@ The **headline** (all items) is plotted to compare if a category is **above** (p
     st.caption("Help: Click labels in the legend to hide/show lines. This helps focus on one or two series at a time.")
 
     # ---- Conclusion (below combined chart) using last-12-months gap for picked categories only
-    gap_all = last12_gap_vs_headline(cats, head)                         # all categories
+    gap_all = snap.gap                                                   # all categories
     gap_sel = gap_all[gap_all["expenditure_1999"].isin(picked_codes)]    # only selected
-    gap_sel = gap_sel.merge(mapping, on="expenditure_1999", how="left")
+    gap_sel = labels.add(gap_sel)
     if not gap_sel.empty:
         top_above = gap_sel.sort_values("diff", ascending=False).head(1)
         top_below = gap_sel.sort_values("diff", ascending=True).head(1)
@@ -103,8 +83,8 @@ while **{below_name}** sat **below** the headline by **{below_gap:.2f} pp** amon
     st.markdown("### Small multiples — one panel per category")
     st.markdown("This view separates each selected category to make its trend easier to read.")
     facet_df = g.rename(columns={"expenditure_label":"category"}).copy()
-    fig_facets = px.line(
-        facet_df, x="date", y="yoy",
+    fig_facets = line_figure(
+        facet_df, "date", "yoy",
         facet_col="category", facet_col_wrap=3, height=700,
         labels={"yoy":"YoY (%)","date":"Date","category":"Category"},
         title="Year-over-year (%) per selected category"
@@ -113,5 +93,113 @@ while **{below_name}** sat **below** the headline by **{below_gap:.2f} pp** amon
     st.caption("Help: Read panels left-to-right, then top-to-bottom. Look for peaks or long periods above 0%.")
     med_tbl = facet_df.groupby("category")["yoy"].median().sort_values(ascending=False)
     st.info(f"**Conclusion (small multiples)**  • Median YoY is highest for **{med_tbl.index[0]}** at **{med_tbl.iloc[0]:.2f}%** among the selected categories.")
+
+    # ---- Turning points / unusual months of the selected categories
+    st.markdown("### Turning points and unusual months")
+    st.markdown("""
+For each selected category: its **last turning point** (the last **peak** or **trough** of its YoY),
+how many peaks and troughs it had, **changes of pace** (the average monthly change shifted for good)
+and **unusual months** (a monthly change far from the usual one for that time of year).
+""")
+    events = prepare_detections().select(picked_codes)
+    last_turn = events.turning.groupby("expenditure_1999", observed=True).tail(1).set_index("expenditure_1999")
+    table = events.counts().set_index("expenditure_1999").join(
+        last_turn[["kind", "date", "yoy"]].rename(columns={"kind": "last_turn", "date": "last_turn_date", "yoy": "last_turn_yoy"}))
+    table = labels.add(table.reset_index(), name="category")
+    st.dataframe(table[["category", "last_turn", "last_turn_date", "last_turn_yoy", "peak", "trough", "breaks", "outliers"]].round(2),
+                 use_container_width=True, hide_index=True)
+    if not last_turn.empty:
+        latest = table.dropna(subset=["last_turn_date"]).sort_values("last_turn_date").iloc[-1]
+        st.info(f"**Conclusion (turning points)**  • Most recent turn: **{latest['category']}** hit a **{latest['last_turn']}** "
+                f"in **{latest['last_turn_date']:%Y-%m}** (YoY **{latest['last_turn_yoy']:.2f}%**).")
+
+    # ---- Across countries (multi-country files only): gap to the euro-area / EU aggregate
+    if len(available_geos()) > 1:
+        cube = prepare_geo_panel()
+        geo, reference = resolve_geo(), cube.reference()  # same default file as prepare_geo_panel
+        st.markdown("### Across countries — above or below the euro area?")
+        if reference is None:
+            st.caption("The file has several countries but no euro-area / EU aggregate to compare with.")
+        else:
+            st.markdown(f"""
+Each cell is a country's **average YoY over the last 12 months minus {reference}'s** for the same category.  
+Positive (red) means prices rose **faster** than in {reference}; negative (blue) **slower**.
+""")
+            gaps = cube.gap_vs(reference)
+            gaps = gaps[gaps["expenditure_1999"].astype(str).isin(picked_codes) & (gaps["geo"].astype(str) != reference)]
+            gaps = labels.add(gaps, name="category")
+            grid = gaps.pivot_table(index="geo", columns="category", values="gap", observed=True)
+            fig_geo = px.imshow(grid.round(2), color_continuous_scale="RdBu_r", color_continuous_midpoint=0, aspect="auto",
+                                text_auto=True, title=f"Last 12 months YoY minus {reference} (pp)",
+                                labels={"x": "Category", "y": "Country", "color": "Gap (pp)"})
+            st.plotly_chart(fig_geo, use_container_width=True)
+            own = gaps[gaps["geo"].astype(str) == geo].sort_values("gap")
+            if not own.empty:
+                hot, cool = own.iloc[-1], own.iloc[0]
+                st.info(f"**Conclusion (across countries)**  • In **{geo}**, **{hot['category']}** ran **{hot['gap']:+.2f} pp** "
+                        f"against {reference}, **{cool['category']}** **{cool['gap']:+.2f} pp** (last 12 months).")
 else:
     st.info("Pick at least one category on the left to see the charts.")
+
+# ---- Drill-down: sub-indices (groups / classes) inside one category
+st.markdown("### Drill down — what moves inside a category?")
+tree, tree_stats = snap.tree, snap.tree_stats
+divisions = [c for c in tree.children.get("CP00", []) if tree.children.get(c)]
+if divisions:
+    st.markdown("""
+Pick a category to list its **sub-indices** (e.g. food → bread, meat, …).  
+The **gap** is each sub-index's average YoY over the last 12 months **minus its parent category**.
+""")
+    div_labels = {labels.label(c, default=c): c for c in divisions}
+    drill_label = st.selectbox("Category to drill into", list(div_labels))
+    depth = st.radio("Depth", [1, 2, 3], horizontal=True, format_func=lambda d: {1: "Groups", 2: "+ Classes", 3: "+ Sub-classes"}[d])
+    sub = drill_down(tree_stats, tree, div_labels[drill_label], depth=depth).iloc[1:]
+    sub = labels.add(sub, name="sub_index", keep_code=True)
+    sub["sub_index"] = sub["sub_index"].str.strip()
+    st.dataframe(
+        sub[["sub_index","level","latest_yoy","avg_yoy","gap_parent","vol","persistence"]].round(2),
+        use_container_width=True, hide_index=True,
+    )
+    if not sub["gap_parent"].dropna().empty:
+        top_sub = sub.loc[sub["gap_parent"].idxmax()]
+        st.info(f"**Conclusion (drill-down)**  • Inside **{drill_label}**, **{top_sub['sub_index']}** ran hottest, **{top_sub['gap_parent']:.2f} pp** above its parent over the last 12 months.")
+else:
+    st.caption("No sub-indices below the divisions in this dataset.")
+
+# ---- Contributions: percentage points each category adds to the headline (needs item weights)
+st.markdown("### Contributions — how many points did each category add?")
+weights = load_weights()
+if weights.empty:
+    st.caption("Contributions need the HICP item weights: save Eurostat's `prc_hicp_inw` export (same CSV layout) as `data/DS_IPCH_W_data.csv`.")
+else:
+    st.markdown("""
+Each bar splits the **headline rate** into the **percentage points added by each category** (its weight × its own price change).  
+Bars above zero pushed prices **up**, bars below zero pulled them **down**; the line is the headline itself.
+""")
+    parent_options = {labels.label("CP00", default="All items"): "CP00"}
+    parent_options.update({labels.label(c, default=c): c for c in tree.children.get("CP00", []) if tree.children.get(c)})
+    col_parent, col_rate = st.columns(2)
+    parent_label = col_parent.selectbox("Contributions to", list(parent_options))
+    rate = col_rate.radio("Rate", ["YoY", "MoM"], horizontal=True)
+    contrib = contributions(snap.panel, weights, parent_options[parent_label], of=rate.lower())
+    if contrib.empty:
+        st.caption("No weights for the sub-indices of this category.")
+    else:
+        first_year, last_year = contrib["date"].dt.year.min(), contrib["date"].dt.year.max()
+        since = st.slider("From year", int(first_year), int(last_year), int(max(first_year, last_year - 4)))
+        contrib = contrib[contrib["date"].dt.year >= since]
+        contrib = labels.add(contrib, name="category", keep_code=True)
+        contrib["category"] = contrib["category"].str.strip()
+        fig_contrib = px.bar(
+            contrib, x="date", y="contribution", color="category", barmode="relative",
+            title=f"Contributions to {parent_label} — {rate} (percentage points)",
+            labels={"contribution": "Contribution (pp)", "date": "Date", "category": "Category"},
+        )
+        total = contrib.drop_duplicates("date")
+        fig_contrib.add_scatter(x=total["date"], y=total["total"], mode="lines", name=f"{parent_label} ({rate}, %)",
+                                line={"color": "black"})
+        st.plotly_chart(fig_contrib, use_container_width=True)
+        st.caption("Help: contributions add up to the line, up to the rounding of the published indices.")
+        latest = contrib[contrib["date"] == contrib["date"].max()]
+        top = latest.loc[latest["contribution"].abs().idxmax()]
+        st.info(f"**Conclusion (contributions)**  • In **{top['date']:%Y-%m}**, **{top['category']}** moved **{parent_label}** the most: **{top['contribution']:+.2f} pp** of a **{top['total']:.2f}%** {rate}.")
@@ -1,18 +1,20 @@
 # pages/4_Volatility.py  — narrative + conclusion + sidebar (no controls needed, but consistent)
 
 import streamlit as st
-import plotly.express as px
-from utils.io import load_metadata, add_labels
-from utils.prep import prepare_data, top_categories, volatility_persistence, compute_rates
+from utils.labels import load_labels
+from utils.prep import prepare_snapshot
+from utils.charts import line_figure
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")  # imported on first chart only
 
 st.title("Volatility — Which categories move the most?")
 
-df = prepare_data()
-cat_yoy = compute_rates(top_categories(df))
-scores = volatility_persistence(cat_yoy)
+snap = prepare_snapshot()
+scores = snap.scores
 
-meta = load_metadata()
-scores = add_labels(scores, meta).rename(columns={"expenditure_label":"category"})
+labels = load_labels()
+scores = labels.add(scores, name="category")
 
 # ---- Narrative (above chart)
 st.markdown("""
@@ -44,3 +46,25 @@ Most stable categories: **{', '.join(bot3_vol['category'].fillna(bot3_vol.get('e
 
 # Table
 st.dataframe(scores[["category","vol","persistence"]].round(3), use_container_width=True)
+
+# ---- Rolling volatility (how it evolves over time)
+st.markdown("### How volatility evolves — rolling window")
+with st.sidebar:
+    window = st.radio("Rolling window (months)", sorted(snap.rolling_vol), index=len(snap.rolling_vol) - 1)
+st.markdown(f"""
+Each line is the **volatility (std of YoY)** over the **previous {window} months**, for the three most volatile categories.  
+A rising line means the category became **less predictable** over that stretch.
+""")
+roll = snap.rolling_vol[window]
+roll = labels.add(roll[roll["expenditure_1999"].isin(top3_vol["expenditure_1999"])], name="category")
+if roll.empty:
+    st.info(f"Not enough history for a {window}-month window.")
+else:
+    fig_roll = line_figure(
+        roll, "date", "vol", color="category",
+        title=f"Rolling {window}-month volatility (std of YoY)",
+        labels={"vol":"Volatility (std YoY)","date":"Date","category":"Category"}
+    )
+    st.plotly_chart(fig_roll, use_container_width=True)
+    latest = roll.sort_values("date").groupby("category").tail(1).sort_values("vol", ascending=False)
+    st.info(f"**Conclusion (rolling)**  • Right now, **{latest['category'].iloc[0]}** is the most volatile over the last {window} months (std **{latest['vol'].iloc[0]:.2f}**).")
@@ -1,25 +1,27 @@
 # pages/5_Seasonality.py  — narrative + conclusion + sidebar selector
 
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-from utils.io import load_metadata
-from utils.prep import prepare_data, top_categories, compute_rates, seasonality_profiles
+from utils.labels import load_labels
+from utils.prep import prepare_snapshot
+from utils.seasonality import parse_regimes
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")  # imported on first chart only
 
 st.title("Seasonality — Before vs After 2020")
 
-df = prepare_data()
-cat_yoy = compute_rates(top_categories(df))
-prof = seasonality_profiles(cat_yoy, pre=(2016, 2019), post=(2020, 2025))
+snap = prepare_snapshot()
+prof = snap.seasonality  # pre=(2016, 2019), post=(2020, 2025)
 
-meta = load_metadata()
-prof = prof.merge(meta, how="left", on="expenditure_1999")  # adds expenditure_label
+labels = load_labels()
+prof = labels.add(prof)  # adds expenditure_label
 
-labels = sorted(prof["expenditure_label"].dropna().unique().tolist())
+label_options = sorted(prof["expenditure_label"].dropna().unique().tolist())
 with st.sidebar:
-    chosen_label = st.selectbox("Pick a category", labels)
+    chosen_label = st.selectbox("Pick a category", label_options)
 
-chosen_codes = meta.loc[meta["expenditure_label"] == chosen_label, "expenditure_1999"].unique().tolist()
+chosen_codes = labels.codes(chosen_label)
 p = prof[prof["expenditure_1999"].isin(chosen_codes)].copy().sort_values("month")
 
 # ---- Narrative (above chart)
@@ -59,3 +61,30 @@ This helps spot when this category tends to move more in the year.
 """)
 else:
     st.info("No clear seasonality difference detected for this category.")
+
+# ---- Any split of the years: seasonal factors per regime (classical decomposition)
+st.markdown("### Compare your own periods")
+st.markdown("""
+Type any periods (e.g. `1996-2007, 2008-2019, 2020-`). For each one, the line shows how far each month usually sits  
+**above or below the trend** (in %), once the long-run trend has been removed — the category's **seasonal pattern** in that period.
+""")
+regime_text = st.text_input("Periods (years)", "1996-2007, 2008-2019, 2020-")
+try:
+    regimes = parse_regimes(regime_text)
+except ValueError as err:
+    regimes = ()
+    st.warning(str(err))
+if regimes:
+    factors = snap.seasonal.factor_frame(regimes, codes=chosen_codes)
+    factors = factors.assign(seasonal_pct=(factors["factor"] - 1) * 100)
+    if factors.empty:
+        st.info("No data for these periods.")
+    else:
+        fig_regimes = px.line(
+            factors, x="month", y="seasonal_pct", color="regime", markers=True,
+            title=f"Seasonal pattern by period — {chosen_label}",
+            labels={"seasonal_pct":"vs trend (%)","month":"Month","regime":"Period"}
+        )
+        st.plotly_chart(fig_regimes, use_container_width=True)
+        amplitude = factors.groupby("regime")["seasonal_pct"].agg(lambda s: s.max() - s.min()).sort_values()
+        st.info(f"**Conclusion (periods)**  • The seasonal swing is widest in **{amplitude.index[-1]}** ({amplitude.iloc[-1]:.2f} pp between the highest and lowest month) and narrowest in **{amplitude.index[0]}** ({amplitude.iloc[0]:.2f} pp).")
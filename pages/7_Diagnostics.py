@@ -0,0 +1,77 @@
+# pages/7_Diagnostics.py
+# Where the time goes: timing spans and cache hits/misses of this app process
+
+import json
+
+import pandas as pd
+import streamlit as st
+from utils import trace
+from utils.cache import cache_stats, get_backend, reset_stats
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")
+
+st.title("Diagnostics — What is slow, and is the cache working?")
+st.caption("For maintainers · Timings of this server process since it started (or since the last reset)")
+
+st.markdown("""
+Every data-loading and preparation step (`utils.io`, `utils.prep`, the snapshot and the store)
+and every chart (figure building and sending it to the browser) can be timed.
+Timing is **off by default**; start the app with `HICP_TRACE=1` or switch it on below,
+then open the other pages and come back here.
+""")
+
+if not trace.enabled():
+    st.warning("Timing is off — only cache hits/misses are being counted.")
+    if st.button("Start timing"):
+        trace.enable()
+        st.rerun()
+
+# ---- 1) Slowest steps
+st.subheader("1) Which steps take the most time?")
+st.markdown("Total time spent in each step (all calls), longest first. A step's time includes the steps it calls.")
+spans = pd.DataFrame(trace.stats())
+if spans.empty:
+    st.info("No timings yet: switch timing on and browse the other pages.")
+else:
+    top = spans.head(15)
+    fig = px.bar(top.iloc[::-1], x="total_ms", y="name", orientation="h",
+                 labels={"total_ms": "Total time (ms)", "name": ""}, title="Top steps by total time")
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(spans.round(2), use_container_width=True, hide_index=True)
+
+# ---- 2) Cache
+st.subheader("2) Are the cached steps reused?")
+st.markdown(f"""
+Cached steps should mostly be **hits** after the first visit; a step with many misses
+is recomputed on every rerun. Cache backend in use: **{get_backend()}**.
+""")
+caches = pd.DataFrame(cache_stats())
+if caches.empty:
+    st.info("No cached step has been called yet.")
+else:
+    st.dataframe(caches.assign(hit_rate=(caches["hit_rate"] * 100).round(1)).rename(columns={"hit_rate": "hit_rate_%"}),
+                 use_container_width=True, hide_index=True)
+
+# ---- 3) Latest calls
+with st.expander("Latest timed calls"):
+    latest = pd.DataFrame(trace.recent(200))
+    if latest.empty:
+        st.write("Nothing recorded yet.")
+    else:
+        latest["ts"] = pd.to_datetime(latest["ts"], unit="s")
+        st.dataframe(latest.round({"ms": 2}), use_container_width=True, hide_index=True)
+
+col1, col2 = st.columns(2)
+col1.download_button("Download metrics (JSON)", json.dumps(trace.metrics(), default=str, indent=1),
+                     file_name="hicp_metrics.json", mime="application/json")
+if col2.button("Reset timings and counters"):
+    trace.reset()
+    reset_stats()
+    st.rerun()
+
+if not spans.empty:
+    slowest = spans.iloc[0]
+    st.success(f"Conclusion: **{slowest['name']}** takes the most time so far "
+               f"({slowest['total_ms']:.0f} ms over {int(slowest['calls'])} calls, "
+               f"{slowest['mean_ms']:.1f} ms per call).")
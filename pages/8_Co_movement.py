@@ -0,0 +1,98 @@
+# pages/8_Co_movement.py  — narrative + conclusion + sidebar selectors
+
+import streamlit as st
+from utils.labels import load_labels
+from utils.prep import prepare_comovement
+from utils.charts import line_figure
+from utils.lazy import lazy_import
+
+px = lazy_import("plotly.express")  # imported on first chart only
+
+st.title("Co-movement — Which categories move together?")
+
+labels = load_labels()
+
+with st.sidebar:
+    rate = st.radio("Rate", ["YoY", "MoM"], help="Correlate year-over-year or month-over-month changes")
+    scope = st.radio("Series", ["Divisions (CP01–CP12)", "All sub-indices"])
+    k = st.slider("Number of groups", 2, 6, 4)
+
+co = prepare_comovement(what=rate.lower())
+pattern = r"^CP(0[1-9]|1[0-2])$" if scope.startswith("Divisions") else r"^CP(?!00$)"
+codes = co.codes.astype(str)[co.codes.astype(str).str.match(pattern)].tolist()
+name = dict(zip(codes, labels.labels(codes, keep_code=True)))
+
+# ---- 1) Correlation heatmap, grouped
+st.subheader("1) Who moves with whom?")
+st.markdown(f"""
+**What this chart shows — in simple words**
+
+Each cell is the **correlation** of the {rate} of two categories over the whole history:
+**+1** (dark red) they rise and fall together, **0** unrelated, **−1** (blue) opposite directions.
+Categories are **ordered by group** (similar categories sit next to each other).
+""")
+groups = co.clusters(codes, k)
+order = groups["expenditure_1999"].tolist()
+mat = co.matrix(order)
+axis = [name[c] for c in order] if len(order) <= 20 else order
+fig = px.imshow(mat.to_numpy(), x=axis, y=axis, zmin=-1, zmax=1, color_continuous_scale="RdBu_r",
+                title=f"Correlation of {rate} between categories", aspect="auto")
+st.plotly_chart(fig, use_container_width=True)
+
+pairs = co.pairs(codes)
+if pairs.empty:
+    st.info("Not enough overlapping history to correlate these series.")
+else:
+    top, bottom = pairs.iloc[0], pairs.iloc[-1]
+    st.success(f"""
+**Conclusion**
+Most in step: **{name[top['code_a']]}** and **{name[top['code_b']]}** (correlation **{top['corr']:.2f}**).
+Least in step: **{name[bottom['code_a']]}** and **{name[bottom['code_b']]}** (**{bottom['corr']:.2f}**).
+""")
+
+# ---- 2) Groups
+st.subheader("2) Groups of categories")
+st.markdown(f"Categories are split into **{k} groups** whose {rate} move most alike (average correlation within a group is high).")
+groups = labels.add(groups, name="category")
+st.dataframe(groups[["cluster", "expenditure_1999", "category"]], use_container_width=True, hide_index=True)
+
+# ---- 3) Co-movement over time
+st.subheader("3) Do categories move together more than before?")
+st.markdown(f"""
+The line is the **average correlation between the divisions** over the **previous {co.window} months**.
+When it rises, prices of different categories are driven by the **same shock** (e.g. energy, a general inflation wave).
+""")
+index = co.index.dropna(subset=["mean_corr"])
+if index.empty:
+    st.info(f"Not enough history for a {co.window}-month window.")
+else:
+    fig_index = line_figure(index, "date", "mean_corr", title=f"Average correlation between divisions ({rate}, rolling {co.window} months)",
+                            labels={"mean_corr": "Average correlation", "date": "Date"})
+    st.plotly_chart(fig_index, use_container_width=True)
+    now, peak = index.iloc[-1], index.loc[index["mean_corr"].idxmax()]
+    st.info(f"**Conclusion (over time)**  • Now: **{now['mean_corr']:.2f}** (history average {index['mean_corr'].mean():.2f}). "
+            f"Categories moved together the most in the window ending **{peak['date']:%Y-%m}** (**{peak['mean_corr']:.2f}**).")
+
+# ---- 4) Lead / lag between two categories
+st.subheader("4) Does one category lead another?")
+col1, col2 = st.columns(2)
+a = col1.selectbox("Category A", codes, format_func=lambda c: name[c])
+b = col2.selectbox("Category B", codes, index=min(1, len(codes) - 1), format_func=lambda c: name[c])
+st.markdown(f"""
+Each bar is the correlation of **A** with **B** some months **later** (right, positive lag) or **earlier** (left).
+The highest bar on the right means **A leads B** by that many months.
+""")
+ll = co.lead_lag(a, b)
+fig_ll = px.bar(ll, x="lag", y="corr", title=f"{name[a]} vs {name[b]}: correlation by lag",
+                labels={"lag": "Lag (months, A before B if > 0)", "corr": "Correlation"})
+st.plotly_chart(fig_ll, use_container_width=True)
+if a == b or ll["corr"].isna().all():
+    st.info("Pick two different categories with overlapping history.")
+elif ll["corr"].max() <= 0:
+    st.info(f"**Conclusion (lead / lag)**  • {name[a]} and {name[b]} do not move in the same direction at any lag.")
+else:
+    best = ll.loc[ll["corr"].idxmax()]
+    lag = int(best["lag"])
+    lead = (f"**{name[a]}** leads **{name[b]}** by **{lag}** months" if lag > 0 else
+            f"**{name[b]}** leads **{name[a]}** by **{-lag}** months" if lag < 0 else "they move in the **same month**")
+    st.success(f"**Conclusion (lead / lag)**  • Strongest link (correlation **{best['corr']:.2f}**): {lead}.")
@@ -0,0 +1,303 @@
+"""Local HTTP / JSON (or Arrow) API over the prep layer, for tools that need the numbers, not the pages.
+
+    python -m utils.api                                  # http://127.0.0.1:8765
+    python -m utils.api data/eurostat.csv --geo DE --port 9000
+
+    GET /v1/headline?start=2020-01&end=2024-12
+    GET /v1/categories?codes=CP01,CP07&start=2022-01
+    GET /v1/series?codes=CP0111,CP0451          any code of the panel
+    GET /v1/gap?codes=CP01,CP04                 last 12 months YoY minus headline
+    GET /v1/volatility?window=36&start=2020-01  full history without ``window``
+    GET /v1/seasonality?regimes=pre:2016-2019,post:2020-
+    GET /v1/forecast?codes=CP00&horizon=12
+    GET /v1/comovement?codes=CP01,CP07,CP11&what=mom   pairs: correlation and best lead / lag
+    GET /v1/geo_gap?codes=CP01&geos=FR,DE&reference=EA&window=12   country minus reference, last months YoY
+    GET /v1/version
+
+Add ``format=arrow`` (or ``Accept: application/vnd.apache.arrow.stream``) for an Arrow IPC
+stream, ``labels=1`` for a label column. Runs on Tornado (already installed with
+Streamlit). Every response carries an ETag derived from the data version and the query,
+so ``If-None-Match`` gets a 304 until the CSV changes. Work runs in a thread pool; the
+snapshot and each encoded response are computed once per data version, and concurrent
+requests for the same thing wait for the same computation.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.panel import CODE_COL
+
+VERSION_TTL = 1.0   # seconds between checks of the data version
+RESULTS = 256       # encoded responses kept (all versions together)
+ARROW = "application/vnd.apache.arrow.stream"
+
+# ---- query parameters -> normalized (hashable) values
+def _month(text: str) -> str:
+    try:
+        p = pd.Period(text, freq="M")
+    except ValueError:
+        raise ValueError(f"cannot read date {text!r} (expected YYYY-MM)") from None
+    return str(p)
+
+def _codes(text: str) -> tuple:
+    return tuple(sorted({c.strip().upper() for c in text.split(",") if c.strip()}))
+
+def _int(low: int, high: int):
+    def parse(text: str) -> int:
+        if not text.isdigit() or not low <= int(text) <= high:
+            raise ValueError(f"expected a whole number between {low} and {high}, got {text!r}")
+        return int(text)
+    return parse
+
+def _regimes(text: str) -> tuple:
+    from utils.seasonality import parse_regimes
+    return parse_regimes(text)
+
+def _rate(text: str) -> str:
+    if text not in ("yoy", "mom"):
+        raise ValueError(f"expected yoy or mom, got {text!r}")
+    return text
+
+def _geo(text: str) -> str:
+    geo = text.strip().upper()
+    if not geo.replace("_", "").isalnum():
+        raise ValueError(f"cannot read country {text!r} (expected a code such as FR or EA20)")
+    return geo
+
+def _flag(text: str) -> bool:
+    return text.lower() in ("1", "true", "yes")
+
+PARAMS = {"start": _month, "end": _month, "codes": _codes, "window": _int(1, 240),
+          "regimes": _regimes, "horizon": _int(1, 36), "what": _rate, "top": _int(1, 100_000), "geos": _codes, "reference": _geo,
+          "labels": _flag, "format": str}
+
+def parse_query(allowed: tuple, query: dict) -> dict:
+    out = {}
+    for key, values in query.items():
+        if key not in allowed and key not in ("labels", "format"):
+            raise ValueError(f"unknown parameter {key!r} (allowed: {', '.join(allowed + ('labels', 'format'))})")
+        out[key] = PARAMS[key](values[-1].decode() if isinstance(values[-1], bytes) else values[-1])
+    if out.get("format", "json") not in ("json", "arrow"):
+        raise ValueError("format must be json or arrow")
+    return out
+
+# ---- endpoints: (snapshot, params) -> DataFrame, run in the thread pool
+def _between(df: pd.DataFrame, q: dict) -> pd.DataFrame:
+    if "start" in q:
+        df = df[df["date"] >= pd.Period(q["start"], freq="M").to_timestamp()]
+    if "end" in q:
+        df = df[df["date"] <= pd.Period(q["end"], freq="M").to_timestamp()]
+    return df
+
+def _only(df: pd.DataFrame, q: dict) -> pd.DataFrame:
+    return df[df[CODE_COL].astype(str).isin(q["codes"])] if "codes" in q else df
+
+def headline(service, snap, q):
+    return _between(snap.head, q)
+
+def categories(service, snap, q):
+    return _between(_only(snap.cats, q), q)
+
+def series(service, snap, q):
+    codes = q.get("codes") or ("CP00",)
+    return _between(snap.panel.select(list(codes)).to_frame(), q)
+
+def gap(service, snap, q):
+    return _only(snap.gap, q)
+
+def volatility(service, snap, q):
+    if "window" not in q:
+        return _only(snap.scores, q)
+    if q["window"] in snap.rolling_vol:
+        return _between(_only(snap.rolling_vol[q["window"]], q), q)
+    from utils.prep import rolling_volatility
+    return _between(_only(rolling_volatility(snap.panel.match(r"^CP\d{2}$"), q["window"]), q), q)
+
+def seasonality(service, snap, q):
+    from utils.snapshot import REGIMES
+    codes = q.get("codes") or snap.panel.match(r"^CP\d{2}$").codes
+    return snap.seasonal.profile_frame(q.get("regimes", REGIMES), codes=codes)
+
+def forecast(service, snap, q):
+    from utils.prep import _forecast
+    return _between(_only(_forecast(service.path, snap.version, service.geo, q.get("horizon", 12)).frame, q), q)
+
+def comovement(service, snap, q):
+    from utils.prep import _comovement
+    co = _comovement(service.path, snap.version, service.geo, q.get("what", "yoy"))
+    return co.pairs(q.get("codes"), q.get("top"))
+
+def geo_gap(service, snap, q):
+    # Every country of the file, not only the one the service was started for
+    from utils.prep import _geo_panel
+    out = _only(_geo_panel(service.path, snap.version).gap_vs(q.get("reference"), q.get("window", 12)), q)
+    return out[out["geo"].astype(str).isin(q["geos"])] if "geos" in q else out
+
+ENDPOINTS = {
+    "headline": (headline, ("start", "end")),
+    "categories": (categories, ("codes", "start", "end")),
+    "series": (series, ("codes", "start", "end")),
+    "gap": (gap, ("codes",)),
+    "volatility": (volatility, ("codes", "window", "start", "end")),
+    "seasonality": (seasonality, ("codes", "regimes")),
+    "forecast": (forecast, ("codes", "horizon", "start", "end")),
+    "comovement": (comovement, ("codes", "what", "top")),
+    "geo_gap": (geo_gap, ("codes", "geos", "reference", "window")),
+}
+
+def encode(df: pd.DataFrame, version: str, fmt: str) -> bytes:
+    if fmt == "arrow":
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"version": version.encode()})
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    out = df.copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = out[c].dt.strftime("%Y-%m-%d")
+    records = out.to_json(orient="records", force_ascii=False)
+    return f'{{"version": {json.dumps(version)}, "count": {len(out)}, "data": {records}}}'.encode()
+
+# ---- shared state of the server
+class Service:
+    """Data version, snapshot and encoded responses shared by all requests."""
+
+    def __init__(self, path: str, geo: str | None, meta: str, threads: int = 4):
+        self.path, self.geo, self.meta = path, geo, meta
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="hicp-api")
+        self._results: OrderedDict = OrderedDict()
+        self._pending: dict = {}
+        self._version = (0.0, None)
+
+    async def _once(self, key, build, keep: bool = False):
+        # Single flight: callers asking for ``key`` while it is being built wait for that build
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+        if key not in self._pending:
+            self._pending[key] = asyncio.get_running_loop().run_in_executor(self.pool, build)
+        try:
+            value = await asyncio.shield(self._pending[key])
+        finally:
+            self._pending.pop(key, None)
+        if keep:
+            self._results[key] = value
+            while len(self._results) > RESULTS:
+                self._results.popitem(last=False)
+        return value
+
+    async def version(self) -> str:
+        checked, version = self._version
+        if version is None or time.monotonic() - checked > VERSION_TTL:
+            from utils.io import data_version
+            version = await self._once(("version",), lambda: data_version(self.path))
+            self._version = (time.monotonic(), version)
+        return version
+
+    async def snapshot(self, version: str):
+        from utils.prep import _snapshot
+        return await self._once(("snapshot", version), lambda: _snapshot(self.path, version, self.geo))
+
+    async def response(self, name: str, q: dict, version: str) -> bytes:
+        func, _ = ENDPOINTS[name]
+        key = (name, tuple(sorted(q.items())), version)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+        snap = await self.snapshot(version)
+
+        def build():
+            df = func(self, snap, q)
+            if q.get("labels") and CODE_COL in df.columns:
+                from utils.labels import load_labels
+                df = load_labels(self.meta).add(df)
+            return encode(df.reset_index(drop=True), version, q.get("format", "json"))
+
+        return await self._once(key, build, keep=True)
+
+def make_app(service: Service):
+    import tornado.web
+
+    class Base(tornado.web.RequestHandler):
+        def write_error(self, status_code: int, **kwargs):
+            exc = kwargs.get("exc_info", (None, None))[1]
+            message = getattr(exc, "log_message", None) or self._reason
+            self.finish({"error": message, "status": status_code})
+
+    class Endpoint(Base):
+        def initialize(self, name: str):
+            self.name = name
+
+        async def get(self):
+            try:
+                q = parse_query(ENDPOINTS[self.name][1], self.request.query_arguments)
+            except ValueError as e:
+                raise tornado.web.HTTPError(400, str(e)) from None
+            if "format" not in q and ARROW in self.request.headers.get("Accept", ""):
+                q["format"] = "arrow"
+            version = await service.version()
+            tag = hashlib.sha1(repr((self.name, sorted(q.items()))).encode()).hexdigest()[:12]
+            self.set_header("ETag", f'"{version[:16]}-{tag}"')
+            self.set_header("Cache-Control", "no-cache")  # always revalidate: cheap, the ETag answers
+            self.set_header("X-Data-Version", version)
+            if self.check_etag_header():
+                self.set_status(304)
+                return
+            body = await service.response(self.name, q, version)
+            self.set_header("Content-Type", ARROW if q.get("format") == "arrow" else "application/json; charset=utf-8")
+            self.write(body)
+
+    class Version(Base):
+        async def get(self):
+            version = await service.version()
+            snap = await service.snapshot(version)
+            self.write({"version": version, "path": service.path, "geo": service.geo,
+                        "months": len(snap.panel.dates), "series": len(snap.panel.codes),
+                        "last": str(snap.panel.dates[-1]) if len(snap.panel.dates) else None,
+                        "endpoints": sorted(ENDPOINTS)})
+
+    routes = [(r"/v1/version", Version), (r"/", Version)]
+    routes += [(rf"/v1/{name}", Endpoint, {"name": name}) for name in ENDPOINTS]
+    return tornado.web.Application(routes)
+
+async def serve(path: str, geo: str | None, meta: str, host: str, port: int, threads: int) -> None:
+    from utils.prep import resolve_geo
+    geo = await asyncio.get_running_loop().run_in_executor(None, resolve_geo, path, geo)
+    service = Service(path, geo, meta, threads)
+    server = make_app(service).listen(port, address=host)
+    print(f"HICP API on http://{host}:{port}/v1/version ({path}, geo {geo or '-'})", flush=True)
+    await service.snapshot(await service.version())  # warm up before the first client
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.pool.shutdown(wait=False)
+
+def main(argv=None) -> None:
+    from utils.cache import set_backend
+    parser = argparse.ArgumentParser(description="Serve the HICP analytics as a local JSON / Arrow API.")
+    parser.add_argument("data", nargs="?", default="data/DS_IPCH_M_data.csv")
+    parser.add_argument("--geo", help="country of a multi-country file (default: FR)")
+    parser.add_argument("--meta", default="data/DS_IPCH_M_metadata.csv", help="metadata CSV (labels)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--threads", type=int, default=4, help="worker threads for computations")
+    args = parser.parse_args(argv)
+    set_backend("memory")
+    try:
+        asyncio.run(serve(args.data, args.geo, args.meta, args.host, args.port, args.threads))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import functools
+import sys
+import threading
+
+# Pluggable caching for the analytics layer, so utils never has to import Streamlit.
+#
+#   "streamlit" - st.cache_data / st.cache_resource (inside the app)
+#   "memory"    - in-process LRU (CLI, batch jobs, notebooks)
+#   "none"      - no caching (benchmarks)
+#
+# The default ("auto") picks "streamlit" when Streamlit is already loaded by the
+# running script and "memory" otherwise. The choice is made on the first call,
+# not at import time, so import order does not matter.
+
+BACKENDS = ("auto", "streamlit", "memory", "none")
+_backend = "auto"
+_MEMORY_SIZE = 8
+
+# Hits / misses per cached function, whatever the backend: a call is a miss when
+# the wrapped function actually ran (see utils.trace for timings).
+_counts: dict[str, list[int]] = {}
+_counts_lock = threading.Lock()
+_running = threading.local()
+
+def set_backend(name: str) -> None:
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"unknown cache backend {name!r} (choose from {', '.join(BACKENDS)})")
+    _backend = name
+
+def get_backend() -> str:
+    if _backend != "auto":
+        return _backend
+    return "streamlit" if "streamlit" in sys.modules else "memory"
+
+def cache_stats() -> list[dict]:
+    with _counts_lock:
+        return [{"function": name, "hits": h, "misses": m, "hit_rate": h / (h + m) if h + m else None}
+                for name, (h, m) in sorted(_counts.items())]
+
+def reset_stats() -> None:
+    with _counts_lock:
+        _counts.clear()
+
+def _counted(func):
+    # Marks the innermost pending cached call as a miss when ``func`` really runs
+    @functools.wraps(func)
+    def run(*args, **kw):
+        stack = getattr(_running, "stack", None)
+        if stack:
+            stack[-1] = True
+        return func(*args, **kw)
+    return run
+
+def _memory(func):
+    cached = functools.lru_cache(maxsize=_MEMORY_SIZE)(func)
+
+    @functools.wraps(func)
+    def call(*args, **kw):
+        try:
+            hash((args, tuple(kw.items())))
+        except TypeError:  # DataFrame / dict arguments: not cacheable in-process
+            return func(*args, **kw)
+        return cached(*args, **kw)
+
+    call.cache_clear = cached.cache_clear
+    return call
+
+def _wrap(kind: str, **kwargs):
+    def decorate(func):
+        wrapped = {}
+        label = f"{func.__module__}.{func.__qualname__}"
+        inner = _counted(func)
+
+        def resolve():
+            name = get_backend()
+            if name not in wrapped:
+                if name == "streamlit":
+                    import streamlit as st
+                    wrapped[name] = getattr(st, kind)(**kwargs)(inner)
+                elif name == "memory":
+                    wrapped[name] = _memory(inner)
+                else:
+                    wrapped[name] = inner
+            return wrapped[name]
+
+        @functools.wraps(func)
+        def call(*args, **kw):
+            stack = _running.__dict__.setdefault("stack", [])
+            stack.append(False)
+            try:
+                return resolve()(*args, **kw)
+            finally:
+                missed = stack.pop()
+                with _counts_lock:
+                    _counts.setdefault(label, [0, 0])[missed] += 1
+
+        def clear():
+            for f in wrapped.values():
+                getattr(f, "clear", getattr(f, "cache_clear", lambda: None))()
+
+        call.clear = clear
+        return call
+    return decorate
+
+def cache_data(**kwargs):
+    return _wrap("cache_data", **kwargs)
+
+def cache_resource(**kwargs):
+    return _wrap("cache_resource", **kwargs)
@@ -0,0 +1,52 @@
+from utils.cache import cache_data
+from utils.downsample import downsample, visible
+from utils.trace import instrument
+
+# Plot width assumed for ``use_container_width`` charts on the wide layout (the server
+# cannot see the browser); about two points per pixel is all a line chart can show.
+CHART_WIDTH_PX = 1200
+POINTS_PER_PX = 2
+
+def max_points(width_px: int = CHART_WIDTH_PX, columns: int = 1) -> int:
+    # Points per series for a chart ``width_px`` wide split into ``columns`` facet columns
+    return max(width_px * POINTS_PER_PX // max(columns, 1), 3)
+
+@cache_data(show_spinner=False, max_entries=64)
+def line_figure(df, x: str, y: str, color: str | None = None, facet_col: str | None = None,
+                facet_col_wrap: int = 0, start=None, end=None, width_px: int = CHART_WIDTH_PX,
+                method: str = "lttb", **kwargs):
+    """``px.line`` of the rows in [start, end], downsampled to what ``width_px`` can show.
+
+    Cached on its inputs: a rerun that does not change the data or the range
+    gets the same figure back, so Streamlit resends nothing but a reference to
+    the payload the browser already holds.
+    """
+    import plotly.express as px
+    data = visible(df, x, start, end)
+    data = downsample(data, x, y, by=color or facet_col, method=method,
+                      n=max_points(width_px, facet_col_wrap if facet_col else 1))
+    return px.line(data, x=x, y=y, color=color, facet_col=facet_col,
+                   facet_col_wrap=facet_col_wrap, **kwargs)
+
+def annotate(fig, turning=None, breaks=None, outliers=None, y: str = "yoy"):
+    """Copy of ``fig`` with turning points (triangles), breaks (dashed lines) and outlier months (circles).
+
+    Takes the frames of a ``utils.detect.Detections``; the figure from the cache is left as it is.
+    """
+    import plotly.graph_objects as go
+    fig = go.Figure(fig)
+    if turning is not None:
+        for kind, symbol, color in (("peak", "triangle-down", "firebrick"), ("trough", "triangle-up", "seagreen")):
+            pts = turning[turning["kind"] == kind]
+            if not pts.empty:
+                fig.add_scatter(x=pts["date"], y=pts["yoy"], mode="markers", name=kind.capitalize(),
+                                marker={"symbol": symbol, "size": 11, "color": color})
+    if breaks is not None:
+        for date in breaks["date"]:
+            fig.add_vline(x=date.to_pydatetime(), line_dash="dash", line_color="gray")
+    if outliers is not None and not outliers.empty:
+        fig.add_scatter(x=outliers["date"], y=outliers[y], mode="markers", name="Unusual month",
+                        marker={"symbol": "circle-open", "size": 13, "color": "darkorange", "line": {"width": 2}})
+    return fig
+
+instrument(globals())
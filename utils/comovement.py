@@ -0,0 +1,265 @@
+"""Co-movement of series: pairwise correlations, lead / lag and clusters.
+
+Every pair at once: the (months × series) matrix is cut into column blocks of BLOCK
+series and each pair of blocks is a handful of matrix products. Correlations are
+pairwise-complete (a pair uses the months both series have), computed from masked
+sums, so n series cost O(months × n²) flops in BLAS rather than n² Python loops.
+Blocks run in a thread pool for big panels (matrix products release the GIL).
+
+    corr(i, j, lag)  = correlation of series i at month t with series j at month t + lag
+                       (lag > 0: i leads j by ``lag`` months)
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.panel import CODE_COL, SeriesPanel
+from utils.trace import instrument
+
+BLOCK = 256
+MIN_PERIODS = 24      # fewer common months: correlation left NaN
+MAX_LAG = 6
+WINDOW = 36           # months of the rolling co-movement index
+CLUSTERS = 4
+POOL_MIN_SERIES = 512  # below this one thread is faster
+
+def _block_corr(a: np.ndarray, b: np.ndarray, min_periods: int) -> np.ndarray:
+    # Pairwise-complete Pearson correlation between the columns of a and b (NaN = missing)
+    va, vb = ~np.isnan(a), ~np.isnan(b)
+    if va.all() and vb.all():
+        za, zb = a - a.mean(axis=0), b - b.mean(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = (za.T @ zb) / np.sqrt(np.outer((za * za).sum(axis=0), (zb * zb).sum(axis=0)))
+        return np.clip(r, -1, 1) if len(a) >= min_periods else np.full(r.shape, np.nan)
+    fa, fb = va.astype(np.float64), vb.astype(np.float64)
+    za, zb = np.where(va, a, 0.0), np.where(vb, b, 0.0)
+    n = fa.T @ fb
+    sa, sb = za.T @ fb, fa.T @ zb
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = za.T @ zb - sa * sb / n
+        var_a = (za * za).T @ fb - sa * sa / n
+        var_b = fa.T @ (zb * zb) - sb * sb / n
+        r = cov / np.sqrt(var_a * var_b)
+    r[n < min_periods] = np.nan
+    return np.clip(r, -1, 1)
+
+def _workers(n: int, workers: int | None) -> int:
+    if workers is None:
+        return min(os.cpu_count() or 1, 8) if n >= POOL_MIN_SERIES else 1
+    return max(workers, 1)
+
+def corr(x: np.ndarray, y: np.ndarray | None = None, min_periods: int = MIN_PERIODS,
+         workers: int | None = None) -> np.ndarray:
+    """Correlation of every column of ``x`` with every column of ``y`` (default: ``x``).
+
+    Rows of x and y are the same months. Columns are centred first so the masked
+    sums keep their precision. With ``y`` omitted only the upper block triangle is
+    computed and mirrored.
+    """
+    symmetric = y is None
+    with np.errstate(invalid="ignore"):
+        x = x - np.nanmean(x, axis=0) if len(x) else x
+        y = x if symmetric else (y - np.nanmean(y, axis=0) if len(y) else y)
+    out = np.full((x.shape[1], y.shape[1]), np.nan)
+    starts_x, starts_y = range(0, x.shape[1], BLOCK), range(0, y.shape[1], BLOCK)
+    tasks = [(i, j) for i in starts_x for j in starts_y if not symmetric or j >= i]
+
+    def run(task):
+        i, j = task
+        r = _block_corr(x[:, i:i + BLOCK], y[:, j:j + BLOCK], min_periods)
+        out[i:i + BLOCK, j:j + BLOCK] = r
+        if symmetric and j != i:
+            out[j:j + BLOCK, i:i + BLOCK] = r.T
+
+    n = _workers(max(x.shape[1], y.shape[1]), workers)
+    if n > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(n, thread_name_prefix="hicp-corr") as pool:
+            list(pool.map(run, tasks))
+    else:
+        for task in tasks:
+            run(task)
+    return out
+
+def lagged_corr(x: np.ndarray, lag: int, min_periods: int = MIN_PERIODS, workers: int | None = None) -> np.ndarray:
+    """(series × series) correlation of x[t] (rows) with x[t + lag] (columns)."""
+    if lag < 0:
+        return lagged_corr(x, -lag, min_periods, workers).T
+    if lag == 0:
+        return corr(x, min_periods=min_periods, workers=workers)
+    return corr(x[:-lag], x[lag:], min_periods, workers)
+
+def lead_lag(x: np.ndarray, max_lag: int = MAX_LAG, min_periods: int = MIN_PERIODS,
+             workers: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lag (months, -max_lag..max_lag) of the strongest positive cross-correlation of every pair,
+    its value, and the lag-0 correlation matrix (computed on the way).
+
+    Only non-negative lags are computed: corr(i, j, -k) is corr(j, i, k).
+    """
+    n = x.shape[1]
+    zero = None
+    best = np.full((n, n), -np.inf)
+    best_lag = np.zeros((n, n), dtype=np.int8)
+    for k in range(max_lag + 1):
+        r = lagged_corr(x, k, min_periods, workers)
+        zero = r if k == 0 else zero
+        for lag, m in ((k, r), (-k, r.T)) if k else ((0, r),):
+            better = np.nan_to_num(m, nan=-np.inf) > best
+            best[better] = m[better]
+            best_lag[better] = lag
+    best[np.isinf(best)] = np.nan
+    return best_lag, best, zero
+
+def comovement_index(x: np.ndarray, window: int = WINDOW) -> tuple[np.ndarray, np.ndarray]:
+    """Mean pairwise correlation over each trailing ``window`` months, and how many series it covers.
+
+    Uses the series observed in every month of the window (and not constant):
+    for standardized columns z, the mean off-diagonal correlation is
+    (|sum of z|² / (window - 1) - n) / (n (n - 1)), which costs O(window × n)
+    per month instead of O(window × n²).
+    """
+    t = len(x)
+    mean, count = np.full(t, np.nan), np.zeros(t, dtype=np.int64)
+    for end in range(window, t + 1):
+        w = x[end - window:end]
+        w = w[:, ~np.isnan(w).any(axis=0)]
+        sd = w.std(axis=0, ddof=1)
+        w = w[:, sd > 0]
+        n = w.shape[1]
+        count[end - 1] = n
+        if n < 2:
+            continue
+        z = (w - w.mean(axis=0)) / sd[sd > 0]
+        total = z.sum(axis=1)
+        mean[end - 1] = ((total @ total) / (window - 1) - n) / (n * (n - 1))
+    return mean, count
+
+def cluster(r: np.ndarray, k: int = CLUSTERS) -> tuple[np.ndarray, np.ndarray]:
+    """Average-linkage clustering on the distance 1 - correlation.
+
+    Returns a cluster number (1..k, numbered along the leaf order) per series and
+    the leaf order (similar series next to each other, for heatmaps). Pairs without
+    a correlation are as far apart as uncorrelated series. Each step merges the
+    closest pair using per-row nearest neighbours, so only rows that pointed at a
+    merged cluster are rescanned.
+    """
+    n = len(r)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    d = 1 - np.nan_to_num(np.asarray(r, dtype=np.float64), nan=0.0)
+    np.fill_diagonal(d, np.inf)
+    size = np.ones(n)
+    members = [[i] for i in range(n)]
+    active = np.ones(n, dtype=bool)
+    nn = d.argmin(axis=1)
+    nd = d[np.arange(n), nn]
+    groups = [list(m) for m in members] if k >= n else None
+    for _ in range(n - 1):
+        i = int(np.argmin(nd))
+        j = int(nn[i])
+        merged = (size[i] * d[i] + size[j] * d[j]) / (size[i] + size[j])
+        d[i], d[:, i] = merged, merged
+        d[j], d[:, j] = np.inf, np.inf
+        d[i, i] = np.inf
+        active[j], nd[j] = False, np.inf
+        size[i] += size[j]
+        members[i] += members[j]
+        members[j] = []
+        stale = active & ((nn == i) | (nn == j))
+        stale[i] = True
+        rows = np.flatnonzero(stale)
+        nn[rows] = d[rows].argmin(axis=1)
+        nd[rows] = d[rows, nn[rows]]
+        closer = active & (d[:, i] < nd)
+        nn[closer], nd[closer] = i, d[closer, i]
+        if active.sum() == k:
+            groups = [list(members[c]) for c in np.flatnonzero(active)]
+    order = np.array(members[int(np.flatnonzero(active)[0])])
+    labels = np.zeros(n, dtype=np.int64)
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+    for number, g in enumerate(sorted(groups or [list(order)], key=lambda g: position[g].min()), start=1):
+        labels[g] = number
+    return labels, order
+
+@dataclass(frozen=True)
+class CoMovement:
+    version: str
+    what: str               # "yoy" or "mom"
+    dates: pd.PeriodIndex
+    codes: pd.Index
+    values: np.ndarray      # (months × series) rates the correlations are computed on (read-only)
+    corr: np.ndarray        # (series × series) full-sample correlation
+    best_lag: np.ndarray    # (series × series) lag of the strongest cross-correlation (row leads column if > 0)
+    best_corr: np.ndarray   # (series × series) that correlation
+    index: pd.DataFrame     # date, mean_corr, series: co-movement index of the divisions (trailing window)
+    window: int
+    max_lag: int
+
+    def _positions(self, codes) -> np.ndarray:
+        if codes is None:
+            return np.arange(len(self.codes))
+        pos = self.codes.get_indexer(list(codes))
+        return pos[pos >= 0]
+
+    def matrix(self, codes=None, at=None, window: int | None = None) -> pd.DataFrame:
+        """Correlation matrix of ``codes``: full sample, or the ``window`` months up to month ``at``."""
+        pos = self._positions(codes)
+        names = self.codes[pos].astype(str)
+        if at is None:
+            return pd.DataFrame(self.corr[np.ix_(pos, pos)], index=names, columns=names)
+        end = self.dates.get_loc(pd.Period(at, freq="M")) + 1
+        window = window or self.window
+        r = corr(self.values[max(end - window, 0):end, pos], min_periods=min(MIN_PERIODS, window))
+        return pd.DataFrame(r, index=names, columns=names)
+
+    def pairs(self, codes=None, top: int | None = None) -> pd.DataFrame:
+        """One row per pair (a < b): correlation, best lag (a leads b if > 0) and its correlation, strongest first."""
+        pos = self._positions(codes)
+        ia, ib = np.triu_indices(len(pos), k=1)
+        a, b = pos[ia], pos[ib]
+        if top and top < len(a):
+            r = np.nan_to_num(self.corr[a, b], nan=-np.inf)
+            keep = np.argpartition(-r, top - 1)[:top]
+            a, b = a[keep], b[keep]
+        out = pd.DataFrame({
+            "code_a": self.codes[a].astype(str), "code_b": self.codes[b].astype(str),
+            "corr": self.corr[a, b], "best_lag": self.best_lag[a, b], "lag_corr": self.best_corr[a, b],
+        }).dropna(subset=["corr"]).sort_values("corr", ascending=False, ignore_index=True)
+        return out.head(top) if top else out
+
+    def lead_lag(self, a: str, b: str) -> pd.DataFrame:
+        """Cross-correlation of ``a`` at t with ``b`` at t + lag, for every lag."""
+        i, j = self.codes.get_loc(a), self.codes.get_loc(b)
+        x = self.values[:, [i, j]]
+        lags = np.arange(-self.max_lag, self.max_lag + 1)
+        return pd.DataFrame({"lag": lags, "corr": [lagged_corr(x, int(k))[0, 1] for k in lags]})
+
+    def clusters(self, codes=None, k: int = CLUSTERS) -> pd.DataFrame:
+        """Cluster number and heatmap order of ``codes`` (average linkage on 1 - correlation)."""
+        pos = self._positions(codes)
+        labels, order = cluster(self.corr[np.ix_(pos, pos)], k)
+        rank = np.empty(len(pos), dtype=np.int64)
+        rank[order] = np.arange(len(pos))
+        out = pd.DataFrame({CODE_COL: self.codes[pos].astype(str), "cluster": labels, "order": rank})
+        return out.sort_values("order", ignore_index=True)
+
+def comovement(panel: SeriesPanel, what: str = "yoy", version: str = "", max_lag: int = MAX_LAG,
+               window: int = WINDOW, workers: int | None = None) -> CoMovement:
+    """Correlations, lead / lag and the co-movement index of every series of ``panel``."""
+    if what not in ("yoy", "mom"):
+        raise ValueError(f"what must be 'yoy' or 'mom', got {what!r}")
+    x = getattr(panel, what)
+    best_lag, best_corr, r = lead_lag(x, max_lag, workers=workers)
+    divisions = panel.codes.get_indexer(panel.match(r"^CP\d{2}$").codes)
+    mean, count = comovement_index(x[:, divisions], window)
+    index = pd.DataFrame({"date": panel.dates.to_timestamp(), "mean_corr": mean, "series": count})
+    return CoMovement(
+        version=version, what=what, dates=panel.dates, codes=panel.codes, values=x,
+        corr=r, best_lag=best_lag, best_corr=best_corr,
+        index=index[index["series"] >= 2].reset_index(drop=True), window=window, max_lag=max_lag,
+    )
+
+instrument(globals())
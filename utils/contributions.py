@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from utils.hierarchy import ROOT, CoicopTree
+from utils.panel import CODE_COL, SeriesPanel
+
+# Contributions to a chain-linked HICP aggregate (December link month, annual weights).
+#
+# Within year y every index is linked to December y-1 (row d1), and the aggregate P is
+# the weighted mean of its components' ratios to that month:
+#     P[t] / P[d1] = sum_i w_i,y * I_i[t] / I_i[d1]
+# so changes of P split exactly into per-component terms:
+#     MoM  c_i = 100 * w_i,y * P[d1] / P[t-1] * (I_i[t] - I_i[t-1]) / I_i[d1]
+#     YoY  c_i = 100 * (w_i,y   * P[d1] / P[t-12] * (I_i[t]  - I_i[d1])  / I_i[d1]
+#                     + w_i,y-1 * P[d2] / P[t-12] * (I_i[d1] - I_i[t-12]) / I_i[d2])
+# with d2 = December y-2 and w the item weight as a share of the aggregate's weight.
+# Any set of components that partitions the aggregate (its children, or every sub-index
+# of one COICOP level) sums to its rate, up to the rounding of the published indices.
+
+def _take(x: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    # Rows of ``x`` (NaN where the row index falls outside the panel)
+    ok = (rows >= 0) & (rows < len(x))
+    out = np.full((len(rows),) + x.shape[1:], np.nan)
+    out[ok] = x[rows[ok]]
+    return out
+
+def weight_matrix(weights: pd.DataFrame, years: np.ndarray, codes, parent: str = ROOT) -> np.ndarray:
+    """(len(years) × len(codes)) item weights as shares of ``parent``.
+
+    Years after the last published weights reuse the latest ones. When the
+    parent's own weight is missing, the components' weights are summed instead.
+    """
+    wide = (weights.pivot_table(index="year", columns=CODE_COL, values="weight", aggfunc="last")
+                   .sort_index())
+    if wide.empty:
+        return np.full((len(years), len(codes)), np.nan)
+    wide = wide.reindex(np.union1d(wide.index, years)).ffill()
+    items = wide.reindex(columns=pd.Index(codes, dtype=object)).reindex(years).to_numpy(dtype=np.float64)
+    if parent in wide.columns:
+        total = wide[parent].reindex(years).to_numpy(dtype=np.float64)
+    else:
+        total = np.nansum(items, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return items / total[:, None]
+
+def contribution_matrix(panel: SeriesPanel, weights: pd.DataFrame, parent: str = ROOT,
+                        codes=None, of: str = "yoy") -> tuple[np.ndarray, pd.Index]:
+    """(months × codes) contributions, in percentage points, to ``parent``'s ``of`` rate.
+
+    ``codes`` defaults to the parent's direct children (by COICOP prefix).
+    The whole history is computed at once; months that lack an index value
+    or a weight are NaN.
+    """
+    if codes is None:
+        codes = CoicopTree(panel.codes).children.get(parent, [])
+    codes = pd.Index([c for c in codes if c in panel.codes], name=CODE_COL)
+    t = np.arange(len(panel.dates))
+    if parent not in panel.codes or not len(codes) or not len(t):
+        return np.full((len(t), len(codes)), np.nan), codes
+    P = panel.values[:, panel.codes.get_loc(parent)]
+    I = panel.values[:, panel.codes.get_indexer(codes)]
+    years = np.asarray(panel.dates.year)
+    months = np.asarray(panel.dates.month)
+    d1 = t - months                     # December of the previous year
+    w = weight_matrix(weights, years, codes, parent)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if of == "mom":
+            scale = (_take(P, d1) / _take(P, t - 1))[:, None]
+            out = 100 * w * scale * (I - _take(I, t - 1)) / _take(I, d1)
+        elif of == "yoy":
+            d2 = d1 - 12
+            w_prev = weight_matrix(weights, years - 1, codes, parent)
+            p12 = _take(P, t - 12)
+            this_year = w * (_take(P, d1) / p12)[:, None] * (I - _take(I, d1)) / _take(I, d1)
+            last_year = w_prev * (_take(P, d2) / p12)[:, None] * (_take(I, d1) - _take(I, t - 12)) / _take(I, d2)
+            out = 100 * (this_year + last_year)
+        else:
+            raise ValueError(f"unknown rate {of!r} (use 'mom' or 'yoy')")
+    return out, codes
+
+def contributions(panel: SeriesPanel, weights: pd.DataFrame, parent: str = ROOT,
+                  codes=None, of: str = "yoy") -> pd.DataFrame:
+    """Long frame (date, expenditure_1999, contribution, total) for a stacked chart.
+
+    ``total`` is the parent's own rate that month; ``total`` minus the sum of
+    the contributions is the rounding (or missing-weight) residual.
+    """
+    out, codes = contribution_matrix(panel, weights, parent, codes, of)
+    ti, ci = np.nonzero(~np.isnan(out))
+    rate = panel.mom if of == "mom" else panel.yoy
+    total = rate[:, panel.codes.get_loc(parent)] if parent in panel.codes else np.full(len(panel.dates), np.nan)
+    return pd.DataFrame({
+        "date": panel.dates.to_timestamp()[ti],
+        CODE_COL: pd.Categorical.from_codes(ci, categories=codes),
+        "contribution": out[ti, ci],
+        "total": total[ti],
+    })
+
+def tree_contributions(panel: SeriesPanel, weights: pd.DataFrame, of: str = "yoy") -> pd.DataFrame:
+    # Contribution of every sub-index (all levels) to the headline, in one batch
+    codes = [c for c in panel.codes if c != ROOT]
+    out, codes = contribution_matrix(panel, weights, ROOT, codes, of)
+    return pd.DataFrame(out, index=panel.dates.to_timestamp(), columns=codes)
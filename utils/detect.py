@@ -0,0 +1,230 @@
+"""Turning points, structural breaks and outlier months of every series at once.
+
+All three work on the whole (months × series) array with NumPy, column blocks at most:
+
+    turning points  Bry–Boschan-style peaks / troughs of YoY: local extremes over ±TURN_WINDOW
+                    months (none within TURN_WINDOW months of a gap or of the ends), strict
+                    alternation, then phases shorter than MIN_PHASE months or smaller than
+                    MIN_AMPLITUDE pp removed, weakest first
+    breaks          months where the mean of the deseasonalized MoM shifts: a two-sample t
+                    statistic of the BREAK_WINDOW months before vs after, kept where it peaks
+                    above BREAK_T and the means differ by at least BREAK_MIN_SHIFT
+    outliers        robust z of the deseasonalized MoM against the median / MAD of the
+                    OUTLIER_WINDOW months around it, kept above OUTLIER_Z
+
+"Deseasonalized" MoM is MoM minus its calendar-month mean, so January sales or July
+clothing drops are neither breaks nor outliers.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.panel import CODE_COL, SeriesPanel
+from utils.trace import instrument
+
+TURN_WINDOW = 5
+MIN_PHASE = 6
+MIN_AMPLITUDE = 0.5       # pp of YoY between a peak and the next trough
+BREAK_WINDOW = 24
+BREAK_T = 3.8             # ~95th percentile of the largest |t| of a 30-year white-noise series
+BREAK_MIN_SHIFT = 0.1     # pp of MoM between the two means (≈ 1.2 pp a year)
+OUTLIER_WINDOW = 25       # centred, odd
+OUTLIER_Z = 5.0
+MAD_FLOOR = 0.02          # pp: a flat stretch does not make every small move an outlier (or break)
+BLOCK = 2048              # columns per block for the windowed median
+
+# ---- helpers over (months × series)
+def deseasonalize(mom: np.ndarray) -> np.ndarray:
+    # MoM minus the mean of its calendar month (rows are consecutive months)
+    t = len(mom)
+    grid = np.concatenate([mom, np.full((-t % 12, mom.shape[1]), np.nan)]).reshape(-1, 12, mom.shape[1])
+    valid = ~np.isnan(grid)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(valid, grid, 0.0).sum(axis=0) / valid.sum(axis=0)
+    return mom - means[np.arange(t) % 12]
+
+def _window_sums(x: np.ndarray, window: int):
+    # Count, sum and sum of squares of the ``window`` rows ending at each row (exclusive start)
+    valid = ~np.isnan(x)
+    z = np.where(valid, x, 0.0)
+    out = []
+    for a in (valid.astype(np.float64), z, z * z):
+        c = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(a, axis=0)])
+        out.append(c[window:] - c[:-window])  # row i: rows i .. i + window - 1
+    return out
+
+# ---- turning points
+def _rolling_extreme(x: np.ndarray, half: int, fill: float, func) -> np.ndarray:
+    # max / min over rows r - half .. r + half, ``fill`` beyond the ends
+    from numpy.lib.stride_tricks import sliding_window_view
+    pad = np.full((half, x.shape[1]), fill)
+    return func(sliding_window_view(np.vstack([pad, x, pad]), 2 * half + 1, axis=0), axis=-1)
+
+def _candidates(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Local maxima / minima over ±window; a missing neighbour (or the ends) blocks the call
+    seen = ~np.isnan(x)
+    peak = seen & (x >= _rolling_extreme(np.nan_to_num(x, nan=np.inf), window, np.inf, np.max))
+    trough = seen & (x <= _rolling_extreme(np.nan_to_num(x, nan=-np.inf), window, -np.inf, np.min))
+    kind = peak.astype(np.int8) - trough.astype(np.int8)  # a flat window is both: dropped
+    col, row = np.nonzero(kind.T)                          # sorted by series, then month
+    return col, row, kind[row, col]
+
+def _keep_extreme_of_runs(col, row, kind, value):
+    # Strict alternation: of consecutive peaks (troughs) of a series keep the highest (lowest)
+    if len(col) == 0:
+        return col, row, kind, value
+    new_run = np.ones(len(col), dtype=bool)
+    new_run[1:] = (col[1:] != col[:-1]) | (kind[1:] != kind[:-1])
+    run = np.cumsum(new_run)
+    order = np.lexsort((row, -value * kind, run))  # per run: most extreme first, earliest on ties
+    first = order[np.r_[True, run[order][1:] != run[order][:-1]]]
+    keep = np.sort(first)
+    return col[keep], row[keep], kind[keep], value[keep]
+
+def turning_points(x: np.ndarray, window: int = TURN_WINDOW, min_phase: int = MIN_PHASE,
+                   min_amplitude: float = MIN_AMPLITUDE) -> tuple[np.ndarray, ...]:
+    """(series, month, kind: +1 peak / -1 trough, value) of every turning point, by series then month."""
+    col, row, kind = _candidates(x, window)
+    col, row, kind, value = _keep_extreme_of_runs(col, row, kind, x[row, col])
+    while len(col) > 1:
+        # A phase joins events i and i + 1 of the same series; weak ones go, two events at a time.
+        # Only phases weaker than both neighbours go in one pass, so no event is used twice.
+        same = col[1:] == col[:-1]
+        amplitude = np.abs(np.diff(value))
+        weak = same & ((np.diff(row) < min_phase) | (amplitude < min_amplitude))
+        if not weak.any():
+            break
+        score = np.where(weak, amplitude, np.inf)
+        left = np.r_[np.inf, np.where(same[:-1], score[:-1], np.inf)]
+        right = np.r_[np.where(same[1:], score[1:], np.inf), np.inf]
+        drop_phase = weak & (score < left) & (score <= right)
+        drop = np.zeros(len(col), dtype=bool)
+        drop[:-1] |= drop_phase
+        drop[1:] |= drop_phase
+        col, row, kind, value = col[~drop], row[~drop], kind[~drop], value[~drop]
+        # Removing a phase from the end of a series can leave two alike events side by side
+        col, row, kind, value = _keep_extreme_of_runs(col, row, kind, value)
+    return col, row, kind, value
+
+# ---- breaks
+def breaks(mom: np.ndarray, window: int = BREAK_WINDOW, threshold: float = BREAK_T,
+           min_shift: float = BREAK_MIN_SHIFT) -> tuple[np.ndarray, ...]:
+    """(series, month, mean before, mean after, t) where the deseasonalized MoM mean shifts.
+
+    ``month`` is the first month of the new regime. The pooled standard deviation is
+    floored at MAD_FLOOR, and a t that is not finite (too few months) is no break.
+    """
+    z = deseasonalize(mom)
+    t = len(z)
+    if t < 2 * window:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), np.zeros(0), np.zeros(0)
+    n, s1, s2 = _window_sums(z, window)  # row i: months i .. i + window - 1
+    nb, sb, qb = n[:-window], s1[:-window], s2[:-window]  # before month m = i + window
+    na, sa, qa = n[window:], s1[window:], s2[window:]     # from month m on
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mb, ma = sb / nb, sa / na
+        pooled = np.maximum((qb - sb * mb + qa - sa * ma) / (nb + na - 2), MAD_FLOOR ** 2)
+        stat = (ma - mb) / np.sqrt(pooled * (1 / nb + 1 / na))
+    enough = (nb >= 0.75 * window) & (na >= 0.75 * window) & np.isfinite(stat)
+    stat = np.where(enough, stat, np.nan)
+    size = np.where(enough, np.abs(stat), 0.0)
+    strongest = size >= _rolling_extreme(size, window - 1, 0.0, np.max)  # within ±window
+    best = strongest & (size >= threshold) & (np.abs(ma - mb) >= min_shift)
+    col, i = np.nonzero(best.T)
+    return col, i + window, mb[i, col], ma[i, col], stat[i, col]
+
+# ---- outliers
+def _sorted_median(v: np.ndarray) -> np.ndarray:
+    # Median over the last axis of an array sorted along it, NaN last
+    k = (~np.isnan(v)).sum(axis=-1)
+    lo = np.take_along_axis(v, np.clip((k - 1) // 2, 0, None)[..., None], axis=-1)[..., 0]
+    hi = np.take_along_axis(v, np.clip(k // 2, 0, None)[..., None], axis=-1)[..., 0]
+    return np.where(k > 0, (lo + hi) / 2, np.nan)
+
+def robust_z(mom: np.ndarray, window: int = OUTLIER_WINDOW) -> np.ndarray:
+    """Deseasonalized MoM minus the centred rolling median, over 1.4826 × MAD (months × series).
+
+    Windows are sorted in float32 (plenty for a z score) one column block at a time.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    z = deseasonalize(mom)
+    half = window // 2
+    out = np.full(z.shape, np.nan)
+    for start in range(0, z.shape[1], BLOCK):
+        block = z[:, start:start + BLOCK].astype(np.float32)
+        pad = np.full((half, block.shape[1]), np.nan, dtype=np.float32)
+        view = np.sort(sliding_window_view(np.vstack([pad, block, pad]), window, axis=0), axis=-1)
+        med = _sorted_median(view)
+        view -= med[..., None]
+        np.abs(view, out=view)
+        view.sort(axis=-1)
+        mad = _sorted_median(view)
+        enough = (~np.isnan(view)).sum(axis=-1) >= window // 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, start:start + BLOCK] = np.where(enough, (block - med) / (1.4826 * np.maximum(mad, MAD_FLOOR)), np.nan)
+    return out
+
+def outliers(mom: np.ndarray, window: int = OUTLIER_WINDOW, threshold: float = OUTLIER_Z) -> tuple[np.ndarray, ...]:
+    """(series, month, robust z) of every month with |z| above ``threshold``."""
+    rz = robust_z(mom, window)
+    col, row = np.nonzero(np.nan_to_num(np.abs(rz)).T > threshold)
+    return col, row, rz[row, col]
+
+# ---- results
+@dataclass(frozen=True)
+class Detections:
+    version: str
+    turning: pd.DataFrame   # date, [geo,] expenditure_1999, kind (peak / trough), yoy
+    breaks: pd.DataFrame    # date (first month of the new regime), [geo,] expenditure_1999, mom_before, mom_after, t
+    outliers: pd.DataFrame  # date, [geo,] expenditure_1999, mom, z
+
+    def select(self, codes=None, geo: str | None = None) -> "Detections":
+        def keep(df):
+            mask = np.ones(len(df), dtype=bool)
+            if codes is not None:
+                mask &= df[CODE_COL].astype(str).isin(list(codes)).to_numpy()
+            if geo is not None and "geo" in df.columns:
+                mask &= (df["geo"].astype(str) == geo).to_numpy()
+            return df[mask]
+        return Detections(self.version, keep(self.turning), keep(self.breaks), keep(self.outliers))
+
+    def counts(self) -> pd.DataFrame:
+        # Peaks, troughs, breaks and outliers per series
+        keys = [c for c in ("geo", CODE_COL) if c in self.turning.columns]
+        parts = [self.turning.groupby(keys + ["kind"], observed=True).size().unstack("kind"),
+                 self.breaks.groupby(keys, observed=True).size().rename("breaks"),
+                 self.outliers.groupby(keys, observed=True).size().rename("outliers")]
+        out = pd.concat(parts, axis=1).reindex(columns=["peak", "trough", "breaks", "outliers"])
+        return out.fillna(0).astype(int).reset_index()
+
+def _detect(yoy: np.ndarray, mom: np.ndarray, dates: pd.PeriodIndex, columns: dict, version: str) -> Detections:
+    # ``columns``: name -> Categorical with one entry per column of yoy / mom
+    stamps = dates.to_timestamp()
+
+    def frame(col, row, **values):
+        return pd.DataFrame({"date": stamps[row], **{k: v[col] for k, v in columns.items()}, **values})
+
+    col, row, kind, value = turning_points(yoy)
+    turning = frame(col, row, kind=np.where(kind > 0, "peak", "trough"), yoy=value)
+    col, row, before, after, stat = breaks(mom)
+    shifts = frame(col, row, mom_before=before, mom_after=after, t=stat)
+    col, row, z = outliers(mom)
+    odd = frame(col, row, mom=mom[row, col], z=z)
+    return Detections(version, *(df.sort_values(["date", *columns], ignore_index=True) for df in (turning, shifts, odd)))
+
+def detect_panel(panel: SeriesPanel, version: str = "") -> Detections:
+    """Turning points, breaks and outliers of every series of ``panel``."""
+    codes = pd.Categorical(panel.codes.astype(str), categories=panel.codes.astype(str))
+    return _detect(panel.yoy, panel.mom, panel.dates, {CODE_COL: codes}, version)
+
+def detect_geo(cube, version: str = "") -> Detections:
+    """Same for a utils.geo.GeoPanel: every country × code series in one pass (adds a geo column)."""
+    t, g, c = cube.values.shape
+    geos = pd.Categorical(np.repeat(cube.geos.astype(str), c), categories=cube.geos.astype(str))
+    codes = pd.Categorical(np.tile(cube.codes.astype(str), g), categories=cube.codes.astype(str))
+    return _detect(cube.yoy.reshape(t, g * c), cube.mom.reshape(t, g * c), cube.dates,
+                   {"geo": geos, CODE_COL: codes}, version)
+
+instrument(globals())
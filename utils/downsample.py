@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Point reduction for line charts: a chart cannot show more than a couple of points per
+# horizontal pixel, so anything beyond that is payload the browser has to parse for nothing.
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: positions of ``n`` points that keep the line's shape.
+
+    ``x`` must be increasing and ``y`` free of NaN. First and last points are kept.
+    """
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = (np.arange(n - 1) * (size - 2) / (n - 2)).astype(np.int64) + 1
+    edges[-1] = size - 1
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2]) if i + 2 < len(edges) else slice(size - 1, size)
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        # Twice the triangle area (a, candidate, next-bucket average) for every candidate
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax_indices(y: np.ndarray, n: int) -> np.ndarray:
+    """Positions of the min and max of each of ``n // 2`` equal buckets (plus both ends)."""
+    size = len(y)
+    buckets = max(n // 2, 1)
+    if n >= size:
+        return np.arange(size)
+    width = -(-size // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:size] = y
+    grid = padded.reshape(buckets, width)
+    filled = ~np.isnan(grid).all(axis=1)
+    rows = np.arange(buckets)[filled] * width
+    lo = rows + np.nanargmin(grid[filled], axis=1)
+    hi = rows + np.nanargmax(grid[filled], axis=1)
+    return np.unique(np.concatenate([[0, size - 1], lo, hi]))
+
+def downsample(df: pd.DataFrame, x: str, y: str, by: str | None = None,
+               n: int = 1000, method: str = "lttb") -> pd.DataFrame:
+    """Rows of ``df`` kept so that each ``by`` series has at most about ``n`` points.
+
+    Series that are already short enough are returned untouched; rows with a
+    missing ``y`` are dropped.
+    """
+    if method not in ("lttb", "minmax"):
+        raise ValueError(f"unknown method {method!r} (use 'lttb' or 'minmax')")
+    df = df.dropna(subset=[y])
+    groups = [df] if by is None else [g for _, g in df.groupby(by, observed=True, sort=False)]
+    if all(len(g) <= n for g in groups):
+        return df
+    keep = []
+    for g in groups:
+        g = g.sort_values(x)
+        if len(g) <= n:
+            keep.append(g)
+            continue
+        values = g[y].to_numpy(dtype=np.float64)
+        if method == "lttb":
+            xs = g[x].to_numpy()
+            if np.issubdtype(xs.dtype, np.datetime64):
+                xs = xs.astype("datetime64[ns]").astype(np.int64)
+            idx = lttb_indices(xs, values, n)
+        else:
+            idx = minmax_indices(values, n)
+        keep.append(g.iloc[idx])
+    return pd.concat(keep)
+
+def visible(df: pd.DataFrame, x: str, start=None, end=None) -> pd.DataFrame:
+    # Rows inside the displayed [start, end] range (either bound may be None)
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df[x] >= start).to_numpy()
+    if end is not None:
+        mask &= (df[x] <= end).to_numpy()
+    return df[mask]
@@ -0,0 +1,202 @@
+"""Short-horizon MoM / YoY forecasts of every series of a panel.
+
+Three local models are fitted to the MoM (%) of all series at once, as whole-array
+NumPy operations over the (months × series) matrix:
+
+    snaive  seasonal naive: each month repeats its MoM of a year earlier
+    ets     additive level + seasonal exponential smoothing (alpha / gamma picked
+            per series from a small grid by one-step squared error)
+    ar      AR(2) with intercept on the MoM minus its calendar-month mean
+
+Each series keeps the model with the smallest MoM error over the last ``holdout``
+months (fitted without them). Index levels are rebuilt from the forecast MoM, so the
+YoY path is consistent with it. Panels of POOL_MIN_SERIES series or more are split
+by columns over a process pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from utils.panel import CODE_COL, SeriesPanel
+from utils.trace import instrument
+
+MODELS = ("snaive", "ets", "ar")
+HORIZON = 12
+HOLDOUT = 12
+MIN_MONTHS = 36           # fewer MoM observations before the holdout: seasonal naive only
+ALPHAS = (0.05, 0.1, 0.2, 0.35, 0.5)
+GAMMAS = (0.02, 0.05, 0.1, 0.2)
+AR_LAGS = 2
+Z80 = 1.2816              # 80% interval
+POOL_MIN_SERIES = 10_000  # below this one process is faster (starting the workers costs ~1 s)
+
+@dataclass(frozen=True)
+class Forecast:
+    version: str
+    origin: pd.Timestamp    # last observed month
+    horizon: int
+    frame: pd.DataFrame     # date, expenditure_1999, mom, yoy, yoy_lo, yoy_hi (forecast months only)
+    models: pd.DataFrame    # expenditure_1999, model, mae (MoM, pp) of the chosen model, mae_<model>...
+
+    def series(self, code: str) -> pd.DataFrame:
+        return self.frame[self.frame[CODE_COL] == code]
+
+# ---- models: y is (months × series) MoM with NaN gaps, output is (h × series)
+def _calendar_means(y: np.ndarray) -> np.ndarray:
+    # Mean of each row position modulo 12 (= calendar month, rows being consecutive months)
+    grid = np.concatenate([y, np.full((-len(y) % 12, y.shape[1]), np.nan)]).reshape(-1, 12, y.shape[1])
+    valid = ~np.isnan(grid)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid, grid, 0.0).sum(axis=0) / valid.sum(axis=0)
+
+def snaive(y: np.ndarray, h: int) -> np.ndarray:
+    t = len(y)
+    steps = np.arange(h)
+    out = y[t - 12 + steps % 12] if t >= 12 else np.full((h, y.shape[1]), np.nan)
+    fallback = _calendar_means(y)[(t + steps) % 12]
+    return np.where(np.isnan(out), fallback, out)
+
+def ets(y: np.ndarray, h: int) -> np.ndarray:
+    t, c = y.shape
+    alpha, gamma = (g.reshape(-1, 1) for g in np.meshgrid(ALPHAS, GAMMAS, indexing="ij"))
+    means = _calendar_means(y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        start = np.nan_to_num(np.nansum(y, axis=0) / (~np.isnan(y)).sum(axis=0))
+    level = np.repeat(start[None, :], len(alpha), axis=0)              # (grid × series)
+    season = np.repeat(np.nan_to_num(means - start)[:, None, :], len(alpha), axis=1)  # (12 × grid × series)
+    sse = np.zeros(level.shape)
+    e, step = np.empty(level.shape), np.empty(level.shape)
+    seen = (~np.isnan(y)).astype(np.float64)
+    y = np.nan_to_num(y)
+    for i in range(t):
+        m = i % 12
+        np.subtract(y[i], level, out=e)
+        e -= season[m]
+        e *= seen[i]  # a missing month updates nothing
+        if i >= 12:
+            np.multiply(e, e, out=step)
+            sse += step
+        np.multiply(alpha, e, out=step)
+        level += step
+        np.multiply(gamma, e, out=step)
+        season[m] += step
+    best = np.argmin(sse, axis=0)
+    cols = np.arange(c)
+    steps = (t + np.arange(h)) % 12
+    return level[best, cols] + season[:, best, cols][steps]
+
+def ar(y: np.ndarray, h: int, lags: int = AR_LAGS) -> np.ndarray:
+    t, c = y.shape
+    means = _calendar_means(y)
+    z = y - means[np.arange(t) % 12]
+    if t <= lags + 1:
+        return np.full((h, c), np.nan)
+    x = [np.ones((t - lags, c))] + [z[lags - j - 1:t - j - 1] for j in range(lags)]
+    target = z[lags:]
+    ok = ~np.isnan(target)
+    for col in x[1:]:
+        ok &= ~np.isnan(col)
+    x = [np.where(ok, col, 0.0) for col in x]
+    target = np.where(ok, target, 0.0)
+    # Normal equations of every series at once: (series × k × k) and (series × k)
+    k = lags + 1
+    xtx = np.empty((c, k, k))
+    for p in range(k):
+        for q in range(p, k):
+            xtx[:, p, q] = xtx[:, q, p] = (x[p] * x[q]).sum(axis=0)
+    xty = np.stack([(x[p] * target).sum(axis=0) for p in range(k)], axis=-1)
+    coef = np.linalg.solve(xtx + 1e-6 * np.eye(k), xty[..., None])[..., 0]
+    phi = coef[:, 1:] * np.minimum(1.0, 0.95 / np.clip(np.abs(coef[:, 1:]).sum(axis=1), 1e-12, None))[:, None]
+    hist = list(np.nan_to_num(z[-lags:]))
+    out = np.empty((h, c))
+    for i in range(h):
+        hist.append(coef[:, 0] + sum(phi[:, j] * hist[-1 - j] for j in range(lags)))
+        out[i] = hist[-1] + means[(t + i) % 12]
+    return out
+
+FITTERS = {"snaive": snaive, "ets": ets, "ar": ar}
+
+def _snaive_in_sample_mae(y: np.ndarray) -> np.ndarray:
+    # Mean |MoM - MoM a year earlier| over the whole history (NaN without any such pair)
+    if len(y) <= 12:
+        return np.full(y.shape[1], np.nan)
+    err = np.abs(y[12:] - y[:-12])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(err, axis=0) / (~np.isnan(err)).sum(axis=0)
+
+def _fit_block(y: np.ndarray, horizon: int, holdout: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Forecast MoM (h × series), chosen model index and holdout MAE (models × series)."""
+    train, test = y[:-holdout], y[-holdout:]
+    mae = np.full((len(MODELS), y.shape[1]), np.nan)
+    for i, name in enumerate(MODELS):
+        err = np.abs(FITTERS[name](train, holdout) - test)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mae[i] = np.nansum(err, axis=0) / (~np.isnan(err)).sum(axis=0)
+    choice = np.argmin(np.where(np.isnan(mae), np.inf, mae), axis=0)
+    choice[(~np.isnan(train)).sum(axis=0) < MIN_MONTHS] = 0
+    fitted = np.stack([FITTERS[name](y, horizon) for name in MODELS])
+    return fitted[choice, :, np.arange(y.shape[1])].T, choice, mae
+
+def _fit(y: np.ndarray, horizon: int, holdout: int, workers: int | None):
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8) if y.shape[1] >= POOL_MIN_SERIES else 1
+    if workers <= 1 or y.shape[1] < 2:
+        return _fit_block(y, horizon, holdout)
+    blocks = [y[:, cols] for cols in np.array_split(np.arange(y.shape[1]), workers)]
+    # spawn, not fork: the Streamlit server is multi-threaded
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        parts = list(pool.map(_fit_block, blocks, repeat(horizon), repeat(holdout)))
+    return tuple(np.concatenate(p, axis=-1) for p in zip(*parts))
+
+def forecast_panel(panel: SeriesPanel, horizon: int = HORIZON, version: str = "",
+                   holdout: int = HOLDOUT, workers: int | None = None) -> Forecast:
+    """Forecast the ``horizon`` months after the panel's last month for every live series.
+
+    Series without an observation in that month (discontinued) are left out.
+    ``workers``: processes for the fit (default: a pool only for big panels).
+    """
+    last = panel.last_valid_row()
+    empty = pd.DataFrame(columns=["date", CODE_COL, "mom", "yoy", "yoy_lo", "yoy_hi"])
+    if last < 0 or last + 1 <= holdout + 12:
+        return Forecast(version, pd.NaT, horizon, empty, pd.DataFrame(columns=[CODE_COL, "model", "mae"]))
+    values = panel.values[:last + 1]
+    cols = np.flatnonzero(~np.isnan(values[-1]))
+    y = panel.mom[:last + 1, cols]
+    mom, choice, mae = _fit(y, horizon, holdout, workers)
+
+    level = values[-1, cols] * np.cumprod(1 + mom / 100, axis=0)
+    path = np.vstack([values[:, cols], level])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        yoy = (path[12:] / path[:-12] - 1)[-horizon:] * 100
+    err = mae[choice, np.arange(len(cols))]
+    # No observation in the holdout: every MAE is NaN and the model is seasonal naive, so
+    # its in-sample error stands in. Still NaN (no pair a year apart): no band.
+    err = np.where(np.isnan(err), _snaive_in_sample_mae(y), err)
+    sigma = 1.25 * err  # MAE -> std of a normal error
+    band = Z80 * sigma[None, :] * np.sqrt(np.minimum(np.arange(1, horizon + 1), 12))[:, None]
+
+    dates = pd.period_range(panel.dates[last] + 1, periods=horizon, freq="M").to_timestamp()
+    codes = panel.codes[cols]
+    ti, ci = np.nonzero(~np.isnan(yoy))
+    frame = pd.DataFrame({
+        "date": dates[ti],
+        CODE_COL: pd.Categorical.from_codes(ci, categories=codes),
+        "mom": mom[ti, ci],
+        "yoy": yoy[ti, ci],
+        "yoy_lo": (yoy - band)[ti, ci],
+        "yoy_hi": (yoy + band)[ti, ci],
+    })
+    models = pd.DataFrame({
+        CODE_COL: codes.astype(str),
+        "model": np.array(MODELS)[choice],
+        "mae": mae[choice, np.arange(len(cols))],
+        **{f"mae_{m}": mae[i] for i, m in enumerate(MODELS)},
+    })
+    return Forecast(version, panel.dates[last].to_timestamp(), horizon, frame, models)
+
+instrument(globals())
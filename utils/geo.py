@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from utils.io import GEO_COL
+from utils.panel import CODE_COL, SeriesPanel
+
+# Eurostat aggregates that can serve as the reference in cross-country comparisons
+AGGREGATES = ("EA", "EA20", "EA19", "EU27_2020", "EU")
+
+class GeoPanel:
+    """Date × country × code cube of index values (NaN where missing).
+
+    Same layout as ``SeriesPanel`` with a country axis in the middle, so that
+    rates and cross-country gaps are whole-array operations: comparing every
+    country with a reference is one broadcast, not a loop over countries.
+    """
+
+    def __init__(self, values: np.ndarray, dates: pd.PeriodIndex, geos: pd.Index, codes: pd.Index):
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.values.flags.writeable = False
+        self.dates = dates
+        self.geos = geos
+        self.codes = codes
+        self._rates = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "GeoPanel":
+        """Pivot a long frame (date, geo, expenditure_1999, value) into a cube."""
+        if df.empty:
+            return cls(np.empty((0, 0, 0)), pd.PeriodIndex([], freq="M"),
+                       pd.Index([], name=GEO_COL), pd.Index([], name=CODE_COL))
+        periods = pd.PeriodIndex(df["date"], freq="M")
+        dates = pd.period_range(periods.min(), periods.max(), freq="M")
+        geos = pd.Index(sorted(df[GEO_COL].astype(str).unique()), name=GEO_COL)
+        codes = pd.Index(sorted(df[CODE_COL].astype(str).unique()), name=CODE_COL)
+        cube = np.full((len(dates), len(geos), len(codes)), np.nan)
+        cube[periods.asi8 - dates.asi8[0],
+             geos.get_indexer(df[GEO_COL].astype(str)),
+             codes.get_indexer(df[CODE_COL].astype(str))] = df["value"].to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls(cube, dates, geos, codes)
+
+    def pct_change(self, lag: int) -> np.ndarray:
+        if lag not in self._rates:
+            out = np.full(self.values.shape, np.nan)
+            if len(self.values) > lag:
+                out[lag:] = (self.values[lag:] / self.values[:-lag] - 1) * 100
+            out.flags.writeable = False
+            self._rates[lag] = out
+        return self._rates[lag]
+
+    @property
+    def mom(self) -> np.ndarray:
+        return self.pct_change(1)
+
+    @property
+    def yoy(self) -> np.ndarray:
+        return self.pct_change(12)
+
+    def country(self, geo: str) -> SeriesPanel:
+        # One country as a regular panel (rates carried over, no recomputation)
+        g = self.geos.get_loc(geo)
+        return SeriesPanel(self.values[:, g], self.dates, self.codes,
+                           rates={f"rate{lag}": r[:, g] for lag, r in self._rates.items()})
+
+    def reference(self) -> str | None:
+        # First euro-area / EU aggregate present in the data
+        return next((a for a in AGGREGATES if a in self.geos), None)
+
+    def gap_vs(self, reference: str | None = None, months: int = 12) -> pd.DataFrame:
+        """Mean YoY over the last ``months`` months per (country, code), minus the reference's.
+
+        Columns: geo, expenditure_1999, avg_yoy, ref_yoy, gap. The window ends at
+        the last month with data anywhere in the cube; pairs without any YoY in
+        the window are dropped.
+        """
+        reference = reference or self.reference()
+        cols = [GEO_COL, CODE_COL, "avg_yoy", "ref_yoy", "gap"]
+        if reference is None or reference not in self.geos or not len(self.dates):
+            return pd.DataFrame(columns=cols)
+        rows = np.flatnonzero(~np.isnan(self.values).all(axis=(1, 2)))
+        if not len(rows):
+            return pd.DataFrame(columns=cols)
+        yoy = self.yoy[max(rows[-1] - months + 1, 0):rows[-1] + 1]
+        n = (~np.isnan(yoy)).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = np.nansum(yoy, axis=0) / n                  # geos × codes
+        ref = avg[self.geos.get_loc(reference)]               # codes
+        gi, ci = np.nonzero(n > 0)
+        return pd.DataFrame({
+            GEO_COL: pd.Categorical.from_codes(gi, categories=self.geos),
+            CODE_COL: pd.Categorical.from_codes(ci, categories=self.codes),
+            "avg_yoy": avg[gi, ci],
+            "ref_yoy": ref[ci],
+            "gap": avg[gi, ci] - ref[ci],
+        })
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __repr__(self) -> str:
+        return f"GeoPanel({len(self.dates)} months × {len(self.geos)} countries × {len(self.codes)} series)"
+
+def load_geo_panel(path: str = "data/DS_IPCH_M_data.csv", geos=None) -> GeoPanel:
+    """Cube of the HICP/N/M series for ``geos`` (all countries if None).
+
+    Each country is read from its own cache partition, so asking for a few
+    countries never loads the whole panel.
+    """
+    from utils.io import available_geos, load_filtered
+    from utils.prep import SERIES_COLUMNS, SERIES_FILTER, _prepare
+    geos = available_geos(path) if geos is None else list(geos)
+    frames = [_prepare(load_filtered(path, SERIES_FILTER, None, SERIES_COLUMNS, g)) for g in geos]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return GeoPanel.from_frame(pd.DataFrame(columns=["date", GEO_COL, CODE_COL, "value"]))
+    return GeoPanel.from_frame(pd.concat(frames, ignore_index=True))
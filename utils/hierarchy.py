@@ -0,0 +1,123 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from utils.kernels import volatility
+from utils.panel import CODE_COL, SeriesPanel
+
+ROOT = "CP00"
+
+def parent_code(code: str) -> str | None:
+    # COICOP codes nest by prefix: CP0111 -> CP011 -> CP01 -> CP00
+    if not code.startswith("CP") or code == ROOT:
+        return None
+    if len(code) <= 4:
+        return ROOT
+    return code[:-1]
+
+def code_level(code: str) -> int:
+    # 0 = headline, 1 = division (CP01), 2 = group, 3 = class, 4 = subclass
+    if code == ROOT:
+        return 0
+    return max(len(code) - 3, 1) if code.startswith("CP") else -1
+
+class CoicopTree:
+    """Parent/child index over the expenditure codes that are actually present.
+
+    A code whose direct parent is missing is attached to its nearest present
+    ancestor, so the tree never has holes.
+    """
+
+    def __init__(self, codes):
+        self.codes = sorted({str(c) for c in codes})
+        present = set(self.codes)
+        self.parent: dict[str, str | None] = {}
+        self.children: dict[str, list[str]] = defaultdict(list)
+        for code in self.codes:
+            p = parent_code(code)
+            while p is not None and p not in present:
+                p = parent_code(p)
+            self.parent[code] = p
+            if p is not None:
+                self.children[p].append(code)
+
+    def __contains__(self, code) -> bool:
+        return code in self.parent
+
+    def level(self, code: str) -> int:
+        return code_level(code)
+
+    def ancestors(self, code: str) -> list[str]:
+        out = []
+        p = self.parent.get(code)
+        while p is not None:
+            out.append(p)
+            p = self.parent.get(p)
+        return out
+
+    def subtree(self, code: str, depth: int | None = None) -> list[str]:
+        # Breadth-first: the code itself, then its children, grandchildren, ...
+        if code not in self.parent:
+            return []
+        out, frontier, d = [code], [code], 0
+        while frontier and (depth is None or d < depth):
+            frontier = [c for p in frontier for c in self.children.get(p, [])]
+            out.extend(frontier)
+            d += 1
+        return out
+
+    def at_level(self, level: int) -> list[str]:
+        return [c for c in self.codes if code_level(c) == level]
+
+def hierarchy_stats(panel: SeriesPanel, tree: CoicopTree, months: int = 12,
+                    vol: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Rates, gaps and volatility for every series of the panel in one pass.
+
+    ``gap_parent`` / ``gap_headline`` compare the average YoY of the last
+    ``months`` months with the code's parent and with CP00. ``vol`` is an
+    already computed volatility table (code, vol, persistence, n) to reuse.
+    """
+    codes = panel.codes
+    yoy = panel.yoy
+    last = panel.last_valid_row()
+    if last < 0:
+        return pd.DataFrame(columns=[CODE_COL, "level", "parent", "latest_yoy", "avg_yoy",
+                                     "gap_parent", "gap_headline", "vol", "persistence", "n"])
+
+    window = yoy[max(last - months + 1, 0):last + 1]
+    counts = (~np.isnan(window)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = np.nansum(window, axis=0) / counts
+    # Latest non-missing YoY per column: last valid row index via a reversed argmax
+    valid = ~np.isnan(yoy)
+    last_row = len(yoy) - 1 - np.argmax(valid[::-1], axis=0)
+    latest = np.where(valid.any(axis=0), yoy[last_row, np.arange(len(codes))], np.nan)
+
+    parents = pd.Index([tree.parent.get(c) for c in codes])
+    pidx = codes.get_indexer(parents)
+    avg_parent = np.where(pidx >= 0, avg[pidx], np.nan)
+    hidx = codes.get_indexer([ROOT])[0]
+    avg_head = avg[hidx] if hidx >= 0 else np.nan
+
+    out = pd.DataFrame({
+        CODE_COL: codes.astype(str),
+        "level": [code_level(c) for c in codes],
+        "parent": parents,
+        "latest_yoy": latest,
+        "avg_yoy": avg,
+        "gap_parent": avg - avg_parent,
+        "gap_headline": avg - avg_head,
+    })
+    if vol is None:
+        stats = volatility(yoy)
+        out["vol"], out["persistence"], out["n"] = stats["vol"], stats["persistence"], stats["n"]
+    else:
+        vol = vol.set_index(vol[CODE_COL].astype(str))
+        for c in ("vol", "persistence", "n"):
+            out[c] = vol[c].reindex(out[CODE_COL]).to_numpy()
+    return out.set_index(CODE_COL, drop=False).rename_axis(None)
+
+def drill_down(stats: pd.DataFrame, tree: CoicopTree, code: str, depth: int | None = 1) -> pd.DataFrame:
+    """Slice of the precomputed ``hierarchy_stats`` table for ``code`` and its descendants."""
+    return stats.loc[[c for c in tree.subtree(code, depth) if c in stats.index]].reset_index(drop=True)
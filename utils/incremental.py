@@ -0,0 +1,118 @@
+"""Incremental monthly refresh: fold new / revised observations into a snapshot.
+
+Usage (append a monthly release to the stored dataset):
+
+    python -m utils.incremental data/new_release.csv [--data data/DS_IPCH_M_data.csv]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from utils.kernels import RunningVolatility
+from utils.panel import CODE_COL, SeriesPanel
+
+def update_panel(panel: SeriesPanel, rows: pd.DataFrame) -> tuple[SeriesPanel, int, np.ndarray]:
+    """Apply long rows (date, code, value) to ``panel``.
+
+    Returns the new panel, the first row whose value changed (``len`` if none)
+    and the new position of every old column. Rates and cached rolling stats
+    are carried over and only recomputed from that first row on.
+    """
+    if rows.empty or panel.values.size == 0:
+        full = SeriesPanel.from_frame(pd.concat([panel.to_frame(), rows], ignore_index=True)
+                                      .drop_duplicates(subset=["date", CODE_COL], keep="last"))
+        return full, 0, full.codes.get_indexer(panel.codes)
+    periods = pd.PeriodIndex(rows["date"], freq="M")
+    dates = pd.period_range(min(panel.dates[0], periods.min()), max(panel.dates[-1], periods.max()), freq="M")
+    codes = panel.codes.union(pd.Index(rows[CODE_COL].astype(str).unique())).rename(CODE_COL)
+    offset = int(panel.dates.asi8[0] - dates.asi8[0])
+    cols = codes.get_indexer(panel.codes)
+
+    def regrid(old: np.ndarray) -> np.ndarray:
+        grid = np.full((len(dates), len(codes)), np.nan)
+        grid[offset:offset + len(old), cols] = old
+        return grid
+
+    values = regrid(panel.values)
+    ti = periods.asi8 - dates.asi8[0]
+    ci = codes.get_indexer(rows[CODE_COL].astype(str))
+    new_vals = rows["value"].to_numpy(dtype=np.float64, na_value=np.nan)
+    old_vals = values[ti, ci]
+    changed = ~((old_vals == new_vals) | (np.isnan(old_vals) & np.isnan(new_vals)))
+    values[ti, ci] = new_vals
+    first = int(ti[changed].min()) if changed.any() else len(dates)
+    if offset > 0:  # history extended backwards: nothing can be reused
+        first = 0
+
+    out = SeriesPanel(values, dates, codes)
+    for key, arr in panel._cache.items():
+        grid = regrid(arr)
+        if key.startswith("rate"):
+            lag = int(key[4:])
+            lo = max(first, lag)
+            grid[lo:] = (values[lo:] / values[lo - lag:len(values) - lag] - 1) * 100
+            grid[:lag] = np.nan
+            out._cache[key] = grid
+        elif key.startswith("rolling:"):
+            _, what, window, stat, min_periods = key.split(":")
+            window = int(window)
+            min_periods = None if min_periods == "None" else int(min_periods)
+            lo = max(first - window + 1, 0)
+            roll = pd.DataFrame(getattr(out, what)[lo:]).rolling(window, min_periods=min_periods or window)
+            grid[first:] = getattr(roll, stat)().to_numpy()[first - lo:]
+            out._cache[key] = grid
+    for arr in out._cache.values():
+        arr.flags.writeable = False
+    return out, first, cols
+
+def update_snapshot(snap, rows: pd.DataFrame, version: str):
+    """New AnalyticsSnapshot with ``rows`` (prepared long rows) folded in."""
+    from utils.hierarchy import CoicopTree, hierarchy_stats
+    from utils.prep import headline, last12_gap_vs_headline, rolling_volatility, top_categories
+    from utils.query import headline_query
+    from utils.seasonality import SeasonalityEngine
+    from utils.snapshot import REGIMES, AnalyticsSnapshot, volatility_table
+
+    panel, first, cols = update_panel(snap.panel, rows)
+    vol_state = snap.vol_state.update(panel.yoy, first, cols) if first > 0 else RunningVolatility(panel.yoy)
+    divisions = panel.match(r"^CP\d{2}$")
+    cutoff = panel.dates[first].to_timestamp() if first < len(panel.dates) else None
+
+    def roll(window, old):
+        if cutoff is None:
+            return old
+        return pd.concat([old[old["date"] < cutoff], rolling_volatility(divisions, window, start=first)],
+                         ignore_index=True)
+
+    tree = snap.tree if set(panel.codes) == set(snap.panel.codes) else CoicopTree(panel.codes)
+    vol = volatility_table(panel.codes, vol_state)
+    head = headline(panel)
+    seasonal = SeasonalityEngine(panel)
+    return AnalyticsSnapshot(
+        version=version,
+        panel=panel,
+        vol_state=vol_state,
+        head=head,
+        head_query=headline_query(head),
+        cats=top_categories(panel),
+        gap=last12_gap_vs_headline(divisions, panel.select(["CP00"])),
+        scores=vol[vol["expenditure_1999"].isin(divisions.codes)].reset_index(drop=True),
+        rolling_vol={w: roll(w, old) for w, old in snap.rolling_vol.items()},
+        seasonality=seasonal.profile_frame(REGIMES, codes=divisions.codes),
+        seasonal=seasonal,
+        tree=tree,
+        tree_stats=hierarchy_stats(panel, tree, vol=vol),
+    )
+
+def main(argv=None) -> None:
+    from utils.io import append_update, data_version
+    parser = argparse.ArgumentParser(description="Append a monthly HICP release to the stored dataset.")
+    parser.add_argument("update", help="CSV with new and/or revised rows (same layout as the data file)")
+    parser.add_argument("--data", default="data/DS_IPCH_M_data.csv", help="dataset the update belongs to")
+    args = parser.parse_args(argv)
+    delta = append_update(args.update, args.data)
+    print(f"{len(delta)} new or revised rows stored · data version {data_version(args.data)[:12]}")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,456 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
 import pandas as pd
-import streamlit as st
-
-@st.cache_data(show_spinner=False)
-def load_data(path: str = "data/DS_IPCH_M_data.csv") -> pd.DataFrame:
-    df = pd.read_csv(path, sep=";")
-    df.columns = df.columns.str.lower().str.strip()
-    df = df.rename(columns={
-        "time_period": "date",
-        "obs_value": "value",
-        "freq": "frequency",
-        "idx_type": "index_type",
-        "seasonal_adjust": "seasonal_adjustment",
-    })
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["value"] = pd.to_numeric(df["value"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+
+from utils.cache import cache_data
+from utils.trace import instrument
+
+# On-disk columnar cache for the parsed CSV (rebuilt only when the source changes)
+CACHE_DIR = "data/.cache"
+# Country column of the full Eurostat panel (the data.gouv.fr file is France only and has none)
+GEO_COL = "geo"
+DEFAULT_GEO = "FR"
+CATEGORICAL_COLUMNS = [
+    "frequency", "geo", "index_type", "seasonal_adjustment", "expenditure_1999",
+    "conf_status", "decimals", "obs_status", "unit_mult",
+]
+# One observation = one value per (series dimensions, month)
+KEY_COLUMNS = ["frequency", "geo", "index_type", "seasonal_adjustment", "expenditure_1999", "date"]
+# Raw DS_IPCH_M header (lower-cased) -> app column name
+RAW_NAMES = {
+    "time_period": "date",
+    "geo\\time_period": GEO_COL,
+    "obs_value": "value",
+    "freq": "frequency",
+    "idx_type": "index_type",
+    "seasonal_adjust": "seasonal_adjustment",
+}
+CHUNK_ROWS = 500_000
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _cache_stem(path: str) -> str:
+    # File name + short hash of its absolute path: same-named snapshots in other folders don't collide
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]}"
+
+def _cache_paths(path: str):
+    stem = _cache_stem(path)
+    return os.path.join(CACHE_DIR, f"{stem}.parquet"), os.path.join(CACHE_DIR, f"{stem}.json")
+
+def _parts_dir(path: str) -> str:
+    return os.path.join(CACHE_DIR, f"{_cache_stem(path)}.parts")
+
+def _geo_dir(path: str) -> str:
+    # Multi-country files are stored as one Parquet partition per country (geo=FR/, geo=DE/, ...)
+    return os.path.join(CACHE_DIR, f"{_cache_stem(path)}.geo")
+
+def _version(manifest: dict, n_parts: int | None = None) -> str:
+    # Base CSV hash, chained with the hash of every appended monthly update
+    parts = manifest.get("parts", [])[:n_parts]
+    if not parts:
+        return manifest["sha1"]
+    return hashlib.sha1("|".join([manifest["sha1"]] + [p["sha1"] for p in parts]).encode()).hexdigest()
+
+def _source_key(path: str, manifest: dict | None = None) -> dict:
+    stat = os.stat(path)
+    key = {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    # Same size + mtime as the cached build: trust it and skip hashing the whole file
+    if manifest and all(manifest.get(k) == v for k, v in key.items()):
+        key["sha1"] = manifest.get("sha1")
+    else:
+        key["sha1"] = _file_hash(path)
+    return key
+
+def _app_name(raw: str) -> str:
+    name = str(raw).lower().strip()
+    return RAW_NAMES.get(name, name)
+
+def parse_data(path: str) -> pd.DataFrame:
+    return tidy(pd.read_csv(path, sep=";", decimal=","))
+
+def tidy(df: pd.DataFrame) -> pd.DataFrame:
+    # Raw DS_IPCH_M columns -> app names and dtypes (whole file or one chunk of it)
+    df.columns = [_app_name(c) for c in df.columns]
+    dates = pd.to_datetime(df["date"], format="%Y-%m", errors="coerce")
+    odd = dates.isna() & df["date"].notna()
+    if odd.any():  # anything that is not plain YYYY-MM
+        dates[odd] = pd.to_datetime(df.loc[odd, "date"], errors="coerce")
+    df["date"] = dates
+    if not pd.api.types.is_float_dtype(df["value"]):
+        df["value"] = pd.to_numeric(df["value"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].where(df[c].isna(), df[c].astype(str)).astype("category")
     return df
 
-@st.cache_data(show_spinner=False)
-def load_metadata(path: str = "data/DS_IPCH_M_metadata.csv") -> pd.DataFrame:
-    meta = pd.read_csv(path, sep=";")
-    meta.columns = meta.columns.str.lower().str.strip()
-    exp_map = meta.loc[meta["cod_var"]=="EXPENDITURE_1999", ["cod_mod","lib_mod"]].drop_duplicates()
-    exp_map.columns = ["expenditure_1999","expenditure_label"]
-    return exp_map
-
-def add_labels(df: pd.DataFrame, exp_map: pd.DataFrame) -> pd.DataFrame:
-    if "expenditure_1999" in df.columns:
-        return df.merge(exp_map, on="expenditure_1999", how="left")
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
     return df
 
+def _select_geo(df: pd.DataFrame, geo: str | None) -> pd.DataFrame:
+    if geo is None or GEO_COL not in df.columns:
+        return df
+    return df[df[GEO_COL] == geo].reset_index(drop=True)
+
+def _apply_parts(df: pd.DataFrame, parts: list[pd.DataFrame]) -> pd.DataFrame:
+    if not parts:
+        return df
+    key = [c for c in KEY_COLUMNS if c in df.columns]
+    out = pd.concat([df, *parts], ignore_index=True).drop_duplicates(subset=key, keep="last")
+    return _categorize(out.reset_index(drop=True))
+
+def _read_parts(path: str, parts: list[dict]) -> list[pd.DataFrame]:
+    return [pd.read_parquet(os.path.join(_parts_dir(path), p["file"])) for p in parts]
+
+def _row_mask(df: pd.DataFrame, where: dict, codes: str | None = None, geo: str | None = None) -> np.ndarray:
+    # Rows with df[col] == value for every ``where`` column present, a code matching ``codes``, and ``geo``
+    mask = np.ones(len(df), dtype=bool)
+    for c, v in where.items():
+        if c in df.columns:
+            mask &= (df[c] == v).to_numpy(dtype=bool, na_value=False)
+    if geo is not None and GEO_COL in df.columns:
+        mask &= (df[GEO_COL] == geo).to_numpy(dtype=bool, na_value=False)
+    if codes is not None and "expenditure_1999" in df.columns:
+        mask &= df["expenditure_1999"].astype(str).str.match(codes).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+def _read_base(path: str, manifest: dict, geo: str | None = None,
+               filters: list | None = None, columns: list | None = None) -> pd.DataFrame:
+    filters = list(filters or [])
+    if not manifest.get("geos"):
+        return _categorize(pd.read_parquet(_cache_paths(path)[0], columns=columns, filters=filters or None))
+    if geo is not None:
+        # Partition pruning: only the geo=<geo> directory is opened
+        filters.append((GEO_COL, "==", geo))
+    return _categorize(pd.read_parquet(_geo_dir(path), columns=columns, filters=filters or None))
+
+def _cached_columns(path: str, manifest: dict) -> list[str]:
+    import pyarrow.dataset as ds
+    src = _geo_dir(path) if manifest.get("geos") else _cache_paths(path)[0]
+    return ds.dataset(src, format="parquet", partitioning="hive").schema.names
+
+def _arrow_schema(df: pd.DataFrame):
+    # Fixed column types, so every chunk of one file lands in the same Parquet schema
+    import pyarrow as pa
+    fields = []
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            t = pa.timestamp("ns")
+        elif pd.api.types.is_bool_dtype(s):
+            t = pa.bool_()
+        elif pd.api.types.is_numeric_dtype(s):
+            t = pa.float64()
+        else:
+            t = pa.dictionary(pa.int32(), pa.string())
+        fields.append(pa.field(c, t))
+    return pa.schema(fields)
+
+def _arrow_table(df: pd.DataFrame, schema):
+    import pyarrow as pa
+    df = df[schema.names]
+    # Categoricals of strings convert as they are; anything else goes through str
+    loose = {f.name: "string" for f in schema if pa.types.is_dictionary(f.type)
+             and not (isinstance(df[f.name].dtype, pd.CategoricalDtype)
+                      and pd.api.types.is_string_dtype(df[f.name].cat.categories))}
+    df = df.astype(loose) if loose else df
+    return pa.Table.from_pandas(df, preserve_index=False).cast(schema)
+
+class _CacheWriter:
+    """Writes the Parquet cache of ``path`` chunk by chunk (one row group per chunk).
+
+    Multi-country chunks go to one file per country under geo=<geo>/. Nothing
+    replaces the current cache until ``close``; any write error just turns the
+    writer off (no pyarrow / read-only disk: the parsed rows are still served).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet_path, self.manifest_path = _cache_paths(path)
+        self.geo_dir = _geo_dir(path)
+        self.tmp = None
+        self.schema = None
+        self.writers: dict = {}
+        self.ok = True
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if not self.ok or chunk.empty:
+            return
+        try:
+            import pyarrow.parquet as pq
+            by_geo = GEO_COL in chunk.columns and chunk[GEO_COL].notna().any()
+            if self.schema is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                target = self.geo_dir if by_geo else self.parquet_path
+                self.tmp = f"{target}.{os.getpid()}.tmp"
+                shutil.rmtree(self.tmp, ignore_errors=True)
+                self.schema = _arrow_schema(chunk.drop(columns=[GEO_COL]) if by_geo else chunk)
+            if not by_geo:
+                if None not in self.writers:
+                    self.writers[None] = pq.ParquetWriter(self.tmp, self.schema)
+                self.writers[None].write_table(_arrow_table(chunk, self.schema))
+                return
+            for g, part in chunk.groupby(GEO_COL, observed=True, sort=False):
+                g = str(g)
+                if g not in self.writers:
+                    os.makedirs(os.path.join(self.tmp, f"{GEO_COL}={g}"), exist_ok=True)
+                    self.writers[g] = pq.ParquetWriter(
+                        os.path.join(self.tmp, f"{GEO_COL}={g}", "part-0.parquet"), self.schema)
+                self.writers[g].write_table(_arrow_table(part, self.schema))
+        except (ImportError, OSError, ValueError, TypeError, KeyError):
+            self.abort()
+
+    def close(self, key: dict) -> None:
+        if not self.ok or self.schema is None:
+            return self.abort()
+        try:
+            for w in self.writers.values():
+                w.close()
+            geos = sorted(g for g in self.writers if g is not None)
+            target = self.geo_dir if geos else self.parquet_path
+            if geos:
+                shutil.rmtree(self.geo_dir, ignore_errors=True)
+                key = {**key, "geos": geos}
+            os.replace(self.tmp, target)
+            shutil.rmtree(_parts_dir(self.path), ignore_errors=True)  # a new base file supersedes appended updates
+            _write_manifest(key, self.manifest_path)
+        except OSError:
+            self.abort()
+
+    def abort(self) -> None:
+        self.ok = False
+        for w in self.writers.values():
+            try:
+                w.close()
+            except (OSError, ValueError):
+                pass
+        self.writers = {}
+        if self.tmp and os.path.isdir(self.tmp):
+            shutil.rmtree(self.tmp, ignore_errors=True)
+        elif self.tmp and os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+def _write_manifest(key: dict, manifest_path: str) -> None:
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(key, f)
+    os.replace(tmp, manifest_path)
+
+def _read_manifest(manifest_path: str) -> dict | None:
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _current_manifest(path: str) -> tuple[dict | None, dict]:
+    # (manifest, source key); the manifest is None unless the cache was built from this exact file
+    parquet_path, manifest_path = _cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    key = _source_key(path, manifest)
+    stored = manifest and (_geo_dir(path) if manifest.get("geos") else parquet_path)
+    if manifest and manifest.get("sha1") == key["sha1"] and os.path.exists(stored):
+        if manifest.get("mtime_ns") != key["mtime_ns"]:  # touched but unchanged
+            manifest = {**manifest, **key}
+            _write_manifest(manifest, manifest_path)
+        return manifest, key
+    return None, key
+
+def load_data_cached(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None) -> pd.DataFrame:
+    """Parsed rows of ``path``, from the Parquet cache when it is up to date.
+
+    ``geo`` keeps a single country of a multi-country file; only that
+    country's partition is read from the cache. It is ignored for files
+    without a geo column.
+    """
+    manifest, key = _current_manifest(path)
+    if manifest:
+        try:
+            parts = [_select_geo(p, geo) for p in _read_parts(path, manifest.get("parts", []))]
+            return _apply_parts(_read_base(path, manifest, geo), parts)
+        except (ImportError, OSError, ValueError):
+            pass
+    df = parse_data(path)
+    writer = _CacheWriter(path)
+    for i in range(0, len(df), CHUNK_ROWS):
+        writer.add(df.iloc[i:i + CHUNK_ROWS])
+    writer.close(key)
+    return _select_geo(df, geo)
+
+def scan_csv(path: str, where: dict | None = None, codes: str | None = None, columns: list | None = None,
+             geo: str | None = None, chunksize: int = CHUNK_ROWS, writer: _CacheWriter | None = None) -> pd.DataFrame:
+    """Rows of ``path`` with ``where`` values ({column: value}), a code matching ``codes`` and ``geo``.
+
+    The CSV is read ``chunksize`` rows at a time and each chunk is filtered
+    as it arrives, so memory follows the rows kept, not the file size. Only
+    ``columns`` (plus what the filters need) are parsed, unless ``writer``
+    also needs every column of every chunk for the Parquet cache.
+    """
+    where = dict(where or {})
+    header = pd.read_csv(path, sep=";", nrows=0).columns
+    usecols = None
+    if columns is not None and writer is None:
+        need = set(columns) | set(where) | {"date", "value"}
+        need |= {GEO_COL} if geo is not None else set()
+        need |= {"expenditure_1999"} if codes is not None else set()
+        usecols = [c for c in header if _app_name(c) in need]
+    # Filter columns stay plain strings until the chunk has been cut down
+    dtype = {c: str for c in header if _app_name(c) in set(where) | {GEO_COL, "expenditure_1999"}}
+    kept = []
+    for chunk in pd.read_csv(path, sep=";", decimal=",", usecols=usecols, dtype=dtype, chunksize=chunksize):
+        chunk.columns = [_app_name(c) for c in chunk.columns]
+        if writer is not None:
+            chunk = tidy(chunk)
+            writer.add(chunk)
+        chunk = chunk[_row_mask(chunk, where, codes, geo)].reset_index(drop=True)
+        if writer is None:
+            chunk = tidy(chunk)
+        if len(chunk):
+            kept.append(chunk if columns is None else chunk[[c for c in columns if c in chunk.columns]])
+    if not kept:
+        empty = tidy(pd.read_csv(path, sep=";", usecols=usecols, nrows=0))
+        kept = [empty if columns is None else empty[[c for c in columns if c in empty.columns]]]
+    return _categorize(pd.concat(kept, ignore_index=True))
+
+def load_filtered(path: str = "data/DS_IPCH_M_data.csv", where: dict | None = None, codes: str | None = None,
+                  columns: list | None = None, geo: str | None = None) -> pd.DataFrame:
+    """Rows of ``path`` (and its appended updates) selected as in ``scan_csv``.
+
+    With an up-to-date Parquet cache the filters and the column list are
+    pushed into the Parquet read; otherwise the CSV is streamed once, which
+    also writes the cache for the next call.
+    """
+    where = dict(where or {})
+    manifest, key = _current_manifest(path)
+    if manifest:
+        try:
+            names = _cached_columns(path, manifest)
+            read = None if columns is None else [c for c in columns if c in names] + \
+                [c for c in KEY_COLUMNS if c in names and c not in columns]
+            filters = [(c, "==", v) for c, v in where.items() if c in names]
+            base = _read_base(path, manifest, geo, filters, read)
+            base = base[_row_mask(base, where, codes)].reset_index(drop=True)
+            parts = [p[_row_mask(p, where, codes, geo)] for p in _read_parts(path, manifest.get("parts", []))]
+            df = _apply_parts(base, [p for p in parts if len(p)])
+            return df if columns is None else df[[c for c in columns if c in df.columns]]
+        except (ImportError, OSError, ValueError):
+            pass
+    writer = _CacheWriter(path)
+    df = scan_csv(path, where, codes, columns, geo, writer=writer)
+    writer.close(key)
+    return df
+
+def available_geos(path: str = "data/DS_IPCH_M_data.csv") -> list[str]:
+    # Countries of a multi-country file ([] for a single national series)
+    manifest, _ = _current_manifest(path)
+    if manifest is None:
+        df = load_filtered(path, columns=[GEO_COL])  # one streamed pass, which also writes the cache
+        manifest = _current_manifest(path)[0] or {
+            "geos": sorted(df[GEO_COL].dropna().astype(str).unique()) if GEO_COL in df.columns else []}
+    return manifest.get("geos", [])
+
+def data_version(path: str = "data/DS_IPCH_M_data.csv") -> str:
+    # Content hash of the source CSV (stat-only when it matches the cache manifest)
+    manifest = _read_manifest(_cache_paths(path)[1])
+    key = _source_key(path, manifest)
+    if manifest and manifest.get("sha1") == key["sha1"]:
+        return _version(manifest)
+    return key["sha1"]
+
+def data_updates(path: str = "data/DS_IPCH_M_data.csv") -> list[str]:
+    # Versions after each appended update, oldest first (the base version comes first)
+    manifest = _read_manifest(_cache_paths(path)[1]) or {}
+    if "sha1" not in manifest:
+        return []
+    return [_version(manifest, n) for n in range(len(manifest.get("parts", [])) + 1)]
+
+def load_updates(path: str = "data/DS_IPCH_M_data.csv", start: int = 0, geo: str | None = None) -> pd.DataFrame:
+    # Rows of the appended updates ``start`` onwards (0 = first update)
+    manifest = _read_manifest(_cache_paths(path)[1]) or {}
+    parts = [_select_geo(p, geo) for p in _read_parts(path, manifest.get("parts", [])[start:])]
+    return _categorize(pd.concat(parts, ignore_index=True)) if parts else pd.DataFrame()
+
+def append_update(update_path: str, path: str = "data/DS_IPCH_M_data.csv") -> pd.DataFrame:
+    """Store the new and revised rows of ``update_path`` on top of the cached ``path`` dataset.
+
+    ``update_path`` is a CSV in the same layout, e.g. a fresh monthly release.
+    Only rows whose value differs from the stored one are kept (as a new part
+    file); the source CSV and the base Parquet file are left untouched.
+    """
+    stored = load_data_cached(path)
+    new = parse_data(update_path)
+    key = [c for c in KEY_COLUMNS if c in new.columns and c in stored.columns]
+    old = stored[key + ["value"]].rename(columns={"value": "_old"})
+    both = new.merge(old, on=key, how="left")
+    changed = both["_old"].isna() != both["value"].isna()
+    changed |= both["value"].notna() & (both["value"] != both["_old"])
+    delta = new.loc[changed.to_numpy()].reset_index(drop=True)
+    if delta.empty:
+        return delta
+    parquet_path, manifest_path = _cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None:
+        raise OSError(f"No cached dataset for {path} (is {CACHE_DIR} writable?)")
+    parts = manifest.get("parts", [])
+    name = f"{len(parts):05d}.parquet"
+    os.makedirs(_parts_dir(path), exist_ok=True)
+    delta.to_parquet(os.path.join(_parts_dir(path), name), index=False)
+    parts.append({"file": name, "sha1": _file_hash(update_path), "rows": len(delta)})
+    _write_manifest({**manifest, "parts": parts}, manifest_path)
+    return delta
+
+@cache_data(show_spinner=False)
+def load_data(path: str = "data/DS_IPCH_M_data.csv", version: str | None = None,
+              geo: str | None = None) -> pd.DataFrame:
+    # ``version`` only takes part in the cache key (see data_version)
+    return load_data_cached(path, geo)
+
+def load_metadata(path: str = "data/DS_IPCH_M_metadata.csv") -> pd.DataFrame:
+    # expenditure_1999 -> expenditure_label table (for code -> label lookups use utils.labels.load_labels)
+    from utils.labels import load_labels
+    return load_labels(path).mapping()
+
+def add_labels(df: pd.DataFrame, exp_map: pd.DataFrame | None = None) -> pd.DataFrame:
+    # Kept for older callers: utils.labels.load_labels().add(df). ``exp_map`` (expenditure_1999,
+    # expenditure_label, e.g. from load_metadata) labels the codes through the same index
+    from utils.labels import LabelIndex, load_labels
+    if exp_map is None:
+        return load_labels().add(df)
+    table = dict(zip(exp_map["expenditure_1999"].astype(str), exp_map["expenditure_label"]))
+    return LabelIndex(pd.DataFrame(columns=["cod_var", "lib_var", "cod_mod", "lib_mod"]), {"expenditure_1999": table}).add(df)
+
+@cache_data(show_spinner=False)
+def load_weights(path: str = "data/DS_IPCH_W_data.csv", geo: str | None = None) -> pd.DataFrame:
+    """HICP item weights (per mille of the headline) as year, expenditure_1999, weight.
+
+    Same layout as the index file (Eurostat ``prc_hicp_inw``: TIME_PERIOD is the
+    year, OBS_VALUE the weight). Empty frame when the file is missing.
+    """
+    cols = ["year", "expenditure_1999", "weight"]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=cols)
+    df = parse_data(path).dropna(subset=["date", "value"])
+    if GEO_COL in df.columns:
+        df = df[df[GEO_COL] == (geo or DEFAULT_GEO)]
+    out = pd.DataFrame({
+        "year": df["date"].dt.year.astype(int),
+        "expenditure_1999": df["expenditure_1999"].astype(str),
+        "weight": df["value"].astype(float),
+    })
+    return out.drop_duplicates(subset=["year", "expenditure_1999"], keep="last").reset_index(drop=True)
+
 def basic_quality(df: pd.DataFrame):
     return {
         "rows": len(df),
@@ -36,3 +458,5 @@ def basic_quality(df: pd.DataFrame):
         "end": df["date"].max() if "date" in df else None,
         "missing_any": int(df.isna().sum().sum()),
     }
+
+instrument(globals())
@@ -0,0 +1,130 @@
+import numpy as np
+
+# Column-wise NumPy kernels over a (months × series) array; NaN = missing month.
+
+def _ffill_rows(x: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(x)
+    idx = np.where(valid, np.arange(len(x))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(x, idx, axis=0)
+
+def sign_flips(x: np.ndarray) -> np.ndarray:
+    """Boolean array: True where the sign differs from the previous non-missing value."""
+    s = np.sign(x)
+    prev = np.full(s.shape, np.nan)
+    if len(s) > 1:
+        prev[1:] = _ffill_rows(s)[:-1]
+    return ~np.isnan(s) & ~np.isnan(prev) & (s != prev)
+
+def nan_std(x: np.ndarray, ddof: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """Per-column std (same two-pass formula as pandas) and non-null count."""
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, x, 0).sum(axis=0) / n
+        sq = np.where(valid, (x - mean) ** 2, 0).sum(axis=0)
+        std = np.sqrt(sq / (n - ddof))
+    return np.where(n > ddof, std, np.nan), n
+
+def volatility(x: np.ndarray) -> dict[str, np.ndarray]:
+    """std, count, sign changes and persistence (1 - changes / count) per column."""
+    vol, n = nan_std(x)
+    sc = sign_flips(x).sum(axis=0)
+    return {"vol": vol, "n": n, "sc": sc, "persistence": 1 - sc / np.clip(n, 1, None)}
+
+def _window_sum(x: np.ndarray, window: int) -> np.ndarray:
+    c = np.cumsum(x, axis=0, dtype=np.float64)
+    out = c.copy()
+    out[window:] = c[window:] - c[:-window]
+    return out
+
+def rolling_volatility(x: np.ndarray, window: int, min_periods: int | None = None) -> dict[str, np.ndarray]:
+    """Trailing-window version of ``volatility``: one value per month and column.
+
+    Sums run on cumulative sums, so the cost does not depend on ``window``.
+    A sign change counts in a window when the month it happens is not the
+    window's first month.
+    """
+    min_periods = min_periods or window
+    valid = ~np.isnan(x)
+    # Centre each column first so the sum-of-squares form does not lose precision
+    centre = np.where(valid, x, 0).sum(axis=0) / np.clip(valid.sum(axis=0), 1, None)
+    z = np.where(valid, x - centre, 0.0)
+    n = _window_sum(valid, window)
+    s1 = _window_sum(z, window)
+    s2 = _window_sum(z * z, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (s2 - s1 * s1 / n) / (n - 1)
+        vol = np.sqrt(np.clip(var, 0, None))
+    flips = sign_flips(x).astype(np.float64)
+    sc = _window_sum(flips, window - 1) if window > 1 else np.zeros_like(flips)
+    enough = n >= max(min_periods, 2)
+    return {
+        "vol": np.where(enough, vol, np.nan),
+        "n": n,
+        "sc": np.where(enough, sc, np.nan),
+        "persistence": np.where(enough, 1 - sc / np.clip(n, 1, None), np.nan),
+    }
+
+def _last_valid_before(x: np.ndarray, row: int) -> np.ndarray:
+    # Last non-missing value above ``row`` per column (NaN if none); usually one step back
+    out = np.full(x.shape[1], np.nan)
+    todo = np.ones(x.shape[1], dtype=bool)
+    r = row - 1
+    while r >= 0 and todo.any():
+        hit = todo & ~np.isnan(x[r])
+        out[hit] = x[r, hit]
+        todo &= ~hit
+        r -= 1
+    return out
+
+class RunningVolatility:
+    """Full-history ``volatility`` kept as running sums so new months can be folded in.
+
+    Sums are taken around a fixed per-column shift (the first observation) to
+    keep the sum-of-squares form accurate. ``update`` only touches the rows
+    from the first changed month onwards.
+    """
+
+    def __init__(self, x: np.ndarray):
+        self.x = x
+        self.shift = _last_valid_before(x[::-1], len(x)) if len(x) else np.full(x.shape[1], np.nan)
+        self.shift = np.nan_to_num(self.shift)
+        self.n, self.s1, self.s2, self.sc = self._sums(x, 0, self.shift)
+
+    @staticmethod
+    def _sums(x: np.ndarray, first: int, shift: np.ndarray):
+        tail = x[first:]
+        valid = ~np.isnan(tail)
+        z = np.where(valid, tail - shift, 0.0)
+        ctx = np.sign(_last_valid_before(x, first))[None, :]
+        sc = sign_flips(np.vstack([ctx, np.sign(tail)]))[1:].sum(axis=0)
+        return valid.sum(axis=0), z.sum(axis=0), (z * z).sum(axis=0), sc
+
+    def update(self, x_new: np.ndarray, first: int, columns: np.ndarray) -> "RunningVolatility":
+        """State for ``x_new``: same rows up to ``first``, old column j now at ``columns[j]``."""
+        out = object.__new__(RunningVolatility)
+        k = x_new.shape[1]
+        out.x = x_new
+        out.shift = np.zeros(k)
+        out.shift[columns] = self.shift
+        fresh = np.ones(k, dtype=bool)
+        fresh[columns] = False
+        if fresh.any():
+            out.shift[fresh] = np.nan_to_num(_last_valid_before(x_new[::-1, fresh], len(x_new)))
+        sums = [np.zeros(k) for _ in range(4)]
+        old = self._sums(self.x, first, self.shift)
+        new = self._sums(x_new, first, out.shift)
+        for acc, kept, gone, added in zip(sums, (self.n, self.s1, self.s2, self.sc), old, new):
+            acc[columns] = kept - gone
+            acc += added
+        out.n, out.s1, out.s2, out.sc = sums
+        return out
+
+    def result(self) -> dict[str, np.ndarray]:
+        n = self.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.s2 - self.s1 * self.s1 / n) / (n - 1)
+        vol = np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+        return {"vol": vol, "n": n.astype(np.int64), "sc": self.sc.astype(np.int64),
+                "persistence": 1 - self.sc / np.clip(n, 1, None)}
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import cache_resource
+from utils.io import _app_name
+from utils.panel import CODE_COL
+
+# Code <-> label dictionary compiled once from the metadata file. Every COD_VAR becomes a
+# dimension keyed by the app's column name (expenditure_1999, frequency, obs_status, ...),
+# held as a hash index of codes plus an aligned label array: labelling a column is a lookup
+# over its distinct codes (its categories), not a merge over the data rows.
+
+LABEL_COL = "expenditure_label"
+
+# Labels for CP00..CP12 (used if metadata misses some)
+FALLBACK_LABELS = {
+    "CP00":"All items",
+    "CP01":"Food and non-alcoholic beverages",
+    "CP02":"Alcoholic beverages, tobacco and narcotics",
+    "CP03":"Clothing and footwear",
+    "CP04":"Housing, water, electricity, gas and other fuels",
+    "CP05":"Furnishings, household equipment and routine household maintenance",
+    "CP06":"Health",
+    "CP07":"Transport",
+    "CP08":"Communication",
+    "CP09":"Recreation and culture",
+    "CP10":"Education",
+    "CP11":"Restaurants and hotels",
+    "CP12":"Miscellaneous goods and services",
+}
+
+class LabelIndex:
+    """Labels of every metadata dimension, with O(1) lookups both ways.
+
+    The first label listed for a code wins; ``fallbacks`` ({dimension: {code:
+    label}}, default: the COICOP divisions of ``FALLBACK_LABELS``) fill in
+    codes the metadata misses. A label shared by several codes maps back to
+    all of them.
+    """
+
+    def __init__(self, meta: pd.DataFrame, fallbacks: dict | None = None):
+        meta = meta.rename(columns=str.lower).dropna(subset=["cod_var", "cod_mod"])
+        meta = meta.drop_duplicates(subset=["cod_var", "cod_mod"], keep="first")
+        self.titles: dict[str, str] = {}
+        self._label: dict[str, dict[str, str]] = {}
+        for var, g in meta.groupby("cod_var", sort=False):
+            dim = _app_name(var)
+            self.titles[dim] = str(g["lib_var"].iloc[0]) if "lib_var" in g else dim
+            self._label[dim] = dict(zip(g["cod_mod"].astype(str), g["lib_mod"]))
+        for dim, extra in (fallbacks if fallbacks is not None else {CODE_COL: FALLBACK_LABELS}).items():
+            known = self._label.setdefault(dim, {})
+            for code, label in extra.items():
+                known.setdefault(code, label)
+        self._codes = {d: pd.Index(list(m), dtype=object) for d, m in self._label.items()}
+        self._labels = {d: np.array(list(m.values()), dtype=object) for d, m in self._label.items()}
+        self._by_label: dict[str, dict[str, list[str]]] = {}
+        for dim, m in self._label.items():
+            rev = self._by_label[dim] = {}
+            for code, label in m.items():
+                rev.setdefault(label, []).append(code)
+
+    @property
+    def dims(self) -> list[str]:
+        return list(self._label)
+
+    # ---- single lookups
+    def label(self, code, dim: str = CODE_COL, default=None):
+        return self._label.get(dim, {}).get(str(code), default)
+
+    def codes(self, label, dim: str = CODE_COL) -> list[str]:
+        return list(self._by_label.get(dim, {}).get(label, []))
+
+    def codes_for(self, labels, dim: str = CODE_COL) -> list[str]:
+        # Codes behind any of ``labels``, in the order the labels are given
+        out = []
+        for label in labels:
+            out += [c for c in self.codes(label, dim) if c not in out]
+        return out
+
+    # ---- whole columns
+    def labels(self, values, dim: str = CODE_COL, keep_code: bool = False) -> np.ndarray:
+        """Label of each value (NaN when unknown, or the code itself with ``keep_code``).
+
+        A categorical column is resolved through its categories only.
+        """
+        values = pd.Series(values) if not isinstance(values, pd.Series) else values
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            cats = self.labels(values.cat.categories.astype(str), dim, keep_code)
+            codes = values.cat.codes.to_numpy()
+            return np.where(codes >= 0, np.append(cats, np.nan)[codes], np.nan)
+        keys = values.astype(str).to_numpy(dtype=object)
+        index = self._codes.get(dim, pd.Index([], dtype=object))
+        pos = index.get_indexer(keys)
+        found = self._labels.get(dim, np.empty(0, dtype=object))[np.where(pos >= 0, pos, 0)] if len(index) else keys
+        out = np.where(pos >= 0, found, keys if keep_code else np.nan)
+        return np.where(values.isna().to_numpy(), np.nan, out)
+
+    def add(self, df: pd.DataFrame, dim: str = CODE_COL, name: str | None = None,
+            keep_code: bool = False) -> pd.DataFrame:
+        # ``df`` with a label column for ``dim`` appended (expenditure_label for the COICOP codes)
+        if dim not in df.columns:
+            return df
+        name = name or (LABEL_COL if dim == CODE_COL else f"{dim}_label")
+        return df.assign(**{name: self.labels(df[dim], dim, keep_code)})
+
+    def mapping(self, dim: str = CODE_COL) -> pd.DataFrame:
+        # Two-column code -> label table (expenditure_1999, expenditure_label)
+        name = LABEL_COL if dim == CODE_COL else f"{dim}_label"
+        return pd.DataFrame({dim: self._codes.get(dim, []), name: self._labels.get(dim, [])})
+
+@cache_resource(show_spinner=False)
+def _compiled(path: str, mtime_ns: int) -> LabelIndex:
+    return LabelIndex(pd.read_csv(path, sep=";", dtype=str))
+
+def load_labels(path: str = "data/DS_IPCH_M_metadata.csv") -> LabelIndex:
+    # Compiled once per metadata file (recompiled when the file changes); fallbacks only if it is missing
+    if not os.path.exists(path):
+        return LabelIndex(pd.DataFrame(columns=["cod_var", "lib_var", "cod_mod", "lib_mod"]))
+    return _compiled(path, os.stat(path).st_mtime_ns)
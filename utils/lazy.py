@@ -0,0 +1,19 @@
+import importlib
+
+class _LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        self.__dict__.update(module.__dict__)  # later lookups skip __getattr__
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+def lazy_import(name: str):
+    # e.g. px = lazy_import("plotly.express"): heavy plotting code loads only when a chart is drawn
+    return _LazyModule(name)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+CODE_COL = "expenditure_1999"
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+class SeriesPanel:
+    """Wide date × code matrix of index values (one float64 column per series).
+
+    Rows are a gap-free monthly PeriodIndex, missing observations are NaN.
+    Rates and rolling statistics are computed once per panel as whole-array
+    operations and kept read-only so the panel can be shared between pages.
+    """
+
+    def __init__(self, values: np.ndarray, dates: pd.PeriodIndex, codes: pd.Index, rates: dict | None = None):
+        self.values = _readonly(np.ascontiguousarray(values, dtype=np.float64))
+        self.dates = dates
+        self.codes = codes
+        self._cache = {k: _readonly(np.ascontiguousarray(v, dtype=np.float64)) for k, v in (rates or {}).items()}
+
+    # ---- construction
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, use_rates: bool = True) -> "SeriesPanel":
+        """Pivot a long frame (date, expenditure_1999, value[, mom, yoy]) into a panel.
+
+        Existing mom/yoy columns are kept as-is when ``use_rates`` is set, so a
+        frame that was already filtered keeps the rates of the full history.
+        """
+        if df.empty:
+            return cls(np.empty((0, 0)), pd.PeriodIndex([], freq="M"), pd.Index([], name=CODE_COL))
+        periods = pd.PeriodIndex(df["date"], freq="M")
+        dates = pd.period_range(periods.min(), periods.max(), freq="M")
+        codes = pd.Index(sorted(df[CODE_COL].astype(str).unique()), name=CODE_COL)
+        ti = periods.asi8 - dates.asi8[0]
+        ci = codes.get_indexer(df[CODE_COL].astype(str))
+        grids = {}
+        cols = ["value"] + ([c for c in ("mom", "yoy") if c in df.columns] if use_rates else [])
+        for col in cols:
+            grid = np.full((len(dates), len(codes)), np.nan)
+            grid[ti, ci] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            grids[col] = grid
+        values = grids.pop("value")
+        return cls(values, dates, codes, rates={f"rate{1 if k == 'mom' else 12}": v for k, v in grids.items()})
+
+    def locate(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Row/column positions of each (date, code) row of a long frame (-1 if absent)."""
+        ti = pd.PeriodIndex(df["date"], freq="M").asi8 - (self.dates.asi8[0] if len(self.dates) else 0)
+        ti = np.where((ti >= 0) & (ti < len(self.dates)), ti, -1)
+        ci = self.codes.get_indexer(df[CODE_COL].astype(str))
+        return ti, ci
+
+    def select(self, codes) -> "SeriesPanel":
+        idx = self.codes.get_indexer(pd.Index(codes))
+        idx = idx[idx >= 0]
+        rates = {k: v[:, idx] for k, v in self._cache.items() if k.startswith("rate")}
+        return SeriesPanel(self.values[:, idx], self.dates, self.codes[idx], rates=rates)
+
+    def match(self, pattern: str) -> "SeriesPanel":
+        return self.select(self.codes[self.codes.str.match(pattern)])
+
+    # ---- vectorized column statistics
+    def pct_change(self, lag: int) -> np.ndarray:
+        key = f"rate{lag}"
+        if key not in self._cache:
+            out = np.full(self.values.shape, np.nan)
+            if len(self.values) > lag:
+                out[lag:] = (self.values[lag:] / self.values[:-lag] - 1) * 100
+            self._cache[key] = _readonly(out)
+        return self._cache[key]
+
+    @property
+    def mom(self) -> np.ndarray:
+        return self.pct_change(1)
+
+    @property
+    def yoy(self) -> np.ndarray:
+        return self.pct_change(12)
+
+    def rolling(self, what: str, window: int, stat: str = "mean", min_periods: int | None = None) -> np.ndarray:
+        key = f"rolling:{what}:{window}:{stat}:{min_periods}"
+        if key not in self._cache:
+            frame = pd.DataFrame(getattr(self, what))
+            roll = frame.rolling(window, min_periods=min_periods or window)
+            self._cache[key] = _readonly(getattr(roll, stat)().to_numpy())
+        return self._cache[key]
+
+    def last_valid_row(self) -> int:
+        rows = np.flatnonzero(~np.isnan(self.values).all(axis=1))
+        return int(rows[-1]) if len(rows) else -1
+
+    # ---- back to long format
+    def to_frame(self) -> pd.DataFrame:
+        ti, ci = np.nonzero(~np.isnan(self.values))  # row-major: sorted by date, then code
+        return pd.DataFrame({
+            "date": self.dates.to_timestamp()[ti],
+            CODE_COL: pd.Categorical.from_codes(ci, categories=self.codes),
+            "value": self.values[ti, ci],
+            "mom": self.mom[ti, ci],
+            "yoy": self.yoy[ti, ci],
+        })
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __repr__(self) -> str:
+        return f"SeriesPanel({len(self.dates)} months × {len(self.codes)} series)"
@@ -1,75 +1,174 @@
 import numpy as np
 import pandas as pd
-import streamlit as st
+
+from utils.cache import cache_data, cache_resource
+from utils.panel import CODE_COL, SeriesPanel
+from utils.trace import instrument
+
+# The series the app analyses: monthly, not seasonally adjusted HICP
+SERIES_FILTER = {"frequency": "M", "seasonal_adjustment": "N", "index_type": "HICP"}
+SERIES_COLUMNS = ["date", "geo", CODE_COL, "value"]
 
 def _basic_filter(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    if "frequency" in out.columns:
-        out = out[out["frequency"] == "M"]
-    if "seasonal_adjustment" in out.columns:
-        out = out[out["seasonal_adjustment"] == "N"]
-    if "index_type" in out.columns:
-        out = out[out["index_type"] == "HICP"]
-    return out.sort_values("date")
-
-@st.cache_data(show_spinner=False)
-def prepare_data(path: str = "data/DS_IPCH_M_data.csv") -> pd.DataFrame:
-    from utils.io import load_data
-    df = load_data(path)
+    from utils.io import _row_mask
+    return df[_row_mask(df, SERIES_FILTER)].sort_values("date")
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["date","value"])
-    df = _basic_filter(df)
-    return df
-
-def headline(df: pd.DataFrame) -> pd.DataFrame:
-    head = df[df["expenditure_1999"] == "CP00"].copy()
-    head["mom"] = head["value"].pct_change() * 100
-    head["yoy"] = head["value"].pct_change(12) * 100
-    return head
-
-def top_categories(df: pd.DataFrame) -> pd.DataFrame:
-    mask = df["expenditure_1999"].astype(str).str.match(r"^CP\d{2}$")  # CP01..CP12
-    out = df[mask].copy()
-    out["mom"] = out.groupby("expenditure_1999")["value"].pct_change() * 100
-    out["yoy"] = out.groupby("expenditure_1999")["value"].pct_change(12) * 100
-    return out
+    return _basic_filter(df)
+
+def resolve_geo(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None) -> str | None:
+    # Multi-country files default to France (the app's scope); national files have no geo
+    from utils.io import DEFAULT_GEO, available_geos
+    if geo is not None:
+        return geo
+    geos = available_geos(path)
+    if not geos:
+        return None
+    return DEFAULT_GEO if DEFAULT_GEO in geos else geos[0]
+
+@cache_data(show_spinner=False)
+def prepare_data(path: str = "data/DS_IPCH_M_data.csv", version: str | None = None,
+                 geo: str | None = None, codes: str | None = None) -> pd.DataFrame:
+    # Filters (and the ``codes`` regex) are applied while reading: the full file is never in memory
+    from utils.io import load_filtered
+    return _prepare(load_filtered(path, SERIES_FILTER, codes, SERIES_COLUMNS, geo))
+
+@cache_resource(show_spinner=False)
+def prepare_panel(path: str = "data/DS_IPCH_M_data.csv", version: str | None = None,
+                  geo: str | None = None) -> SeriesPanel:
+    # One shared (read-only) date × code matrix; pages pass it to the helpers below
+    return SeriesPanel.from_frame(prepare_data(path, version, geo))
+
+_LATEST: dict = {}  # (path, geo) -> newest snapshot built in this process
+
+@cache_resource(show_spinner=False)
+def _snapshot(path: str, version: str, geo: str | None = None):
+    from utils.io import data_updates, load_updates
+    from utils.snapshot import build_snapshot, refresh_snapshot
+    from utils.store import attach
+    snap = attach(path, version, geo)  # published by the precompute worker (python -m utils.store)
+    prev, chain = _LATEST.get((path, geo)), data_updates(path)
+    if snap is None and prev is not None and prev.version in chain and version in chain[chain.index(prev.version) + 1:]:
+        # Only monthly updates were appended since ``prev``: fold them in
+        rows = load_updates(path, start=chain.index(prev.version), geo=geo)
+        snap = refresh_snapshot(prev, _prepare(rows), version)
+    elif snap is None:
+        snap = build_snapshot(prepare_panel(path, version, geo), version)
+    _LATEST[(path, geo)] = snap
+    return snap
+
+def prepare_snapshot(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None):
+    # Keyed on the file's content hash: a new CSV gives a new snapshot, reruns reuse it
+    from utils.io import data_version
+    return _snapshot(path, data_version(path), resolve_geo(path, geo))
+
+@cache_resource(show_spinner=False)
+def _forecast(path: str, version: str, geo: str | None = None, horizon: int = 12):
+    from utils.forecast import forecast_panel
+    return forecast_panel(_snapshot(path, version, geo).panel, horizon, version)
+
+def prepare_forecast(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None, horizon: int = 12):
+    # MoM / YoY forecasts of every series, fitted once per data version (see utils.forecast)
+    from utils.io import data_version
+    return _forecast(path, data_version(path), resolve_geo(path, geo), horizon)
+
+@cache_resource(show_spinner=False)
+def _comovement(path: str, version: str, geo: str | None = None, what: str = "yoy"):
+    from utils.comovement import comovement
+    return comovement(_snapshot(path, version, geo).panel, what, version)
+
+def prepare_comovement(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None, what: str = "yoy"):
+    # Correlations / lead-lag between every pair of series, once per data version (see utils.comovement)
+    from utils.io import data_version
+    return _comovement(path, data_version(path), resolve_geo(path, geo), what)
+
+@cache_resource(show_spinner=False)
+def _detections(path: str, version: str, geo: str | None = None):
+    from utils.detect import detect_panel
+    return detect_panel(_snapshot(path, version, geo).panel, version)
+
+def prepare_detections(path: str = "data/DS_IPCH_M_data.csv", geo: str | None = None):
+    # Turning points, breaks and outlier months of every series, once per data version (see utils.detect)
+    from utils.io import data_version
+    return _detections(path, data_version(path), resolve_geo(path, geo))
+
+@cache_resource(show_spinner=False)
+def _geo_panel(path: str, version: str):
+    from utils.geo import load_geo_panel
+    return load_geo_panel(path)
+
+def prepare_geo_panel(path: str = "data/DS_IPCH_M_data.csv"):
+    # Every country of a multi-country file as one cube, once per data version (empty for a national file)
+    from utils.io import data_version
+    return _geo_panel(path, data_version(path))
+
+def data_scope(path: str = "data/DS_IPCH_M_data.csv") -> str:
+    # Scope line of the pages: the national series, or the country shown out of a multi-country file
+    from utils.io import available_geos
+    geos = available_geos(path)
+    if len(geos) < 2:
+        return "One national series" + ("" if geos else " (no `geo` column)")
+    return f"Country {resolve_geo(path)} of {len(geos)} in the file (`geo` column)"
+
+def _as_panel(data) -> SeriesPanel:
+    return data if isinstance(data, SeriesPanel) else SeriesPanel.from_frame(data)
+
+def headline(df) -> pd.DataFrame:
+    return _as_panel(df).select(["CP00"]).to_frame()
+
+def top_categories(df) -> pd.DataFrame:
+    return _as_panel(df).match(r"^CP\d{2}$").to_frame()  # CP01..CP12
 
 def compute_rates(df: pd.DataFrame) -> pd.DataFrame:
     out = df.copy()
-    if "expenditure_1999" in out.columns:
-        out["mom"] = out.groupby("expenditure_1999")["value"].pct_change() * 100
-        out["yoy"] = out.groupby("expenditure_1999")["value"].pct_change(12) * 100
+    if CODE_COL in out.columns:
+        panel = SeriesPanel.from_frame(out, use_rates=False)
+        ti, ci = panel.locate(out)
+        out["mom"] = panel.mom[ti, ci]
+        out["yoy"] = panel.yoy[ti, ci]
     return out
 
-def last12_gap_vs_headline(cat_yoy: pd.DataFrame, head: pd.DataFrame) -> pd.DataFrame:
-    last_date = cat_yoy["date"].max()
-    start = last_date - pd.DateOffset(months=11)
-    c12 = cat_yoy[cat_yoy["date"] >= start].copy()
-    h12 = head[head["date"] >= start].copy()
-    g_cat = c12.groupby("expenditure_1999")["yoy"].mean()
-    g_head = h12["yoy"].mean()
-    diff = (g_cat - g_head).sort_values(ascending=False).rename("diff").to_frame().reset_index()
-    return diff
-
-def volatility_persistence(cat_yoy: pd.DataFrame) -> pd.DataFrame:
-    def sign_changes(s: pd.Series) -> int:
-        s = np.sign(s.dropna())
-        return int((s.shift() != s).sum() - 1 if len(s) > 1 else 0)
-    agg = cat_yoy.groupby("expenditure_1999").agg(
-        vol=("yoy", lambda x: x.std(skipna=True)),
-        n=("yoy","count"),
-        sc=("yoy", sign_changes)
-    ).reset_index()
-    agg["persistence"] = 1 - agg["sc"] / agg["n"].clip(lower=1)
-    return agg.sort_values("vol", ascending=False)
-
-def seasonality_profiles(cat_yoy: pd.DataFrame, pre=(2016, 2019), post=(2020, 2025)) -> pd.DataFrame:
-    t = cat_yoy.copy()
-    t["year"] = t["date"].dt.year
-    t["month"] = t["date"].dt.month
-    p1 = (t[t["year"].between(pre[0], pre[1])]
-          .groupby(["expenditure_1999","month"])["mom"]
-          .mean().reset_index().rename(columns={"mom":"mom_pre"}))
-    p2 = (t[t["year"].between(post[0], post[1])]
-          .groupby(["expenditure_1999","month"])["mom"]
-          .mean().reset_index().rename(columns={"mom":"mom_post"}))
-    return p1.merge(p2, on=["expenditure_1999","month"], how="outer")
+def last12_gap_vs_headline(cat_yoy, head) -> pd.DataFrame:
+    cats, hp = _as_panel(cat_yoy), _as_panel(head)
+    last = cats.last_valid_row()
+    if last < 0:
+        return pd.DataFrame(columns=[CODE_COL, "diff"])
+    start = cats.dates[last] - 11
+    rows = cats.dates >= start
+    yoy = cats.yoy[rows]
+    seen = ~np.isnan(cats.values[rows]).all(axis=0)  # codes with at least one month in the window
+    with np.errstate(invalid="ignore", divide="ignore"):
+        g_cat = np.nansum(yoy, axis=0) / (~np.isnan(yoy)).sum(axis=0)
+    h12 = hp.yoy[hp.dates >= start]
+    g_head = np.nanmean(h12) if (~np.isnan(h12)).any() else np.nan
+    diff = pd.Series(g_cat[seen] - g_head, index=cats.codes[seen], name="diff")
+    return diff.sort_values(ascending=False).to_frame().reset_index()
+
+def volatility_persistence(cat_yoy) -> pd.DataFrame:
+    from utils.kernels import volatility
+    panel = _as_panel(cat_yoy)
+    agg = pd.DataFrame({CODE_COL: panel.codes, **volatility(panel.yoy)})
+    return agg[[CODE_COL, "vol", "n", "sc", "persistence"]].sort_values("vol", ascending=False)
+
+def rolling_volatility(cat_yoy, window: int = 36, start: int = 0) -> pd.DataFrame:
+    # Long frame (date, code, vol, persistence) of trailing-window volatility of YoY,
+    # for panel rows ``start`` onwards (only the window before ``start`` is read)
+    from utils.kernels import rolling_volatility as kernel
+    panel = _as_panel(cat_yoy)
+    lo = max(start - window, 0)
+    stats = {k: v[start - lo:] for k, v in kernel(panel.yoy[lo:], window).items()}
+    ti, ci = np.nonzero(~np.isnan(stats["vol"]))
+    return pd.DataFrame({
+        "date": panel.dates[start:].to_timestamp()[ti],
+        CODE_COL: pd.Categorical.from_codes(ci, categories=panel.codes),
+        "vol": stats["vol"][ti, ci],
+        "persistence": stats["persistence"][ti, ci],
+    })
+
+def seasonality_profiles(cat_yoy, pre=(2016, 2019), post=(2020, 2025)) -> pd.DataFrame:
+    # Two-regime special case of utils.seasonality (columns mom_pre / mom_post)
+    from utils.seasonality import SeasonalityEngine
+    return SeasonalityEngine(_as_panel(cat_yoy)).profile_frame((("pre", *pre), ("post", *post)))
+
+instrument(globals())
@@ -0,0 +1,243 @@
+"""Single-pass data-quality profile of a DS_IPCH_M CSV, stored next to the Parquet cache.
+
+    python -m utils.quality data/DS_IPCH_M_data.csv
+"""
+import argparse
+import json
+import os
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import cache_resource
+from utils.io import CACHE_DIR, KEY_COLUMNS, _cache_stem, tidy
+
+CHUNK_ROWS = 500_000
+JUMP_Z = 8.0          # robust z-score of a MoM change above which it is "suspicious"
+MAX_JUMPS = 200       # jumps kept in the report (largest first)
+
+@dataclass(frozen=True)
+class QualityReport:
+    version: str
+    rows: int
+    columns: pd.DataFrame   # column, dtype, missing, missing_pct
+    duplicate_rows: int     # rows identical to an earlier row (all columns)
+    duplicate_keys: int     # extra rows for an already seen (series, month)
+    bad_dates: int          # TIME_PERIOD that could not be read
+    start: pd.Timestamp
+    end: pd.Timestamp
+    unique_months: int
+    series: pd.DataFrame    # one row per series: key columns + first, last, obs, missing, gaps, ...
+    jumps: pd.DataFrame     # largest suspicious MoM changes (series key, date, prev, value, mom, z)
+
+def _concat(parts: list, dtype) -> np.ndarray:
+    return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+def _timestamps(months: np.ndarray) -> pd.DatetimeIndex:
+    # Monthly period ordinals -> first-of-month timestamps
+    return pd.PeriodIndex.from_ordinals(months, freq="M").to_timestamp()
+
+class _Profiler:
+    # Accumulates one chunk at a time; only compact per-row arrays are kept
+    def __init__(self):
+        self.rows = 0
+        self.columns: dict[str, list] = {}   # name -> [dtype, missing]
+        self.row_hashes, self.sid, self.month, self.value = [], [], [], []
+        self.series: dict[tuple, int] = {}
+        self.key_cols: list[str] = []
+        self.bad_dates = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        missing = chunk.isna().sum()
+        for c in chunk.columns:
+            entry = self.columns.setdefault(c, [str(chunk[c].dtype), 0])
+            entry[1] += int(missing[c])
+        self.row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        self.key_cols = [c for c in KEY_COLUMNS if c in chunk.columns and c != "date"]
+        # One integer per row from the categorical codes of the key columns
+        combined = np.zeros(len(chunk), dtype=np.int64)
+        for c in self.key_cols:
+            col = chunk[c].astype("category")
+            combined = combined * (len(col.cat.categories) + 1) + col.cat.codes.to_numpy() + 1
+        _, first_rows, codes = np.unique(combined, return_index=True, return_inverse=True)
+        uniques = chunk[self.key_cols].iloc[first_rows].astype(str).itertuples(index=False, name=None)
+        ids = np.array([self.series.setdefault(k, len(self.series)) for k in uniques], dtype=np.int32)
+        ok = chunk["date"].notna().to_numpy()
+        self.bad_dates += int((~ok).sum())
+        self.sid.append(ids[codes[ok]])
+        self.month.append(pd.PeriodIndex(chunk["date"][ok], freq="M").asi8.astype(np.int32))
+        self.value.append(chunk["value"].to_numpy(dtype=np.float64, na_value=np.nan)[ok])
+
+    def report(self, version: str, jump_z: float = JUMP_Z) -> QualityReport:
+        hashes = _concat(self.row_hashes, np.uint64)
+        sid, month, value = (_concat(self.sid, np.int32), _concat(self.month, np.int32),
+                             _concat(self.value, np.float64))
+        n_series = len(self.series)
+
+        order = np.lexsort((month, sid))
+        sid, month, value = sid[order], month[order], value[order]
+        same_key = np.zeros(len(sid), dtype=bool)
+        same_key[1:] = (sid[1:] == sid[:-1]) & (month[1:] == month[:-1])
+
+        def count(mask):
+            return np.bincount(sid[mask], minlength=n_series)
+
+        rows = np.bincount(sid, minlength=n_series)
+        first = np.full(n_series, np.iinfo(np.int32).max)
+        last = np.full(n_series, np.iinfo(np.int32).min)
+        np.minimum.at(first, sid, month)
+        np.maximum.at(last, sid, month)
+        dups = count(same_key)
+        span = np.where(rows > 0, last - first + 1, 0)
+
+        # MoM between consecutive months of the same series, robust z-score per series
+        step = np.zeros(len(sid), dtype=bool)
+        step[1:] = (sid[1:] == sid[:-1]) & (month[1:] == month[:-1] + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mom = np.where(step, (value / np.roll(value, 1) - 1) * 100, np.nan)
+        moves = pd.DataFrame({"sid": sid, "mom": mom}).dropna()
+        g = moves.groupby("sid")["mom"]
+        med = g.transform("median")
+        mad = (moves["mom"] - med).abs().groupby(moves["sid"]).transform("median") * 1.4826
+        z = (moves["mom"] - med).abs() / mad.where(mad > 0)
+        jump_rows = moves.index[(z > jump_z).to_numpy()]
+        jumps_per_series = np.bincount(sid[jump_rows], minlength=n_series)
+
+        keys = pd.DataFrame(list(self.series), columns=self.key_cols)
+        has = rows > 0
+        series = keys.assign(
+            first=_timestamps(np.where(has, first, 0)).where(has),
+            last=_timestamps(np.where(has, last, 0)).where(has),
+            rows=rows,
+            obs=count(~np.isnan(value)),
+            missing=count(np.isnan(value)),
+            duplicate_keys=dups,
+            gaps=span - (rows - dups),
+            non_positive=count(value <= 0),
+            jumps=jumps_per_series,
+            revised=0,
+        )
+
+        top = z[z > jump_z].sort_values(ascending=False).head(MAX_JUMPS).index
+        jumps = keys.iloc[sid[top]].reset_index(drop=True).assign(
+            date=_timestamps(month[top]),
+            prev=value[top - 1],
+            value=value[top],
+            mom=mom[top],
+            z=z.loc[top].to_numpy(),
+        )
+
+        columns = pd.DataFrame([(c, d, m) for c, (d, m) in self.columns.items()],
+                               columns=["column", "dtype", "missing"])
+        columns["missing_pct"] = (columns["missing"] / max(self.rows, 1) * 100).round(2)
+        months = np.unique(month)
+        return QualityReport(
+            version=version,
+            rows=self.rows,
+            columns=columns,
+            duplicate_rows=int(len(hashes) - len(np.unique(hashes))),
+            duplicate_keys=int(dups.sum()),
+            bad_dates=self.bad_dates,
+            start=_timestamps(months[:1])[0] if len(months) else pd.NaT,
+            end=_timestamps(months[-1:])[0] if len(months) else pd.NaT,
+            unique_months=len(months),
+            series=series,
+            jumps=jumps,
+        )
+
+def profile_csv(path: str, version: str = "", chunksize: int = CHUNK_ROWS, jump_z: float = JUMP_Z,
+                updates: pd.DataFrame | None = None) -> QualityReport:
+    """Profile ``path`` in one streaming pass of ``chunksize`` rows (memory: ~20 bytes per row).
+
+    ``updates`` (rows of appended monthly updates, later rows winning) replace the CSV
+    rows of the same series and month and are profiled with them, so the report
+    describes the data the app uses. Each series' ``revised`` counts its replaced rows.
+    """
+    prof = _Profiler()
+    keys, replaced, columns = None, [], None
+    if updates is not None and not updates.empty:
+        key_cols = [c for c in KEY_COLUMNS if c in updates.columns]
+        updates = updates.drop_duplicates(subset=key_cols, keep="last")
+        keys = pd.MultiIndex.from_frame(updates[key_cols].astype(str))
+    for chunk in pd.read_csv(path, sep=";", decimal=",", chunksize=chunksize):
+        chunk = tidy(chunk)
+        columns = chunk.columns
+        if keys is not None:
+            hit = pd.MultiIndex.from_frame(chunk[key_cols].astype(str)).isin(keys)
+            replaced.append(chunk.loc[hit, [c for c in key_cols if c != "date"]].astype(str))
+            chunk = chunk[~hit]
+        prof.add(chunk)
+    if keys is not None:
+        prof.add(updates.reindex(columns=columns if columns is not None else updates.columns))
+    report = prof.report(version, jump_z)
+    if not replaced:
+        return report
+    cols = [c for c in key_cols if c != "date"]
+    revised = pd.concat(replaced).groupby(cols).size().rename("revised").reset_index()
+    series = report.series.drop(columns="revised").astype({c: str for c in cols}).merge(revised, on=cols, how="left")
+    series["revised"] = series["revised"].fillna(0).astype(int)
+    return replace(report, series=series)
+
+# ---- stored with the dataset version
+def _paths(path: str) -> tuple[str, str, str]:
+    stem = os.path.join(CACHE_DIR, f"{_cache_stem(path)}.quality")
+    return f"{stem}.json", f"{stem}.series.parquet", f"{stem}.jumps.parquet"
+
+def save_report(report: QualityReport, path: str) -> None:
+    meta_path, series_path, jumps_path = _paths(path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        report.series.to_parquet(series_path, index=False)
+        report.jumps.to_parquet(jumps_path, index=False)
+        meta = {k: v for k, v in report.__dict__.items() if k not in ("columns", "series", "jumps")}
+        meta.update(start=str(report.start), end=str(report.end), columns=report.columns.to_dict("records"))
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)  # written last: a report is only valid once this exists
+    except (ImportError, OSError):
+        pass
+
+def read_report(path: str, version: str) -> QualityReport | None:
+    meta_path, series_path, jumps_path = _paths(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != version:
+            return None
+        meta.update(start=pd.Timestamp(meta["start"]), end=pd.Timestamp(meta["end"]),
+                    columns=pd.DataFrame(meta["columns"]),
+                    series=pd.read_parquet(series_path), jumps=pd.read_parquet(jumps_path))
+        return QualityReport(**meta)
+    except (ImportError, OSError, ValueError, KeyError, TypeError):
+        return None
+
+@cache_resource(show_spinner=False)
+def _report(path: str, version: str) -> QualityReport:
+    report = read_report(path, version)
+    if report is None:
+        from utils.io import load_updates
+        report = profile_csv(path, version, updates=load_updates(path))
+        save_report(report, path)
+    return report
+
+def quality_report(path: str = "data/DS_IPCH_M_data.csv") -> QualityReport:
+    # Profiled once per data version (CSV + appended updates), then read back from disk
+    from utils.io import data_version
+    return _report(path, data_version(path))
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Profile a DS_IPCH_M CSV (missing values, duplicates, gaps, jumps).")
+    parser.add_argument("data", nargs="?", default="data/DS_IPCH_M_data.csv")
+    args = parser.parse_args(argv)
+    r = quality_report(args.data)
+    s = r.series
+    print(f"{r.rows:,} rows · {len(s):,} series · {r.start:%Y-%m} → {r.end:%Y-%m} ({r.unique_months} months)")
+    print(f"duplicate rows {r.duplicate_rows:,} · duplicate keys {r.duplicate_keys:,} · unreadable dates {r.bad_dates:,}")
+    print(f"series with gaps {int((s['gaps'] > 0).sum()):,} · with jumps {int((s['jumps'] > 0).sum()):,}"
+          f" · with values <= 0 {int((s['non_positive'] > 0).sum()):,} · revised rows {int(s['revised'].sum()):,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Range queries for the date-slider pages. The frame is sorted once; a [start, end] range
+# becomes a (lo, hi) row span by binary search, and every statistic over a span is O(1):
+# prefix sums for sums / counts / means, a sparse table for max and argmax.
+
+def _prefix(x: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(x) + 1)
+    np.cumsum(x, out=out[1:])
+    return out
+
+def _sparse_argmax(x: np.ndarray) -> list[np.ndarray]:
+    # table[k][i] = position of the (first) max of x[i : i + 2**k]
+    table = [np.arange(len(x))]
+    k = 1
+    while (1 << k) <= len(x):
+        prev, half = table[-1], 1 << (k - 1)
+        a, b = prev[:-half], prev[half:]
+        table.append(np.where(x[b] > x[a], b, a))
+        k += 1
+    return table
+
+class SeriesQuery:
+    """O(log n) range slicing and O(1) range statistics over a date-sorted frame.
+
+    ``frame`` is kept as-is (read-only, sorted by ``date_col``); ``rows``
+    returns positional slices of it, never masked copies. Results of
+    ``summary`` are memoized per (column, row span) with LRU eviction.
+    """
+
+    def __init__(self, frame: pd.DataFrame, date_col: str = "date", columns=("yoy",), memo_size: int = 1024):
+        self.frame = frame.sort_values(date_col, kind="stable").reset_index(drop=True)
+        self.dates = self.frame[date_col].to_numpy()
+        self._cols = {}
+        for c in columns:
+            x = self.frame[c].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(x)
+            ranked = np.where(valid, x, -np.inf)
+            self._cols[c] = {
+                "x": x,
+                "ranked": ranked,
+                "sum": _prefix(np.where(valid, x, 0.0)),
+                "n": _prefix(valid),
+                "positive": _prefix(x > 0),
+                "argmax": _sparse_argmax(ranked),
+            }
+        self._memo: OrderedDict = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()  # one query object is shared by all sessions
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    # ---- ranges
+    def span(self, start=None, end=None) -> tuple[int, int]:
+        """Row span [lo, hi) of the dates within [start, end] (either bound may be None)."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), "right"))
+        return lo, max(hi, lo)
+
+    def rows(self, start=None, end=None) -> pd.DataFrame:
+        lo, hi = self.span(start, end)
+        return self.frame.iloc[lo:hi]
+
+    # ---- O(1) statistics over a row span
+    def argmax(self, col: str, lo: int, hi: int) -> int:
+        """Position of the first maximum in [lo, hi), -1 if the span has no value."""
+        if hi <= lo:
+            return -1
+        c = self._cols[col]
+        k = (hi - lo).bit_length() - 1
+        i, j = c["argmax"][k][lo], c["argmax"][k][hi - (1 << k)]
+        best = j if c["ranked"][j] > c["ranked"][i] else i
+        return int(best) if c["ranked"][best] > -np.inf else -1
+
+    def count(self, col: str, lo: int, hi: int) -> int:
+        n = self._cols[col]["n"]
+        return int(n[hi] - n[lo])
+
+    def mean(self, col: str, lo: int, hi: int) -> float:
+        c = self._cols[col]
+        n = c["n"][hi] - c["n"][lo]
+        return float((c["sum"][hi] - c["sum"][lo]) / n) if n else np.nan
+
+    def positives(self, col: str, lo: int, hi: int) -> int:
+        p = self._cols[col]["positive"]
+        return int(p[hi] - p[lo])
+
+    def last_valid(self, col: str, lo: int, hi: int) -> int:
+        """Position of the last non-missing value in [lo, hi), -1 if none."""
+        n = self._cols[col]["n"]
+        if n[hi] == n[lo]:
+            return -1
+        return int(np.searchsorted(n, n[hi], "left")) - 1
+
+    # ---- the numbers the Overview page prints
+    def summary(self, start=None, end=None, col: str = "yoy", tail: int = 12) -> dict | None:
+        """Peak, latest and last-``tail``-rows mean of ``col`` between start and end."""
+        lo, hi = self.span(start, end)
+        key = (col, lo, hi, tail)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        peak, last = self.argmax(col, lo, hi), self.last_valid(col, lo, hi)
+        out = None
+        if peak >= 0:
+            x = self._cols[col]["x"]
+            out = {
+                "rows": hi - lo,
+                "peak": float(x[peak]),
+                "peak_date": pd.Timestamp(self.dates[peak]),
+                "latest": float(x[last]),
+                "latest_date": pd.Timestamp(self.dates[last]),
+                "tail_mean": self.mean(col, max(lo, hi - tail), hi),
+            }
+        with self._lock:
+            self._memo[key] = out
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return out
+
+def headline_query(head: pd.DataFrame) -> SeriesQuery:
+    # CP00 months that have a YoY rate (the rows the Overview page plots)
+    return SeriesQuery(head.dropna(subset=["yoy"]), "date", ("yoy", "mom"))
@@ -0,0 +1,76 @@
+"""Headless conclusions report (no Streamlit / Plotly).
+
+    python -m utils.report data/DS_IPCH_M_data.csv --format md
+    python -m utils.report snapshots/*.csv --format json --out reports/
+    python -m utils.report --as-of 2024-06 --format md        # as published in a past release
+"""
+import argparse
+import json
+import os
+import sys
+
+from utils.detect import detect_panel
+from utils.forecast import HORIZON, forecast_panel
+from utils.labels import load_labels
+from utils.snapshot import snapshot_from_file
+from utils.summary import conclusions, to_markdown, to_rows
+
+EXTENSIONS = {"json": "json", "md": "md", "csv": "csv"}
+
+def render(summary: dict, fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(summary, indent=2, ensure_ascii=False) + "\n"
+    if fmt == "md":
+        return to_markdown(summary)
+    return to_rows(summary).to_csv(index=False)
+
+def _snapshot_as_of(path: str, release: str, geo: str | None = None):
+    # Past dashboard: the snapshot of the data as it was published in ``release``
+    from utils.snapshot import build_snapshot
+    from utils.vintage import VintageStore
+    store = VintageStore.for_data(path)
+    k = store.resolve(int(release) if release.lstrip("-").isdigit() else release)
+    return build_snapshot(store.panel_as_of(k, geo), f"release {store.releases()['release'].iloc[k]}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Write the HICP conclusions for one or more data files.")
+    parser.add_argument("data", nargs="*", default=["data/DS_IPCH_M_data.csv"], help="DS_IPCH_M-style CSV file(s)")
+    parser.add_argument("--meta", default="data/DS_IPCH_M_metadata.csv", help="metadata CSV (labels)")
+    parser.add_argument("--format", choices=sorted(EXTENSIONS), default="json")
+    parser.add_argument("--out", help="output folder (one file per data file); stdout if omitted")
+    parser.add_argument("--geo", help="country of a multi-country file (default: FR)")
+    parser.add_argument("--no-cache", action="store_true", help="parse the CSV directly, skip the Parquet cache")
+    parser.add_argument("--as-of", metavar="RELEASE", help="use the data as published in a recorded release (utils.vintage)")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="forecast months in the outlook (0: no outlook)")
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.meta)
+    status = 0
+    for path in args.data:
+        if args.as_of:
+            try:
+                snap = _snapshot_as_of(path, args.as_of, args.geo)
+            except ValueError as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                status = 1
+                continue
+        else:
+            snap = snapshot_from_file(path, use_cache=not args.no_cache, geo=args.geo)
+        forecast = forecast_panel(snap.panel, args.horizon, snap.version) if args.horizon > 0 else None
+        summary = conclusions(snap, labels, forecast=forecast, detections=detect_panel(snap.panel, snap.version))
+        if summary is None:
+            print(f"{path}: not enough data for a summary", file=sys.stderr)
+            status = 1
+            continue
+        text = render({"source": path, **summary} if args.format == "json" else summary, args.format)
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            stem = os.path.splitext(os.path.basename(path))[0]
+            with open(os.path.join(args.out, f"{stem}.{EXTENSIONS[args.format]}"), "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
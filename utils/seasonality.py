@@ -0,0 +1,226 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.panel import CODE_COL, SeriesPanel
+
+# Seasonality by regime: a regime is a named span of years, e.g. ("pre", 2016, 2019).
+# The panel is laid out once as a (years × 12 × codes) grid with running sums over the
+# year axis, so the calendar-month profile of any regime is a difference of two slices:
+# trying another split of the years costs O(12 × codes), not a regroup of the panel.
+
+DEFAULT_REGIMES = (("pre", 2016, 2019), ("post", 2020, 2025))
+HENDERSON_13 = np.array([-0.019, -0.028, 0.0, 0.066, 0.147, 0.214, 0.240,
+                         0.214, 0.147, 0.066, 0.0, -0.028, -0.019])
+
+def parse_regimes(text: str) -> tuple:
+    """'2016-2019, 2020-2025' or 'pre:2016-2019, post:2020-' -> (("pre", 2016, 2019), ...).
+
+    Unnamed regimes are called after their years; an open end means "up to 9999".
+    """
+    out = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        m = re.fullmatch(r"(?:([\w\- ]+?)\s*:\s*)?(\d{4})\s*-\s*(\d{4})?", part)
+        if not m:
+            raise ValueError(f"cannot read regime {part!r} (expected e.g. 2016-2019 or post:2020-)")
+        first, last = int(m.group(2)), int(m.group(3) or 9999)
+        if last < first:
+            raise ValueError(f"regime {part!r} ends before it starts")
+        out.append((m.group(1) or f"{first}-{m.group(3) or ''}", first, last))
+    return tuple(out)
+
+# ---- column-wise moving averages (NaN anywhere in the window -> NaN)
+def _moving(x: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    k = len(weights)
+    half = k // 2
+    out = np.full(x.shape, np.nan)
+    if len(x) < k:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(x, k, axis=0)  # (T-k+1, C, k)
+    out[half:len(x) - half] = windows @ weights
+    return out
+
+def _centered_ma(x: np.ndarray, period: int = 12) -> np.ndarray:
+    # 2 × period moving average (centred trend for an even period)
+    w = np.ones(period + 1)
+    w[0] = w[-1] = 0.5
+    return _moving(x, w / period)
+
+def _nanmean(x: np.ndarray, axis: int, keepdims: bool = False) -> np.ndarray:
+    # np.nanmean without the warning on all-NaN slices (series with no data in a window)
+    n = (~np.isnan(x)).sum(axis=axis, keepdims=keepdims)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.isnan(x), 0.0, x).sum(axis=axis, keepdims=keepdims) / n
+
+def _year_grid(x: np.ndarray, first_month: int) -> np.ndarray:
+    # (T × C) monthly rows -> (years × 12 × C), NaN-padded to whole calendar years
+    pad_front = first_month - 1
+    total = -(-(pad_front + len(x)) // 12) * 12
+    grid = np.full((total,) + x.shape[1:], np.nan)
+    grid[pad_front:pad_front + len(x)] = x
+    return grid.reshape(total // 12, 12, *x.shape[1:])
+
+def _from_year_grid(grid: np.ndarray, first_month: int, length: int) -> np.ndarray:
+    flat = grid.reshape(-1, *grid.shape[2:])
+    return flat[first_month - 1:first_month - 1 + length]
+
+def _s3x3(grid: np.ndarray) -> np.ndarray:
+    # 3 × 3 moving average of each calendar month across years; ends use the weights available
+    w = np.array([1, 2, 3, 2, 1], dtype=np.float64)
+    valid = ~np.isnan(grid)
+    vals = np.where(valid, grid, 0.0)
+    num = np.zeros(grid.shape)
+    den = np.zeros(grid.shape)
+    for shift, wk in zip(range(-2, 3), w):
+        lo, hi = max(shift, 0), len(grid) + min(shift, 0)
+        num[lo - shift:hi - shift] += wk * vals[lo:hi]
+        den[lo - shift:hi - shift] += wk * valid[lo:hi]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+def decompose(panel: SeriesPanel, model: str = "multiplicative", iterations: int = 2) -> dict[str, np.ndarray]:
+    """X-11-style classical decomposition of every series: trend, seasonal, irregular.
+
+    Trend: centred 2×12 moving average, then Henderson-13 on the seasonally
+    adjusted series for each further iteration. Seasonal: 3×3 moving average
+    of each calendar month across years, normalised to average 1 (or 0 when
+    ``model`` is "additive") over any 12 consecutive months. All arrays are
+    (months × codes); the first and last six months have no trend.
+    """
+    if model not in ("multiplicative", "additive"):
+        raise ValueError(f"unknown model {model!r}")
+    mult = model == "multiplicative"
+    x = panel.values
+    first_month = int(panel.dates[0].month) if len(panel.dates) else 1
+    trend = _centered_ma(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i in range(max(iterations, 1)):
+            si = x / trend if mult else x - trend
+            raw = _from_year_grid(_s3x3(_year_grid(si, first_month)), first_month, len(x))
+            level = _centered_ma(raw)
+            level = np.where(np.isnan(level), _nanmean(raw, axis=0), level)
+            seasonal = raw / level if mult else raw - level
+            if i + 1 < iterations:
+                trend = _moving(x / seasonal if mult else x - seasonal, HENDERSON_13)
+        irregular = x / (trend * seasonal) if mult else x - trend - seasonal
+    return {"trend": trend, "seasonal": seasonal, "irregular": irregular}
+
+class SeasonalityEngine:
+    """Calendar-month profiles and seasonal factors of a panel, for any set of regimes.
+
+    Results are memoized per regime set (LRU); the running sums behind them
+    are built once per panel.
+    """
+
+    def __init__(self, panel: SeriesPanel, memo_size: int = 32):
+        self.panel = panel
+        self.codes = panel.codes
+        if len(panel.dates):
+            self.first_year, first_month = int(panel.dates[0].year), int(panel.dates[0].month)
+        else:
+            self.first_year, first_month = 0, 1
+        self._first_month = first_month
+        mom = _year_grid(panel.mom, first_month)
+        self._mom_sum = self._running(np.where(np.isnan(mom), 0.0, mom))
+        self._mom_n = self._running(~np.isnan(mom))
+        self._seen = self._running(~np.isnan(_year_grid(panel.values, first_month)))
+        self._si = None
+        self._memo: OrderedDict = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _running(grid: np.ndarray) -> np.ndarray:
+        out = np.zeros((len(grid) + 1,) + grid.shape[1:])
+        np.cumsum(grid, axis=0, out=out[1:])
+        return out
+
+    def _years(self, first: int, last: int) -> tuple[int, int]:
+        n = len(self._mom_sum) - 1
+        return int(np.clip(first - self.first_year, 0, n)), int(np.clip(last - self.first_year + 1, 0, n))
+
+    def _memoized(self, key, build):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        out = build()
+        with self._lock:
+            self._memo[key] = out
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return out
+
+    def profiles(self, regimes=DEFAULT_REGIMES) -> tuple[np.ndarray, np.ndarray]:
+        """Mean MoM by calendar month, (regimes × 12 × codes), and where each regime has data."""
+        regimes = tuple(tuple(r) for r in regimes)
+
+        def build():
+            mean = np.full((len(regimes), 12, len(self.codes)), np.nan)
+            seen = np.zeros(mean.shape, dtype=bool)
+            for i, (_, first, last) in enumerate(regimes):
+                lo, hi = self._years(first, last)
+                n = self._mom_n[hi] - self._mom_n[lo]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    mean[i] = (self._mom_sum[hi] - self._mom_sum[lo]) / n
+                seen[i] = (self._seen[hi] - self._seen[lo]) > 0
+            return mean, seen
+
+        return self._memoized(("profiles", regimes), build)
+
+    def decomposition(self) -> dict[str, np.ndarray]:
+        """``decompose`` of the panel (trend, seasonal, irregular), computed once."""
+        return self._memoized(("decomposition",), lambda: decompose(self.panel))
+
+    def factors(self, regimes=DEFAULT_REGIMES) -> np.ndarray:
+        """Seasonal factors (regimes × 12 × codes): mean of the decomposition's seasonal
+        component per calendar month over the regime's years, scaled to average 1 over
+        the year. 1.01 = that month sits 1% above trend."""
+        regimes = tuple(tuple(r) for r in regimes)
+        if self._si is None:
+            si = _year_grid(self.decomposition()["seasonal"], self._first_month)
+            self._si = (self._running(np.where(np.isnan(si), 0.0, si)), self._running(~np.isnan(si)))
+
+        def build():
+            total, count = self._si
+            out = np.full((len(regimes), 12, len(self.codes)), np.nan)
+            for i, (_, first, last) in enumerate(regimes):
+                lo, hi = self._years(first, last)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    out[i] = (total[hi] - total[lo]) / (count[hi] - count[lo])
+            return out / _nanmean(out, axis=1, keepdims=True)
+
+        return self._memoized(("factors", regimes), build)
+
+    def profile_frame(self, regimes=DEFAULT_REGIMES, codes=None, prefix: str = "mom") -> pd.DataFrame:
+        """Long frame (expenditure_1999, month, <prefix>_<regime>...) sorted by code and month.
+
+        A (code, month) row is kept when any regime has an observation for it.
+        """
+        mean, seen = self.profiles(regimes)
+        cols = np.arange(len(self.codes)) if codes is None else self.codes.get_indexer(pd.Index(codes))
+        cols = np.sort(cols[cols >= 0])
+        keep = seen[:, :, cols].any(axis=0).T                      # codes × months
+        ci, mi = np.nonzero(keep)
+        out = pd.DataFrame({CODE_COL: self.codes[cols].astype(str)[ci], "month": mi + 1})
+        for i, (name, _, _) in enumerate(regimes):
+            vals = mean[i][:, cols].T
+            out[f"{prefix}_{name}"] = np.where(seen[i][:, cols].T, vals, np.nan)[ci, mi]
+        return out
+
+    def factor_frame(self, regimes=DEFAULT_REGIMES, codes=None) -> pd.DataFrame:
+        # Long frame (expenditure_1999, month, regime, factor) for charts
+        f = self.factors(regimes)
+        cols = np.arange(len(self.codes)) if codes is None else self.codes.get_indexer(pd.Index(codes))
+        cols = cols[cols >= 0]
+        ri, mi, ci = np.nonzero(~np.isnan(f[:, :, cols]))
+        names = np.array([r[0] for r in regimes], dtype=object)
+        return pd.DataFrame({
+            CODE_COL: self.codes[cols].astype(str)[ci],
+            "month": mi + 1,
+            "regime": names[ri],
+            "factor": f[:, :, cols][ri, mi, ci],
+        })
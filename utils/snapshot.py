@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.hierarchy import CoicopTree, hierarchy_stats
+from utils.kernels import RunningVolatility
+from utils.panel import CODE_COL, SeriesPanel
+from utils.query import SeriesQuery, headline_query
+from utils.seasonality import SeasonalityEngine
+from utils.trace import instrument
+
+SEASONAL_PRE = (2016, 2019)
+SEASONAL_POST = (2020, 2025)
+REGIMES = (("pre", *SEASONAL_PRE), ("post", *SEASONAL_POST))
+ROLLING_WINDOWS = (24, 36)
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """Every derived table the pages need, built once per data version.
+
+    Pages must treat the frames as read-only (merge/copy before changing them):
+    the same object is shared by all sessions.
+    """
+    version: str
+    panel: SeriesPanel
+    vol_state: RunningVolatility  # full-history YoY volatility of every series, updatable
+    head: pd.DataFrame        # CP00 with mom / yoy
+    head_query: SeriesQuery   # range queries (date slider) over CP00 rows with a YoY
+    cats: pd.DataFrame        # CP00..CP12 with mom / yoy
+    gap: pd.DataFrame         # last-12-months mean YoY minus headline, per division
+    scores: pd.DataFrame      # volatility / persistence per division
+    rolling_vol: dict         # window (months) -> trailing volatility / persistence per division
+    seasonality: pd.DataFrame # avg MoM by calendar month, pre vs post window
+    seasonal: SeasonalityEngine  # profiles / seasonal factors of every series for any regimes
+    tree: CoicopTree
+    tree_stats: pd.DataFrame  # rates / gaps / volatility for every sub-index
+
+def volatility_table(codes: pd.Index, state: RunningVolatility) -> pd.DataFrame:
+    out = pd.DataFrame({CODE_COL: codes.astype(str), **state.result()})
+    return out[[CODE_COL, "vol", "n", "sc", "persistence"]].sort_values("vol", ascending=False)
+
+def build_snapshot(panel: SeriesPanel, version: str = "") -> AnalyticsSnapshot:
+    from utils.prep import (
+        headline, top_categories, last12_gap_vs_headline,
+        volatility_persistence, rolling_volatility,
+    )
+    divisions = panel.match(r"^CP\d{2}$")
+    tree = CoicopTree(panel.codes)
+    head = headline(panel)
+    seasonal = SeasonalityEngine(panel)
+    return AnalyticsSnapshot(
+        version=version,
+        panel=panel,
+        vol_state=RunningVolatility(panel.yoy),
+        head=head,
+        head_query=headline_query(head),
+        cats=top_categories(panel),
+        gap=last12_gap_vs_headline(divisions, panel.select(["CP00"])),
+        scores=volatility_persistence(divisions),
+        rolling_vol={w: rolling_volatility(divisions, w) for w in ROLLING_WINDOWS},
+        seasonality=seasonal.profile_frame(REGIMES, codes=divisions.codes),
+        seasonal=seasonal,
+        tree=tree,
+        tree_stats=hierarchy_stats(panel, tree),
+    )
+
+def refresh_snapshot(snap: AnalyticsSnapshot, rows: pd.DataFrame, version: str) -> AnalyticsSnapshot:
+    # Monthly update: fold new / revised rows into ``snap`` instead of rebuilding it
+    from utils.incremental import update_snapshot
+    return update_snapshot(snap, rows, version)
+
+def snapshot_from_file(path: str, use_cache: bool = True, geo: str | None = None) -> AnalyticsSnapshot:
+    # Uncached build for scripts / batch jobs (no Streamlit, nothing kept in memory)
+    from utils.io import DEFAULT_GEO, data_version, load_filtered, scan_csv
+    from utils.prep import SERIES_COLUMNS, SERIES_FILTER, _prepare, resolve_geo
+    if use_cache:
+        df = load_filtered(path, SERIES_FILTER, None, SERIES_COLUMNS, resolve_geo(path, geo))
+    else:
+        df = scan_csv(path, SERIES_FILTER, None, SERIES_COLUMNS, geo or DEFAULT_GEO)
+    version = data_version(path) if use_cache else ""
+    return build_snapshot(SeriesPanel.from_frame(_prepare(df)), version)
+
+instrument(globals())
@@ -0,0 +1,189 @@
+"""Shared on-disk result store: the tables of an AnalyticsSnapshot, written once per data version.
+
+    python -m utils.store                                  # publish the default data file
+    python -m utils.store data/eurostat.csv --geo all --watch 60
+
+A worker process (this CLI) builds the snapshot and publishes it under data/.cache;
+app processes only attach to it, read-only. Arrays are .npy files opened with
+mmap_mode="r" and tables are uncompressed Arrow IPC files opened memory-mapped, so
+N app workers share one copy in the OS page cache instead of N private copies.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.io import CACHE_DIR, _cache_stem
+from utils.panel import SeriesPanel
+from utils.trace import instrument
+
+KEEP_VERSIONS = 2  # older versions are pruned (processes still mapping them keep their pages)
+
+def _root(path: str, geo: str | None = None) -> str:
+    return os.path.join(CACHE_DIR, f"{_cache_stem(path)}.store", geo or "_")
+
+def store_path(path: str, version: str, geo: str | None = None) -> str:
+    return os.path.join(_root(path, geo), version)
+
+def has(path: str, version: str, geo: str | None = None) -> bool:
+    return os.path.exists(os.path.join(store_path(path, version, geo), "meta.json"))
+
+def _tables(snap) -> dict[str, pd.DataFrame]:
+    out = {name: getattr(snap, name) for name in ("head", "cats", "gap", "scores", "seasonality", "tree_stats")}
+    out.update({f"rolling_vol_{w}": df for w, df in snap.rolling_vol.items()})
+    return out
+
+def save_snapshot(snap, path: str, geo: str | None = None, summary: dict | None = None) -> str:
+    """Publish ``snap`` (and the ``summary`` of utils.summary.conclusions) for ``path``.
+
+    Written to a temporary folder and renamed into place, so readers never
+    see a partial version. Returns the version folder.
+    """
+    from pyarrow import feather
+    target = store_path(path, snap.version, geo)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    panel = snap.panel
+    arrays = {"values": panel.values, **panel._cache}
+    files = {}
+    for i, (key, arr) in enumerate(arrays.items()):
+        files[key] = f"a{i}.npy"
+        np.save(os.path.join(tmp, files[key]), np.ascontiguousarray(arr))
+    for name, df in _tables(snap).items():
+        feather.write_feather(df, os.path.join(tmp, f"{name}.arrow"), compression="uncompressed")
+    if summary is not None:
+        with open(os.path.join(tmp, "conclusions.json"), "w") as f:
+            json.dump(summary, f)
+    meta = {
+        "version": snap.version,
+        "geo": geo,
+        "first": str(panel.dates[0]) if len(panel.dates) else None,
+        "months": len(panel.dates),
+        "codes": [str(c) for c in panel.codes],
+        "arrays": files,
+        "rolling_windows": sorted(snap.rolling_vol),
+        "created": time.time(),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:  # last: a version is complete once this exists
+        json.dump(meta, f)
+    try:
+        os.replace(tmp, target)
+    except OSError:  # published meanwhile by another worker
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune(_root(path, geo), keep=snap.version)
+    return target
+
+def _prune(root: str, keep: str) -> None:
+    done = [d for d in os.listdir(root) if not d.endswith(".tmp") and os.path.exists(os.path.join(root, d, "meta.json"))]
+    done.sort(key=lambda d: os.path.getmtime(os.path.join(root, d, "meta.json")), reverse=True)
+    for d in done[KEEP_VERSIONS:]:
+        if d != keep:
+            shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+def _read_table(file: str) -> pd.DataFrame:
+    from pyarrow import feather
+    return feather.read_table(file, memory_map=True).to_pandas(split_blocks=True)
+
+def attach(path: str, version: str, geo: str | None = None):
+    """Snapshot of ``version`` backed by the store (None when it has not been published).
+
+    Only the light helper objects (tree, range-query and seasonality indexes,
+    volatility state) are rebuilt in this process.
+    """
+    from utils.hierarchy import CoicopTree
+    from utils.kernels import RunningVolatility
+    from utils.panel import CODE_COL
+    from utils.query import headline_query
+    from utils.seasonality import SeasonalityEngine
+    from utils.snapshot import AnalyticsSnapshot
+    folder = store_path(path, version, geo)
+    try:
+        with open(os.path.join(folder, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {k: np.load(os.path.join(folder, v), mmap_mode="r") for k, v in meta["arrays"].items()}
+        tables = {name[:-6]: _read_table(os.path.join(folder, name))
+                  for name in os.listdir(folder) if name.endswith(".arrow")}
+    except (ImportError, OSError, ValueError, KeyError):
+        return None
+    dates = (pd.period_range(meta["first"], periods=meta["months"], freq="M") if meta["months"]
+             else pd.PeriodIndex([], freq="M"))
+    panel = SeriesPanel(arrays.pop("values"), dates, pd.Index(meta["codes"], dtype=object, name=CODE_COL), rates=arrays)
+    return AnalyticsSnapshot(
+        version=meta["version"],
+        panel=panel,
+        vol_state=RunningVolatility(panel.yoy),
+        head=tables["head"],
+        head_query=headline_query(tables["head"]),
+        cats=tables["cats"],
+        gap=tables["gap"],
+        scores=tables["scores"],
+        rolling_vol={w: tables[f"rolling_vol_{w}"] for w in meta["rolling_windows"]},
+        seasonality=tables["seasonality"],
+        seasonal=SeasonalityEngine(panel),
+        tree=CoicopTree(panel.codes),
+        tree_stats=tables["tree_stats"],
+    )
+
+def read_conclusions(path: str, version: str, geo: str | None = None) -> dict | None:
+    try:
+        with open(os.path.join(store_path(path, version, geo), "conclusions.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def publish(path: str, geo: str | None = None, meta: str = "data/DS_IPCH_M_metadata.csv") -> str | None:
+    """Build and store the snapshot of the current data version (None if already published)."""
+    from utils.detect import detect_panel
+    from utils.forecast import forecast_panel
+    from utils.io import data_version
+    from utils.labels import load_labels
+    from utils.prep import prepare_snapshot, resolve_geo
+    from utils.summary import conclusions
+    geo = resolve_geo(path, geo)
+    version = data_version(path)
+    if has(path, version, geo):
+        return None
+    snap = prepare_snapshot(path, geo)  # folds appended updates into the previous version when it can
+    summary = conclusions(snap, load_labels(meta), forecast=forecast_panel(snap.panel, version=snap.version),
+                          detections=detect_panel(snap.panel, snap.version))
+    return save_snapshot(snap, path, geo, summary)
+
+def main(argv=None) -> None:
+    from utils.cache import set_backend
+    from utils.io import available_geos
+    from utils.vintage import record
+    parser = argparse.ArgumentParser(description="Precompute the dashboard tables into the shared result store.")
+    parser.add_argument("data", nargs="*", default=["data/DS_IPCH_M_data.csv"])
+    parser.add_argument("--geo", nargs="*", help="countries of a multi-country file ('all' for every one; default FR)")
+    parser.add_argument("--meta", default="data/DS_IPCH_M_metadata.csv", help="metadata CSV (labels)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="keep running, checking for new data every SECONDS")
+    parser.add_argument("--no-vintages", action="store_true", help="do not record new data versions in utils.vintage")
+    args = parser.parse_args(argv)
+    set_backend("memory")
+    while True:
+        for path in args.data:
+            entry = None if args.no_vintages else record(path)  # every version seen becomes a release
+            if entry:
+                print(f"{path}: recorded release {entry['release']} ({entry['revised']} revised observations)", file=sys.stderr)
+            geos = args.geo or [None]
+            if geos == ["all"]:
+                geos = available_geos(path) or [None]
+            for geo in geos:
+                t = time.perf_counter()
+                out = publish(path, geo, args.meta)
+                if out:
+                    print(f"{path} [{geo or '-'}]: published {out} in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+instrument(globals())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import pandas as pd
+
+from utils.panel import CODE_COL
+
+def _named(df: pd.DataFrame, value: str, labels) -> list[dict]:
+    names = labels.labels(df[CODE_COL], keep_code=True)
+    return [{"code": str(c), "label": str(l), value: float(v)}
+            for c, l, v in zip(df[CODE_COL], names, df[value])]
+
+def _names(items: list[dict]) -> str:
+    return ", ".join(i["label"] for i in items)
+
+def _outlook(forecast, labels, top: int) -> dict | None:
+    head = forecast.series("CP00")
+    if head.empty:
+        return None
+    f = forecast.frame
+    end = f[f["date"] == head["date"].iloc[-1]]
+    divisions = end[end[CODE_COL].astype(str).str.match(r"^CP(0[1-9]|1[0-2])$")]
+    model = forecast.models.set_index(CODE_COL).loc["CP00"]
+    return {
+        "origin": forecast.origin.date().isoformat(),
+        "horizon": forecast.horizon,
+        "headline": {
+            "next_date": head["date"].iloc[0].date().isoformat(),
+            "next_yoy": float(head["yoy"].iloc[0]),
+            "date": head["date"].iloc[-1].date().isoformat(),
+            "yoy": float(head["yoy"].iloc[-1]),
+            "low": float(head["yoy_lo"].iloc[-1]),
+            "high": float(head["yoy_hi"].iloc[-1]),
+            "model": str(model["model"]),
+            "mae": float(model["mae"]),
+        },
+        "highest": _named(divisions.sort_values("yoy", ascending=False).head(top), "yoy", labels),
+        "lowest": _named(divisions.sort_values("yoy", ascending=True).head(top), "yoy", labels),
+    }
+
+def _cycle(detections) -> dict | None:
+    d = detections.select(["CP00"])
+    if d.turning.empty:
+        return None
+    last = d.turning.iloc[-1]
+    return {
+        "last_kind": str(last["kind"]),
+        "last_date": last["date"].date().isoformat(),
+        "last_yoy": float(last["yoy"]),
+        "peaks": int((d.turning["kind"] == "peak").sum()),
+        "troughs": int((d.turning["kind"] == "trough").sum()),
+        "breaks": [{"date": r.date.date().isoformat(), "mom_before": float(r.mom_before), "mom_after": float(r.mom_after)}
+                   for r in d.breaks.itertuples()],
+        "outliers": [r.date.date().isoformat() for r in d.outliers.itertuples()],
+    }
+
+def conclusions(snap, labels, top: int = 3, forecast=None, detections=None) -> dict | None:
+    """Key findings of the Conclusions page as plain data (None if there is not enough data).
+
+    ``labels`` is the code -> label dictionary (see ``utils.labels.load_labels``);
+    with a ``forecast`` (``utils.forecast.forecast_panel``) an outlook is added, with
+    ``detections`` (``utils.detect.detect_panel``) the headline's turning points.
+    """
+    head = snap.head.dropna(subset=["yoy"])
+    if head.empty or snap.cats.empty:
+        return None
+
+    # 1) Headline
+    peak_at = head["yoy"].idxmax()
+    out = {
+        "version": snap.version,
+        "headline": {
+            "peak_yoy": float(head["yoy"].max()),
+            "peak_date": head.loc[peak_at, "date"].date().isoformat(),
+            "latest_yoy": float(head["yoy"].iloc[-1]),
+            "latest_date": head["date"].iloc[-1].date().isoformat(),
+            "avg12_yoy": float(head["yoy"].tail(12).mean()),
+        },
+        "cycle": _cycle(detections) if detections is not None else None,
+    }
+
+    # 2) Drivers: last-12-months gap vs headline
+    gap = snap.gap
+    out["above"] = _named(gap.sort_values("diff", ascending=False).head(top), "diff", labels)
+    out["below"] = _named(gap.sort_values("diff", ascending=True).head(top), "diff", labels)
+
+    # 3) Volatility
+    scores = snap.scores
+    out["most_volatile"] = _named(scores.sort_values("vol", ascending=False).head(top), "vol", labels)
+    out["most_stable"] = _named(scores.sort_values("vol", ascending=True).head(top), "vol", labels)
+
+    # 4) Seasonality: average post - pre MoM per category
+    out["seasonality"] = None
+    prof = snap.seasonality
+    if not prof.empty:
+        delta = (prof.assign(delta=prof["mom_post"] - prof["mom_pre"])
+                     .groupby(CODE_COL)["delta"]
+                     .mean().reset_index().sort_values("delta", ascending=False))
+        if not delta.empty:
+            out["seasonality"] = {
+                "increase": _named(delta.head(1), "delta", labels)[0],
+                "decrease": _named(delta.tail(1), "delta", labels)[0],
+            }
+
+    # 5) Outlook: forecast YoY at the end of the horizon
+    out["outlook"] = _outlook(forecast, labels, top) if forecast is not None else None
+    return out
+
+def _cycle_lines(c: dict | None) -> list[str]:
+    if not c:
+        return []
+    lines = [f"- **Last turning point**: a **{c['last_kind']}** at **{c['last_yoy']:.2f}%** in **{c['last_date']}** "
+             f"({c['peaks']} peaks, {c['troughs']} troughs in the series)"]
+    lines += [f"- **Change of pace** from **{b['date']}**: average MoM {b['mom_before']:+.2f} → {b['mom_after']:+.2f} pp "
+              f"(seasonally adjusted)" for b in c["breaks"]]
+    if c["outliers"]:
+        lines.append(f"- **Unusual months**: {', '.join(c['outliers'])}")
+    return lines
+
+def to_markdown(s: dict) -> str:
+    h = s["headline"]
+    lines = [
+        "## 1) Headline (CP00)",
+        f"- **Peak YoY**: **{h['peak_yoy']:.2f}%** in **{h['peak_date']}**",
+        f"- **Latest YoY**: **{h['latest_yoy']:.2f}%** ({h['latest_date']})",
+        f"- **Average (last 12 months)**: **{h['avg12_yoy']:.2f}%**",
+        *_cycle_lines(s.get("cycle")),
+        "",
+        "## 2) Categories vs headline (last 12 months)",
+        f"- **Above the headline (pushing)**: {_names(s['above'])}",
+        f"- **Below the headline (softening)**: {_names(s['below'])}",
+        "",
+        "## 3) Stability vs. volatility",
+        f"- **Most volatile**: {_names(s['most_volatile'])}",
+        f"- **Most stable**: {_names(s['most_stable'])}",
+        "",
+    ]
+    if s["seasonality"]:
+        inc, dec = s["seasonality"]["increase"], s["seasonality"]["decrease"]
+        lines += [
+            "## 4) Seasonality (post-2020 vs pre-2020)",
+            f"- **Biggest rise in seasonal intensity**: **{inc['label']}** (avg MoM post–pre = **{inc['delta']:.2f} pp**)",
+            f"- **Biggest drop**: **{dec['label']}** (avg MoM post–pre = **{dec['delta']:.2f} pp**)",
+        ]
+    else:
+        lines.append("## 4) Seasonality — not enough data to compare pre/post 2020.")
+    if s.get("outlook"):
+        o = s["outlook"]
+        oh = o["headline"]
+        lines += [
+            "",
+            f"## 5) Outlook (forecast, {o['horizon']} months after {o['origin']})",
+            f"- **Headline YoY in {oh['date']}**: **{oh['yoy']:.2f}%** ("
+            + (f"80% range {oh['low']:.2f}% to {oh['high']:.2f}%, " if pd.notna(oh["low"]) and pd.notna(oh["high"]) else "")
+            + f"model {oh['model']})",
+            f"- **Highest expected YoY**: {_names(o['highest'])}",
+            f"- **Lowest expected YoY**: {_names(o['lowest'])}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def to_rows(s: dict) -> pd.DataFrame:
+    # Flat table (one finding per row) for CSV output
+    h = s["headline"]
+    rows = [
+        {"section": "headline", "rank": 1, "code": "CP00", "label": "peak_yoy", "value": h["peak_yoy"], "date": h["peak_date"]},
+        {"section": "headline", "rank": 1, "code": "CP00", "label": "latest_yoy", "value": h["latest_yoy"], "date": h["latest_date"]},
+        {"section": "headline", "rank": 1, "code": "CP00", "label": "avg12_yoy", "value": h["avg12_yoy"], "date": h["latest_date"]},
+    ]
+    if s.get("cycle"):
+        c = s["cycle"]
+        rows.append({"section": "cycle", "rank": 1, "code": "CP00", "label": f"last_{c['last_kind']}", "value": c["last_yoy"], "date": c["last_date"]})
+        rows += [{"section": "cycle", "rank": i + 1, "code": "CP00", "label": "break", "value": b["mom_after"] - b["mom_before"],
+                  "date": b["date"]} for i, b in enumerate(c["breaks"])]
+    for section, value in (("above", "diff"), ("below", "diff"), ("most_volatile", "vol"), ("most_stable", "vol")):
+        rows += [{"section": section, "rank": i + 1, "code": it["code"], "label": it["label"], "value": it[value]}
+                 for i, it in enumerate(s[section])]
+    if s["seasonality"]:
+        for k in ("increase", "decrease"):
+            it = s["seasonality"][k]
+            rows.append({"section": f"seasonality_{k}", "rank": 1, "code": it["code"], "label": it["label"], "value": it["delta"]})
+    if s.get("outlook"):
+        oh = s["outlook"]["headline"]
+        rows += [{"section": "outlook", "rank": 1, "code": "CP00", "label": f"forecast_{k}", "value": oh[k], "date": oh["date"]}
+                 for k in ("yoy", "low", "high")]
+        for section in ("highest", "lowest"):
+            rows += [{"section": f"outlook_{section}", "rank": i + 1, "code": it["code"], "label": it["label"],
+                      "value": it["yoy"], "date": oh["date"]} for i, it in enumerate(s["outlook"][section])]
+    out = pd.DataFrame(rows)
+    out.insert(0, "version", s["version"])
+    return out
@@ -0,0 +1,153 @@
+"""Timing spans for finding where a page render spends its time.
+
+Off by default: turn it on with HICP_TRACE=1 in the environment, with ``enable()``,
+or from the Diagnostics page. HICP_TRACE_LOG=path.jsonl also appends every span to
+a JSON-lines log. Cache hits / misses are always counted (see utils.cache).
+
+Modules opt in with ``instrument(globals())`` at their end: every function they
+define is wrapped in a span named after it (utils.io, utils.prep, utils.charts,
+utils.snapshot, utils.store). ``enable()`` also wraps Plotly Express figure
+builders and Streamlit's chart calls, which is where figures are serialized.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+RECENT = 2000     # spans kept for the "latest spans" table
+SAMPLES = 512     # durations kept per span name (for percentiles)
+PLOTLY_BUILDERS = ("line", "bar", "scatter", "area", "histogram", "box", "imshow")
+STREAMLIT_CHARTS = ("plotly_chart", "line_chart", "bar_chart", "area_chart")
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_stats: dict[str, list] = {}   # name -> [calls, total s, max s, last s, deque of recent s]
+_recent: deque = deque(maxlen=RECENT)
+_log = None
+_started = time.time()
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(log_path: str | None = None) -> None:
+    global _enabled, _log
+    log_path = log_path or os.environ.get("HICP_TRACE_LOG")
+    if log_path and _log is None:
+        _log = open(log_path, "a", buffering=1)
+    _wrap_ui()
+    _enabled = True
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+        _started = time.time()
+
+def _record(name: str, seconds: float, parent: str | None, attrs: dict) -> None:
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = [0, 0.0, 0.0, 0.0, deque(maxlen=SAMPLES)]
+        s[0] += 1
+        s[1] += seconds
+        s[2] = max(s[2], seconds)
+        s[3] = seconds
+        s[4].append(seconds)
+        event = {"ts": time.time(), "name": name, "ms": seconds * 1000, "parent": parent,
+                 "thread": threading.current_thread().name, **attrs}
+        _recent.append(event)
+        if _log is not None:
+            _log.write(json.dumps({"pid": os.getpid(), **event}, default=str) + "\n")
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the enclosed block as ``name`` (nested spans remember their parent)."""
+    if not _enabled:
+        yield
+        return
+    stack = _local.__dict__.setdefault("stack", [])
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stack.pop()
+        _record(name, time.perf_counter() - start, parent, attrs)
+
+def timed(name: str):
+    def decorate(func):
+        @functools.wraps(func)
+        def call(*args, **kw):
+            if not _enabled:
+                return func(*args, **kw)
+            with span(name):
+                return func(*args, **kw)
+        call.__traced__ = True
+        return call
+    return decorate
+
+def instrument(namespace: dict) -> None:
+    # Wrap every function defined in the calling module (pass its globals())
+    module = namespace["__name__"]
+    short = module.rsplit(".", 1)[-1]
+    for key, value in list(namespace.items()):
+        if callable(value) and not isinstance(value, type) and getattr(value, "__module__", None) == module \
+                and not getattr(value, "__traced__", False):
+            namespace[key] = timed(f"{short}.{key}")(value)
+
+def _wrap_ui() -> None:
+    # Figure building (Plotly Express) and figure serialization (Streamlit chart calls)
+    targets = [("streamlit", "st", STREAMLIT_CHARTS), ("plotly.express", "px", PLOTLY_BUILDERS)]
+    for module_name, short, names in targets:
+        try:
+            module = __import__(module_name, fromlist=["_"])
+        except ImportError:
+            continue
+        for key in names:
+            func = getattr(module, key, None)
+            if func is not None and not getattr(func, "__traced__", False):
+                setattr(module, key, timed(f"{short}.{key}")(func))
+
+# ---- read out
+def stats() -> list[dict]:
+    """One row per span name: calls, total / mean / p95 / max / last (ms), slowest total first."""
+    with _lock:
+        rows = []
+        for name, (calls, total, worst, last, samples) in _stats.items():
+            ordered = sorted(samples)
+            rows.append({
+                "name": name, "calls": calls, "total_ms": total * 1000, "mean_ms": total / calls * 1000,
+                "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+                "max_ms": worst * 1000, "last_ms": last * 1000,
+            })
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+def recent(n: int = 200) -> list[dict]:
+    with _lock:
+        return list(_recent)[-n:][::-1]
+
+def metrics() -> dict:
+    # Everything above as one JSON-serializable document (for export / scraping)
+    from utils.cache import cache_stats, get_backend
+    return {
+        "pid": os.getpid(),
+        "since": _started,
+        "now": time.time(),
+        "enabled": _enabled,
+        "cache_backend": get_backend(),
+        "spans": stats(),
+        "caches": cache_stats(),
+    }
+
+if os.environ.get("HICP_TRACE", "").lower() in ("1", "true", "yes"):
+    enable()
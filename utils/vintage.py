@@ -0,0 +1,281 @@
+"""Append-only store of every release (vintage) of a DS_IPCH_M file, with point-in-time queries.
+
+    python -m utils.vintage add                                  # record the current data file
+    python -m utils.vintage add archive/2024-*.csv               # backfill older releases (oldest first)
+    python -m utils.vintage list
+    python -m utils.vintage stats --by division
+    python -m utils.vintage as-of 2024-06 --codes CP00 CP01
+
+A release stores only its changes against the previous one: observations that are
+new, revised, or gone (value NaN), as (series id, month, value) rows. Series ids and
+months are delta-encoded integers and values byte-split floats in zstd Parquet, so a
+monthly release of the full sub-index panel costs a few kB. Reading "as of release k"
+keeps, per observation, the last row written by releases 0..k.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.io import GEO_COL, _cache_stem, _file_hash, _read_manifest, _write_manifest
+from utils.panel import CODE_COL, SeriesPanel
+
+VINTAGE_DIR = "data/vintages"
+_MONTHS = 1 << 20  # key = series id * _MONTHS + month ordinal
+
+def _keys(sid: np.ndarray, month: np.ndarray) -> np.ndarray:
+    return sid.astype(np.int64) * _MONTHS + month
+
+def _release_month(entry: dict) -> pd.Period | None:
+    # Last month of the data in a release (older manifests: read from a default release name)
+    text = entry.get("month") or entry["release"].split(".")[0]
+    try:
+        return pd.Period(text, freq="M")
+    except (ValueError, TypeError):
+        return None
+
+class VintageStore:
+    """Releases of one dataset under ``root`` (manifest.json + one Parquet delta per release)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._manifest_path = os.path.join(root, "manifest.json")
+        self._log = None  # (manifest mtime, sorted keys, vintages, values)
+
+    @classmethod
+    def for_data(cls, path: str = "data/DS_IPCH_M_data.csv") -> "VintageStore":
+        # Keyed like the Parquet cache: same-named files in other folders keep separate histories
+        return cls(os.path.join(VINTAGE_DIR, _cache_stem(path)))
+
+    def _manifest(self) -> dict:
+        return _read_manifest(self._manifest_path) or {"series": [], "vintages": []}
+
+    # ---- writing
+    def add_frame(self, df: pd.DataFrame, source: str, release: str | None = None) -> dict | None:
+        """Record the long frame ``df`` (date, [geo,] expenditure_1999, value) as the next release.
+
+        ``source`` identifies the content (file hash / data version): a source already
+        recorded is skipped (None). ``release`` defaults to the last month in ``df``.
+        Returns the release entry of the manifest.
+        """
+        manifest = self._manifest()
+        if any(v["source"] == source for v in manifest["vintages"]):
+            return None
+        df = df.dropna(subset=["date"])
+        geo = df[GEO_COL].astype(str).to_numpy() if GEO_COL in df.columns else np.full(len(df), "")
+        ids = pd.Series(geo, dtype=object) + "|" + df[CODE_COL].astype(str).to_numpy()
+        names = pd.Index([f"{g}|{c}" for g, c in manifest["series"]], dtype=object)
+        fresh = pd.Index(pd.unique(ids))
+        fresh = fresh[names.get_indexer(fresh) < 0]
+        series = manifest["series"] + [s.split("|", 1) for s in fresh]
+        sid = names.append(fresh).get_indexer(ids)
+        month = pd.PeriodIndex(df["date"], freq="M").asi8
+        new = pd.Series(df["value"].to_numpy(dtype=np.float64, na_value=np.nan), index=_keys(sid, month))
+        new = new[~new.index.duplicated(keep="last")].dropna().sort_index()
+
+        old = self.as_of_keys(len(manifest["vintages"]) - 1) if manifest["vintages"] else pd.Series(dtype=np.float64)
+        both = pd.concat([old.rename("old"), new.rename("new")], axis=1)  # union of keys
+        in_old, in_new = both.index.isin(old.index), both.index.isin(new.index)
+        added = ~in_old & in_new
+        gone = in_old & ~in_new
+        revised = in_old & in_new & (both["old"] != both["new"]).to_numpy()
+        changed = added | gone | revised
+
+        n = len(manifest["vintages"])
+        file = f"v{n:05d}.parquet"
+        self._write_delta(both.index.to_numpy()[changed], both["new"].to_numpy()[changed], file)
+        labels = {v["release"] for v in manifest["vintages"]}
+        release = release or (str(pd.Period(ordinal=month.max(), freq="M")) if len(month) else f"r{n}")
+        name, k = release, 2
+        while name in labels:
+            name, k = f"{release}.{k}", k + 1
+        last = str(pd.Period(ordinal=month.max(), freq="M")) if len(month) else None
+        entry = {"release": name, "month": last, "file": file, "source": source, "added": time.time(),
+                 "rows": int(len(new)), "new": int(added.sum()), "revised": int(revised.sum()), "removed": int(gone.sum())}
+        _write_manifest({"series": series, "vintages": manifest["vintages"] + [entry]}, self._manifest_path)
+        self._log = None
+        return entry
+
+    def _write_delta(self, keys: np.ndarray, values: np.ndarray, file: str) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.table({"sid": (keys // _MONTHS).astype(np.int32), "month": (keys % _MONTHS).astype(np.int32),
+                          "value": values.astype(np.float64)})
+        pq.write_table(table, os.path.join(self.root, file), compression="zstd", use_dictionary=False,
+                       column_encoding={"sid": "DELTA_BINARY_PACKED", "month": "DELTA_BINARY_PACKED",
+                                        "value": "BYTE_STREAM_SPLIT"})
+
+    def add(self, path: str, release: str | None = None) -> dict | None:
+        # A full release file (every observation it contains; anything missing counts as removed)
+        from utils.io import scan_csv
+        from utils.prep import SERIES_FILTER
+        df = scan_csv(path, SERIES_FILTER, None, ["date", GEO_COL, CODE_COL, "value"])
+        return self.add_frame(df, _file_hash(path), release)
+
+    # ---- reading
+    def releases(self) -> pd.DataFrame:
+        out = pd.DataFrame(self._manifest()["vintages"],
+                           columns=["release", "month", "file", "source", "added", "rows", "new", "revised", "removed"])
+        out["added"] = pd.to_datetime(out["added"], unit="s")
+        return out.drop(columns="file")
+
+    def _sorted_log(self):
+        mtime = os.stat(self._manifest_path).st_mtime_ns if os.path.exists(self._manifest_path) else 0
+        if self._log is None or self._log[0] != mtime:
+            import pyarrow.parquet as pq
+            files = [v["file"] for v in self._manifest()["vintages"]]
+            parts = [pq.read_table(os.path.join(self.root, f)).to_pandas() for f in files]
+            keys = np.concatenate([_keys(p["sid"].to_numpy(), p["month"].to_numpy()) for p in parts]) if parts \
+                else np.empty(0, np.int64)
+            vin = np.concatenate([np.full(len(p), i, np.int32) for i, p in enumerate(parts)]) if parts \
+                else np.empty(0, np.int32)
+            vals = np.concatenate([p["value"].to_numpy() for p in parts]) if parts else np.empty(0)
+            order = np.argsort(keys, kind="stable")  # releases stay in order within an observation
+            self._log = (mtime, keys[order], vin[order], vals[order])
+        return self._log[1:]
+
+    def resolve(self, release=None) -> int:
+        """Release index of ``release``: an index, a release name, or a month (last release whose
+        data ends in or before it; anything pd.Period reads: "2024-06", "2024-6", a Timestamp)."""
+        names = [v["release"] for v in self._manifest()["vintages"]]
+        if not names:
+            raise ValueError(f"no release recorded in {self.root}")
+        if release is None:
+            return len(names) - 1
+        if isinstance(release, (int, np.integer)):
+            if not -len(names) <= release < len(names):
+                raise ValueError(f"release {release} out of range (0..{len(names) - 1})")
+            return int(release) % len(names)
+        try:
+            target = pd.Period(release, freq="M")
+        except (ValueError, TypeError):
+            target = None
+        if target is None or (release in names and release != str(target)):  # a name that is not a plain month
+            if release in names:
+                return names.index(release)
+            raise ValueError(f"unknown release {release!r} (expected an index, a release name or a month)")
+        months = [_release_month(v) for v in self._manifest()["vintages"]]
+        before = [i for i, m in enumerate(months) if m is not None and m <= target]
+        if not before:
+            raise ValueError(f"no release up to {target} (first is {names[0]!r})")
+        return before[-1]
+
+    def as_of_keys(self, k: int) -> pd.Series:
+        keys, vin, vals = self._sorted_log()
+        sel = np.flatnonzero(vin <= k)
+        ks = keys[sel]
+        last = sel[np.r_[ks[1:] != ks[:-1], True]] if len(sel) else sel
+        out = pd.Series(vals[last], index=keys[last])
+        return out[out.notna()]
+
+    def as_of(self, release=None, codes=None, geo: str | None = None) -> pd.DataFrame:
+        """Long frame (date, [geo,] expenditure_1999, value) as published in ``release`` (default: latest)."""
+        k = self.resolve(release)
+        obs = self.as_of_keys(k)
+        series = pd.DataFrame(self._manifest()["series"], columns=[GEO_COL, CODE_COL])
+        sid, month = obs.index.to_numpy() // _MONTHS, obs.index.to_numpy() % _MONTHS
+        out = pd.DataFrame({
+            "date": pd.PeriodIndex.from_ordinals(month, freq="M").to_timestamp(),
+            GEO_COL: series[GEO_COL].to_numpy()[sid],
+            CODE_COL: series[CODE_COL].to_numpy()[sid],
+            "value": obs.to_numpy(),
+        })
+        if geo is not None:
+            out = out[out[GEO_COL] == geo]
+        if codes is not None:
+            out = out[out[CODE_COL].isin(list(codes))]
+        if (out[GEO_COL] == "").all():
+            out = out.drop(columns=GEO_COL)
+        return out.sort_values([CODE_COL, "date"]).reset_index(drop=True)
+
+    def panel_as_of(self, release=None, geo: str | None = None) -> SeriesPanel:
+        from utils.io import DEFAULT_GEO
+        df = self.as_of(release)
+        if GEO_COL in df.columns:
+            geos = df[GEO_COL].unique()
+            df = df[df[GEO_COL] == (geo or (DEFAULT_GEO if DEFAULT_GEO in geos else geos[0]))]
+        return SeriesPanel.from_frame(df)
+
+    def revisions(self) -> pd.DataFrame:
+        """Every revised observation: expenditure_1999, [geo,] date, release, old, new, revision_pct."""
+        keys, vin, vals = self._sorted_log()
+        i = np.flatnonzero(keys[1:] == keys[:-1]) + 1
+        i = i[~np.isnan(vals[i]) & ~np.isnan(vals[i - 1])]
+        manifest = self._manifest()
+        series = pd.DataFrame(manifest["series"], columns=[GEO_COL, CODE_COL])
+        sid = keys[i] // _MONTHS
+        out = pd.DataFrame({
+            CODE_COL: series[CODE_COL].to_numpy()[sid],
+            GEO_COL: series[GEO_COL].to_numpy()[sid],
+            "date": pd.PeriodIndex.from_ordinals(keys[i] % _MONTHS, freq="M").to_timestamp(),
+            "release": np.array([v["release"] for v in manifest["vintages"]], dtype=object)[vin[i]],
+            "old": vals[i - 1],
+            "new": vals[i],
+        })
+        out["revision_pct"] = (out["new"] / out["old"] - 1) * 100
+        return out if (out[GEO_COL] != "").any() else out.drop(columns=GEO_COL)
+
+    def revision_stats(self, by: str = "code") -> pd.DataFrame:
+        """Revision sizes per series code (``by="division"``: per COICOP division CP01..CP12)."""
+        rev = self.revisions()
+        latest = self.as_of()
+        group = (lambda s: s.astype(str).str[:4]) if by == "division" else (lambda s: s.astype(str))
+        size = rev["revision_pct"].abs()
+        stats = size.groupby(group(rev[CODE_COL])).agg(["count", "mean", "max"])
+        stats["bias"] = rev["revision_pct"].groupby(group(rev[CODE_COL])).mean()
+        obs = latest.groupby(group(latest[CODE_COL])).size()
+        out = pd.DataFrame({"observations": obs}).join(stats, how="left")
+        out = out.rename(columns={"count": "revisions", "mean": "mean_abs_pct", "max": "max_abs_pct", "bias": "mean_pct"})
+        out["revisions"] = out["revisions"].fillna(0).astype(int)
+        out["revised_share"] = out["revisions"] / out["observations"]
+        out.index.name = CODE_COL
+        return out.reset_index().sort_values("mean_abs_pct", ascending=False, na_position="last").reset_index(drop=True)
+
+def record(path: str = "data/DS_IPCH_M_data.csv") -> dict | None:
+    # Current state of ``path`` (CSV + appended updates) as a release, once per data version
+    from utils.io import data_version, load_filtered
+    from utils.prep import SERIES_FILTER
+    store = VintageStore.for_data(path)
+    version = data_version(path)
+    if any(v["source"] == version for v in store._manifest()["vintages"]):
+        return None
+    df = load_filtered(path, SERIES_FILTER, None, ["date", GEO_COL, CODE_COL, "value"])
+    return store.add_frame(df, version)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Record HICP releases and query them as of a past release.")
+    parser.add_argument("command", choices=["add", "list", "stats", "as-of"])
+    parser.add_argument("files", nargs="*", help="add: release CSV files, oldest first (default: --data)")
+    parser.add_argument("--data", default="data/DS_IPCH_M_data.csv", help="dataset the releases belong to")
+    parser.add_argument("--release", help="add: release name (default: last month of the file)")
+    parser.add_argument("--by", choices=["code", "division"], default="code", help="stats: grouping")
+    parser.add_argument("--codes", nargs="*", help="as-of: series codes")
+    parser.add_argument("--geo", help="as-of: country")
+    args = parser.parse_args(argv)
+    store = VintageStore.for_data(args.data)
+    pd.set_option("display.width", 160)
+    if args.command == "add":
+        for path in args.files or [None]:
+            entry = record(args.data) if path is None else store.add(path, args.release)
+            print(f"{path or args.data}: " + ("already recorded" if entry is None else
+                  f"release {entry['release']} · {entry['new']} new, {entry['revised']} revised, {entry['removed']} removed"))
+    elif args.command == "list":
+        print(store.releases().to_string(index=False))
+    elif args.command == "stats":
+        print(store.revision_stats(args.by).round(4).to_string(index=False))
+    else:
+        release = args.files[0] if args.files else None
+        try:
+            df = store.as_of(release, args.codes, args.geo)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        df.to_csv(sys.stdout, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())